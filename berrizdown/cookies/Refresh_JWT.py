@@ -17,6 +17,7 @@ from berrizdown.static.color import Color
 from berrizdown.static.parameter import paramstore
 from berrizdown.static.route import Route
 from berrizdown.unit.handle.handle_log import setup_logging
+from berrizdown.unit.http.transport import MISC, transport
 
 route = Route()
 DEFAULT_COOKIE: Path = route.default_cookie
@@ -135,19 +136,19 @@ async def _send_post_http(bz_r: str) -> dict | None:
         "bz_r": bz_r,
     }
     try:
-        async with aiohttp.ClientSession(timeout=timeout) as client:
-            async with client.post(
-                url,
-                headers=headers,
-                json={"clientId": "e8faf56c-575a-42d2-933d-7b2e279ad827"},
-                ssl=True,
-                proxy=proxy,
-            ) as response:
-                logger.info(f"{response.status} {url} {response.reason}")
-                if response is not None:
-                    return await response.json()
-                else:
-                    raise aiohttp.ClientError("No response")
+        async with transport.session(MISC).post(
+            url,
+            headers=headers,
+            json={"clientId": "e8faf56c-575a-42d2-933d-7b2e279ad827"},
+            ssl=True,
+            proxy=proxy,
+            timeout=timeout,
+        ) as response:
+            logger.info(f"{response.status} {url} {response.reason}")
+            if response is not None:
+                return await response.json()
+            else:
+                raise aiohttp.ClientError("No response")
     except aiohttp.ClientConnectorError as e:
         logger.warning(f"Request connection error: {url} - {e}")
     except asyncio.CancelledError:
@@ -0,0 +1,122 @@
+import asyncio
+import json
+import time
+
+from berrizdown.cookies.cookies import Berriz_cookie
+from berrizdown.cookies.Refresh_JWT import Refresh_JWT
+from berrizdown.lib.base64 import base64
+from berrizdown.static.color import Color
+from berrizdown.unit.handle.handle_log import setup_logging
+
+logger = setup_logging("token_manager", "khaki")
+
+
+class TokenManager:
+    """bz_a 的到期管理
+
+    - 每個 token 只解碼一次 之後的到期檢查只比較時間
+    - 同時間只會有一個 refresh 其他請求等待同一個結果
+    - 在 exp - MARGIN 之前由背景 task 先行更新 請求端不會碰到即將過期的 token
+    - 新 token 只在 Refresh_JWT 裡寫入 default.txt 一次
+    - 每次 refresh 都建立新的 Refresh_JWT 重新讀取 default.txt 登入或換 cookie 後不會送出舊的 bz_r
+    """
+
+    MARGIN: float = 150.0
+    RENEW_AHEAD: float = 30.0
+
+    def __init__(self) -> None:
+        self._token: str | None = None
+        self._exp: float | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._inflight: asyncio.Future | None = None
+        self._renewal: asyncio.Task | None = None
+        self._scheduled_exp: float | None = None
+
+    def _bind(self) -> None:
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._inflight = None
+            self._renewal = None
+            self._scheduled_exp = None
+
+    @staticmethod
+    def decode_exp(token: str) -> float | None:
+        try:
+            p = token.split(".")[1]
+            p += "=" * (-len(p) % 4)
+            return float(json.loads(base64.urlsafe_b64decode(p))["exp"])
+        except Exception as e:
+            logger.error(f"{e}")
+            return None
+
+    def expiry(self, token: str | None) -> float | None:
+        """回傳 token 的 exp 同一個 token 不重複解碼 第一次看到時排程背景更新"""
+        if not token or not isinstance(token, str):
+            return None
+        if token != self._token:
+            self._token = token
+            self._exp = self.decode_exp(token)
+            if self._exp is not None:
+                self._schedule(self._exp)
+        return self._exp
+
+    def expiring_soon(self, token: str | None) -> bool:
+        exp: float | None = self.expiry(token)
+        return exp is not None and exp - time.time() < self.MARGIN
+
+    async def refresh(self, stale: str | None = None) -> str | None:
+        """更新 bz_a 並寫回共用的 cookie
+
+        stale 是呼叫端送出請求時使用的 token 若已被其他請求換成有效的新 token 直接回傳 不再 refresh
+        """
+        self._bind()
+        if stale is not None and self._token not in (None, stale) and not self.expiring_soon(self._token):
+            return self._token
+        if self._inflight is None:
+            self._inflight = asyncio.ensure_future(self._refresh())
+            self._inflight.add_done_callback(self._clear)
+        return await asyncio.shield(self._inflight)
+
+    def _clear(self, future: asyncio.Future) -> None:
+        if self._inflight is future:
+            self._inflight = None
+
+    async def _refresh(self) -> str | None:
+        bz_a: str | None = await Refresh_JWT().refresh_token()
+        if bz_a is not None:
+            cookie: dict[str, str] = await Berriz_cookie().get_cookies()
+            if cookie:
+                cookie["bz_a"] = bz_a
+            self.expiry(bz_a)
+        return bz_a
+
+    def _schedule(self, exp: float) -> None:
+        try:
+            self._bind()
+        except RuntimeError:
+            # 沒有執行中的 event loop 交給下一次請求排程
+            self._token = None
+            return
+        if self._scheduled_exp == exp:
+            return
+        if self._renewal is not None and not self._renewal.done():
+            self._renewal.cancel()
+        self._scheduled_exp = exp
+        delay: float = max(0.0, exp - self.MARGIN - self.RENEW_AHEAD - time.time())
+        self._renewal = asyncio.get_running_loop().create_task(self._renew(self._token, delay))
+
+    async def _renew(self, token: str | None, delay: float) -> None:
+        await asyncio.sleep(delay)
+        # 先脫離 _renewal 新 token 排程下一次更新時不會取消自己
+        self._renewal = None
+        try:
+            bz_a: str | None = await self.refresh(token)
+        except Exception as e:
+            logger.warning(f"Background token refresh failed: {e}")
+            return
+        if bz_a:
+            logger.debug(f"{Color.fg('beige')}Token renewed in background{Color.reset()}")
+
+
+token_manager: TokenManager = TokenManager()
@@ -1,5 +1,7 @@
+import asyncio
 import sys
-import requests
+
+import aiohttp
 
 from berrizdown.lib.click_types import *
 from berrizdown.static.help import print_help
@@ -38,6 +40,7 @@ from berrizdown.unit.community.community import get_community_print
 from berrizdown.unit.date.date import process_time_inputs
 from berrizdown.unit.handle.handle_choice import Handle_Choice
 from berrizdown.unit.http.request_berriz_api import BerrizAPIClient, WEBView
+from berrizdown.unit.http.transport import MISC, transport
 BAPIClient: BerrizAPIClient = BerrizAPIClient()
 
 time1, time2 = time_date1(), time_date2()
@@ -46,6 +49,9 @@ if time_date1() or time_date2():
 else:
     time_a, time_b = None, None
 
+# 背景工作需保留參照 否則可能在完成前被 GC 回收
+_background_tasks: set[asyncio.Task] = set()
+
 async def init():
     await cm_join_leave_main()
     await password_change_main()
@@ -63,14 +69,20 @@ async def click_urls() -> None:
         await BAPIClient.close_session()
         sys.exit(0)
 
-async def start():
-    bool_version, version_str = version_check()
+async def report_new_version() -> None:
+    bool_version, version_str = await version_check()
     if bool_version:
         logger.info(
             f"{Color.bold()}{Color.fg('gold')}[Berrizdown had new version unvailable]{Color.reset()} "
             f"{Color.fg('blue')}{__version__}{Color.reset()}{Color.bold()} → {Color.fg('green')}{version_str}"
             f"{Color.reset()}"
         )
+
+async def start():
+    # 版本檢查在背景執行 不阻塞啟動 程式先結束時直接取消
+    task: asyncio.Task = asyncio.create_task(report_new_version())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
     if paramstore.get("no_cookie") is not True:
         await WEBView().allow_host()
     await init()
@@ -144,12 +156,13 @@ async def sign_up_main():
         await BAPIClient.close_session()
         sys.exit(0)
 
-def version_check() -> bool:
+async def version_check() -> tuple[bool, str]:
     url: str = "ttps://raw.githubusercontent.com/twkenxtis/Berrizdown/refs/heads/main/berrizdown/static/version.py"
     
     try:
-        v: str = requests.get(url).text
-    except requests.exceptions.RequestException:
+        async with transport.session(MISC).get(url) as response:
+            v: str = await response.text()
+    except (aiohttp.ClientError, TimeoutError):
         return False, ""
     
     for line in v.splitlines():
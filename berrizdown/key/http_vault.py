@@ -1,10 +1,9 @@
 from typing import Any
 
-import httpx
-
 from berrizdown.lib.load_yaml_config import CFG
 from berrizdown.static.color import Color
 from berrizdown.unit.handle.handle_log import setup_logging
+from berrizdown.unit.http.transport import MISC, transport
 
 logger = setup_logging("http_vault", "apple_green")
 
@@ -60,28 +59,28 @@ class HTTP_API:
             return []
 
     async def send_http_request(self, url: str, json_data: dict[str, Any], headers: dict[str, str]) -> list[str]:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                url,
-                json=json_data,
-                headers=headers,
-            )
-        if response.status_code != 200:
-            logger.error(f"Failed to get license key: {response.status_code} {response.text}")
-            return []
+        async with transport.session(MISC).post(
+            url,
+            json=json_data,
+            headers=headers,
+        ) as response:
+            if response.status != 200:
+                logger.error(f"Failed to get license key: {response.status} {await response.text()}")
+                return []
+            data: dict[str, Any] = await response.json(content_type=None)
 
-        # logger.debug(response, response.json(), response.headers, response.content, response.status_code)
+        # logger.debug(response, data, response.headers, response.status)
 
-        return self.key_handler(response)
+        return self.key_handler(data)
 
-    def key_handler(self, response: httpx.Response) -> list[str]:
+    def key_handler(self, data: dict[str, Any]) -> list[str]:
         keys: list[str] = []
-        logger.info(f"HTTP_API response: {response.json()}")
-        resp = response.json().get("message", "").strip()
+        logger.info(f"HTTP_API response: {data}")
+        resp = data.get("message", "").strip()
         if resp == "":
             logger.error(
                 f"Failed to parse response got empty! Use:{Color.reset()}"
-                f"{Color.fg('yellow')} {response.json().get('message', '').strip()}{Color.reset()}"
+                f"{Color.fg('yellow')} {data.get('message', '').strip()}{Color.reset()}"
                 f"{Color.fg('white')} Check HTTP API response for more information{Color.reset()}"
             )
             return []
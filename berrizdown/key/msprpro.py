@@ -50,8 +50,11 @@ class GetMPD_prd:
         :param raw_mpd: requests.Response 物件
         :return: PSSH 列表或 None
         """
-        pssh_values = extract_pssh(raw_mpd)
+        return GetMPD_prd.filter_pssh(extract_pssh(raw_mpd))
 
+    @staticmethod
+    def filter_pssh(pssh_values: list[str]) -> list[str] | None:
+        """從已解析的 mspr:pro 中過濾出 PlayReady PSSH (長度大於 399)"""
         if not pssh_values:
             logger.warning(f"{Color.bg('mint')}No MSPR:PRO PSSH values found in the MPD file.{Color.reset()}")
             return None
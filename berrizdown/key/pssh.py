@@ -47,7 +47,11 @@ class GetMPD_wv:
         解析 MPD 檔案的回應，提取 PSSH 值，並過濾出長度為 300 的有效值
         """
         # extract_pssh 返回 List[str]
-        pssh_values: list[str] = extract_pssh(raw_mpd)
+        return GetMPD_wv.filter_pssh(extract_pssh(raw_mpd))
+
+    @staticmethod
+    def filter_pssh(pssh_values: list[str]) -> list[str] | None:
+        """從已解析的 cenc:pssh 中過濾出 Widevine PSSH (長度小於 300)"""
         if not pssh_values:
             logger.warning(f"{Color.bg('mint')}No WV PSSH values found in the MPD file.{Color.reset()}")
             return None
@@ -1,10 +1,9 @@
-import aiohttp
-
 from berrizdown.lib.load_yaml_config import CFG
 from berrizdown.readydl_pyplayready.pyplayready.remote import remotecdm
 from berrizdown.readydl_pyplayready.pyplayready.system.pssh import PSSH
-from berrizdown.unit.__init__ import USERAGENT
+from berrizdown.unit.__init__ import get_useragent
 from berrizdown.unit.handle.handle_log import setup_logging
+from berrizdown.unit.http.transport import DRM, transport
 
 logger = setup_logging("remotecdm_pr", "turquoise")
 
@@ -37,7 +36,7 @@ class Remotecdm_Playready:
         
     def build_headers(self, acquirelicenseassertion: str):
         return {
-            "user-agent": USERAGENT,
+            "user-agent": get_useragent(),
             "content-type": "application/octet-stream",
             "acquirelicenseassertion": acquirelicenseassertion,
         }
@@ -56,14 +55,10 @@ class Remotecdm_Playready:
         
         headers: dict[str, str] = self.build_headers(acquirelicenseassertion)
         request_data: str = await self.make_request_data(rcdm, session_id, pssh_input)
-        async with aiohttp.ClientSession(
-            timeout=aiohttp.ClientTimeout(total=13.0),
-            connector=aiohttp.TCPConnector(ssl=True)
-            ) as session:   
-            async with session.post(self.url, headers=headers, data=request_data) as response:
-                if response.status != 200:
-                    raise Exception("Error getting license key")
-                license_response = await response.text()
+        async with transport.session(DRM).post(self.url, headers=headers, data=request_data) as response:
+            if response.status != 200:
+                raise Exception("Error getting license key")
+            license_response = await response.text()
         await rcdm.parse_license(session_id, license_response)
         return await self.parse_response_key(rcdm, session_id)
 
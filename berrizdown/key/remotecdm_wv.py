@@ -1,12 +1,11 @@
-import aiohttp
-
 from berrizdown.lib.load_yaml_config import CFG
 from berrizdown.lib.base64 import base64
 from berrizdown.wvd.pywidevine.remotecdm import RemoteCdm
 from berrizdown.wvd.pywidevine.pssh import PSSH
 from berrizdown.wvd.pywidevine.device import DeviceTypes
-from berrizdown.unit.__init__ import USERAGENT
+from berrizdown.unit.__init__ import get_useragent
 from berrizdown.unit.handle.handle_log import setup_logging
+from berrizdown.unit.http.transport import DRM, transport
 
 logger = setup_logging("remotecdm_wv", "crimson")
 
@@ -46,7 +45,7 @@ class Remotecdm_Widevine:
         
     def build_headers(self, acquirelicenseassertion: str):
         return {
-            "user-agent": USERAGENT,
+            "user-agent": get_useragent(),
             "content-type": "application/octet-stream",
             "acquirelicenseassertion": acquirelicenseassertion,
         }
@@ -66,14 +65,10 @@ class Remotecdm_Widevine:
         headers: dict[str, str] = self.build_headers(acquirelicenseassertion)
         pssh: PSSH = self.get_pssh(pssh_input)
         challenge = await rcdm.get_license_challenge(session_id, pssh, "STREAMING", True)
-        async with aiohttp.ClientSession(
-            timeout=aiohttp.ClientTimeout(total=13.0),
-            connector=aiohttp.TCPConnector(ssl=True)
-            ) as session:
-            async with session.post(self.url, headers=headers, data=challenge) as response:
-                if response.status != 200:
-                    raise Exception("Error getting license key")
-                license_response = await response.read()
+        async with transport.session(DRM).post(self.url, headers=headers, data=challenge) as response:
+            if response.status != 200:
+                raise Exception("Error getting license key")
+            license_response = await response.read()
         await rcdm.parse_license(session_id, license_response)
         return await self.parse_response_key(rcdm, session_id)
         
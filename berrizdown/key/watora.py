@@ -2,11 +2,11 @@ import json
 import os
 from typing import Any
 
-import httpx
 from dotenv import load_dotenv
 
 from berrizdown.lib.path import Path
 from berrizdown.unit.handle.handle_log import setup_logging
+from berrizdown.unit.http.transport import MISC, transport
 
 logger = setup_logging("watora", "foggy")
 
@@ -49,12 +49,12 @@ class Watora_wv:
             case length if length >= 20:
                 url = "https://cdm.watora.me"
                 headers = {"Authorization": f"Bearer {self.remote_cdm_api_key}"}
-                async with httpx.AsyncClient() as client:
-                    response = await client.post(
-                        url,
-                        json=json_data,
-                        headers=headers,
-                    )
+                async with transport.session(MISC).post(
+                    url,
+                    json=json_data,
+                    headers=headers,
+                ) as response:
+                    data: dict[str, Any] = await response.json(content_type=None)
                 keys: list[str] = []
-                keys.append(response.json().get("Message", "").strip())
+                keys.append(data.get("Message", "").strip())
                 return keys
@@ -10,6 +10,7 @@ from berrizdown.static.artisarchive import ArtistContent
 from berrizdown.static.color import Color
 from berrizdown.static.parameter import paramstore
 from berrizdown.unit.getall.GetMediaList import FanClubFilter
+from berrizdown.unit.getall.sync_cursor import sync_cursor
 from berrizdown.unit.handle.handle_log import setup_logging
 from berrizdown.unit.http.request_berriz_api import Arits
 
@@ -188,8 +189,9 @@ class ArtisBoard:
         """簡化的單一藝人內容抓取流程：第一頁 + 剩餘頁 + 合併"""
         first_page = await self._fetch_first_page(artis_id)
         first_contents, params, hasNext = self.parse_page(first_page)
+        first_contents, reached = self._sync_filter(artis_id, first_contents)
 
-        rest_contents = await self._fetch_remaining_pages(artis_id, params, hasNext)
+        rest_contents = await self._fetch_remaining_pages(artis_id, params, hasNext and not reached)
 
         return first_contents + rest_contents
 
@@ -217,7 +219,9 @@ class ArtisBoard:
 
             Board_ERROR_Hanldle.board_error_handle(page)
             page_contents, params, hasNext = self.parse_page(page)
+            page_contents, reached = self._sync_filter(artis_id, page_contents)
             all_contents.extend(page_contents)
+            hasNext = hasNext and not reached
 
             count += 1
             self._log_fetch_progress(artis_id, count)
@@ -226,6 +230,10 @@ class ArtisBoard:
 
         return all_contents
 
+    def _sync_filter(self, artis_id: str, contents: list[dict[str, Any]]) -> tuple[list[dict[str, Any]], bool]:
+        """--sync 時只保留比上次更新的內容 每位藝人各自記錄"""
+        return sync_cursor.filter(self.communityid, f"archive:{artis_id}", contents, lambda item: item.get("createdAt"))
+
     async def _fetch_artis_data(self, params: dict[str, Any], artis_id: str) -> dict[str, Any]:
         page: dict[str, Any] | None = await self.artis.arits_archive_with_cmartisId(self.communityid, artis_id, params, use_proxy)
         return page or {}
@@ -12,6 +12,7 @@ from berrizdown.static.api_error_handle import api_error_handle
 from berrizdown.static.color import Color
 from berrizdown.static.parameter import paramstore
 from berrizdown.unit.cmt.cmt import CMT
+from berrizdown.unit.getall.sync_cursor import sync_cursor
 from berrizdown.unit.handle.handle_board_from import BoardMain, BoardNotice
 from berrizdown.unit.handle.handle_log import setup_logging
 from berrizdown.unit.http.request_berriz_api import Arits, Community, BerrizAPIClient
@@ -293,9 +294,10 @@ class Board:
         self.json_data = await self._fetch_board_data(boards_id, params)
         contents: list[dict[str, Any]]
         contents, params, hasNext = self.basic_sort_json
+        contents, reached = self._sync_filter_board(boards_id, contents)
         all_contents.extend(contents)
         Board_ERROR_Hanldle.board_error_handle(self.json_data, boards_name)
-        if not hasNext:
+        if not hasNext or reached:
             return self.deduplicate_contents(all_contents)
         # 取得初始 next_int
         count: int = 0
@@ -308,8 +310,10 @@ class Board:
             self.json_data = result
             page_contents: list[dict[str, Any]]
             page_contents, params, hasNext = self.basic_sort_json
+            page_contents, reached = self._sync_filter_board(boards_id, page_contents)
             if page_contents:
                 all_contents.extend(page_contents)
+            hasNext = hasNext and not reached
 
             count += 1
             if count in range(499, 501):
@@ -318,6 +322,12 @@ class Board:
                 logger.info(f"{Color.fg('light_gray')}Fetch {Color.fg('gold')}{count}{Color.fg('light_gray')} pages, please wait...{Color.reset()}")
         return self.deduplicate_contents(all_contents)
 
+    def _sync_filter_board(self, boards_id: str, contents: list[dict[str, Any]]) -> tuple[list[dict[str, Any]], bool]:
+        """--sync 時只保留比上次更新的貼文"""
+        return sync_cursor.filter(
+            self.communityid, f"board:{boards_id}", contents, lambda item: item.get("post", {}).get("createdAt")
+        )
+
     def deduplicate_contents(self, contents: list[dict[str, Any]]) -> list[dict[str, Any]]:
         seen: set = set()
         deduped: list[dict[str, Any]] = []
@@ -342,9 +352,10 @@ class Notice(Board):
         return await self.Arits.request_notice(self.communityid, params, use_proxy)
 
     async def get_all_notice_content_lists(self) -> list[dict[str, Any]]:
+        page_size: int = sync_cursor.PAGE_SIZE if sync_cursor.enabled else 999999999
         params: dict[str, str | int] = {
             "languageCode": "en",
-            "pageSize": 999999999,
+            "pageSize": page_size,
         }
         all_contents: list[dict[str, Any]] = []
         hasNext: bool = True
@@ -356,12 +367,14 @@ class Notice(Board):
         if result is None:
             return all_contents
 
+
         self.json_data = result
         contents: list[dict[str, Any]]
         contents, _, hasNext = self.basic_sort_json
+        contents, reached = self._sync_filter_notice(contents)
         all_contents.extend(contents)
         Board_ERROR_Hanldle.board_error_handle(self.json_data, "NOTICE")
-        if not hasNext:
+        if not hasNext or reached:
             return all_contents
 
         # 取得初始 next_int
@@ -371,7 +384,7 @@ class Notice(Board):
         # 單筆擴展，每次用回應的指針
         while hasNext and next_int is not None:
             params = {
-                "pageSize": 999999999,
+                "pageSize": page_size,
                 "languageCode": "en",
                 "next": next_int,
             }
@@ -383,6 +396,7 @@ class Notice(Board):
             self.json_data: dict[str, Any] | None = result
             page_contents: list[dict[str, Any]]
             page_contents, _, hasNext = self.basic_sort_json
+            page_contents, reached = self._sync_filter_notice(page_contents)
 
             actual_cursor: dict[str, Any] = result.get("data", {}).get("cursor", {})
             actual_next: int | None = actual_cursor.get("next", None)
@@ -390,8 +404,20 @@ class Notice(Board):
             if page_contents:
                 all_contents.extend(page_contents)
 
-            if actual_next:
+            if reached:
+                hasNext = False
+            elif actual_next:
                 next_int = actual_next
             else:
                 hasNext = False
         return all_contents
+
+    def _sync_filter_notice(self, contents: list[dict[str, Any]]) -> tuple[list[dict[str, Any]], bool]:
+        """--sync 時只保留比上次更新的公告"""
+        return sync_cursor.filter(
+            self.communityid,
+            "notice",
+            contents,
+            lambda item: item.get("reservedAt"),
+            lambda item: item.get("communityNoticeId"),
+        )
@@ -110,6 +110,9 @@ known_flags: list[str] = [
     "--cdm",
     "--cache",
     "--no-cache",
+    "--no-api-cache",
+    "--sync",
+    "--parallel-titles",
     "-c",
     "--cmt",
     "--artisid",
@@ -432,6 +435,25 @@ def apply_no_info(ctx, param, value):
     is_flag=True,
     help="Disable Key Vaults use and only retrieve decryption keys from CDM",
 )
+@click.option(
+    "--no-api-cache",
+    "no_api_cache",
+    is_flag=True,
+    help="Ignore the on-disk API response cache",
+)
+@click.option(
+    "--sync",
+    "sync",
+    is_flag=True,
+    help="Only fetch and download items newer than the last --sync run",
+)
+@click.option(
+    "--parallel-titles",
+    "parallel_titles",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Number of videos / lives processed at the same time",
+)
 @click.option(
     "-version",
     "--v",
@@ -521,6 +543,9 @@ def main(
     cdm: str,
     cache_key: bool,
     no_cache_key: bool,
+    no_api_cache: bool,
+    sync: bool,
+    parallel_titles: int | None,
     cmtonly: bool,
     artisid: str|list,
     version: bool,
@@ -576,6 +601,9 @@ def main(
         "cdm": cdm,
         "cache_key": cache_key,
         "no_cache_key": no_cache_key,
+        "no_api_cache": no_api_cache,
+        "sync": sync,
+        "parallel_titles": parallel_titles,
         "cmtonly": cmtonly,
         "artisid": artisid,
         "savedir": savedir,
@@ -690,6 +718,15 @@ def main(
     if no_cache_key:
         paramstore._store["no_cache_key"] = True
 
+    if no_api_cache:
+        paramstore._store["no_api_cache"] = True
+
+    if sync:
+        paramstore._store["sync"] = True
+
+    if parallel_titles:
+        paramstore._store["parallel_titles"] = parallel_titles
+
     if artisid:
         paramstore._store["artisid"] = artisid
     else:
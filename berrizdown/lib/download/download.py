@@ -1,7 +1,8 @@
 import asyncio
-import socket
+import hashlib
 import random
 import sys
+import time
 from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from functools import cached_property
@@ -9,28 +10,33 @@ from typing import Never, Optional, Union
 
 import aiohttp
 import aiofiles
-from aiohttp import ClientTimeout, ClientResponse
+from aiohttp import ClientResponse
 
 from berrizdown.lib.__init__ import use_proxy, container
 from berrizdown.lib.Proxy import Proxy
+from berrizdown.lib.download.scheduler import SegmentScheduler, download_scheduler
+from berrizdown.lib.download.segment_manifest import PARTIAL, SegmentManifest, sha256_of_prefix
 from berrizdown.lib.load_yaml_config import CFG, ConfigLoader
-from berrizdown.lib.mux.merge import MERGE
+from berrizdown.lib.mux.cenc import CencDecryptor, parse_keys
+from berrizdown.lib.mux.merge import MERGE, MergeAborted, StreamMerger
 from berrizdown.lib.mux.parse_hls import HLS_Paser, HLSContent, HLSSubTrack, HLSVariant
-from berrizdown.lib.mux.parse_mpd import MediaTrack, MPDParser, SubtitleTrack
+from berrizdown.lib.mux.parse_mpd import MediaTrack, MPDContent, MPDParser, SubtitleTrack
 from berrizdown.lib.mux.playlist_selector import PlaylistSelector
 from berrizdown.lib.path import Path
 from berrizdown.lib.processbar.processbar import MultiTrackProgressManager
 from berrizdown.lib.rename.rename import SUCCESS
 from berrizdown.lib.save_json_data import save_json_data
+from berrizdown.lib.settings import VideoDownloadSettings, get_settings
 from berrizdown.lib.video_folder import Video_folder
+from berrizdown.lock.donwnload_lock import uuid_store
 from berrizdown.static.color import Color
 from berrizdown.static.parameter import paramstore
 from berrizdown.static.PlaybackInfo import PlaybackInfo
 from berrizdown.static.PublicInfo import PublicInfo
-from berrizdown.unit.__init__ import USERAGENT
 from berrizdown.unit.date.date import video_start2end_time
 from berrizdown.unit.sub.subprocess import SubtitleProcessor
 from berrizdown.unit.handle.handle_log import setup_logging
+from berrizdown.unit.http.transport import MEDIA, transport
 
 logger = setup_logging("download", "peach")
 
@@ -60,6 +66,8 @@ class DownloadObjection:
     audio: Path = Path("")
     subtitle: dict[Union["HLSSubTrack", "SubtitleTrack"], Path] = field(default_factory=dict)
     task_info: Optional[object] = None
+    # 合併時已完成解密的軌道 mux 時不需再解密
+    decrypted: set[str] = field(default_factory=set)
 
 
 @dataclass
@@ -71,6 +79,7 @@ class DownloadProgress:
     current_bytes: int = 0
     speed_mbps: float = 0.0
     eta_seconds: float = 0.0
+    window: int = 0
 
 
 class MediaDownloader:
@@ -78,7 +87,14 @@ class MediaDownloader:
 
     MB_IN_BYTES = 1024 * 1024
 
-    def __init__(self, media_id: str, output_dir: str, video_duration: float, savejsondata: save_json_data,) -> None:
+    def __init__(
+        self,
+        media_id: str,
+        output_dir: str,
+        video_duration: float,
+        savejsondata: save_json_data,
+        decryption_key: list[str] | None = None,
+    ) -> None:
         self.media_id: str = media_id
         self.base_dir: Path = Path(output_dir)
         self.video_duration: float = video_duration
@@ -86,8 +102,23 @@ class MediaDownloader:
         self.savejsondata: save_json_data = savejsondata
 
         self._session: Optional[aiohttp.ClientSession] = None
-        self._session_lock: asyncio.Lock = asyncio.Lock()
+        self.scheduler: SegmentScheduler = download_scheduler
         self._thread_pool: Optional[ThreadPoolExecutor] = None
+        # 建立時取一次設定 reload 不影響進行中的下載
+        self.settings: VideoDownloadSettings = get_settings().video
+        self.resume: bool = self.settings.resume
+        self.stream_merge: bool = self.settings.stream_merge and paramstore.get("skip_merge") is not True
+        self._stream_mergers: dict[str, StreamMerger] = {}
+        # 串流合併時邊下載邊解密 省去合併後再跑一次 mp4decrypt / packager
+        self.cenc_keys: dict[bytes, bytes] = (
+            parse_keys(decryption_key)
+            if self.stream_merge and self.settings.pipeline_decrypt
+            else {}
+        )
+        # 大於 0 時分段只存在記憶體中 經重排緩衝區直接寫入輸出檔
+        self.memory_buffer: int = (
+            self.settings.segment_memory_buffer_mb * self.MB_IN_BYTES if self.stream_merge else 0
+        )
 
     @property
     def thread_pool(self) -> ThreadPoolExecutor:
@@ -96,72 +127,53 @@ class MediaDownloader:
         return self._thread_pool
     
     async def _ensure_session(self) -> None:
-        """確保 aiohttp session 存在 使用 Lock 避免 race condition"""
-        async with self._session_lock:
-            if self._session is not None and not self._session.closed:
-                return
-
-            connector = aiohttp.TCPConnector(
-                limit=CFG["VideoDownload"]["connector_limit"],
-                limit_per_host=CFG["VideoDownload"]["connector_limit_per_host"],
-                ttl_dns_cache=CFG["VideoDownload"]["connector_ttl_dns_cache"],
-                use_dns_cache=CFG["VideoDownload"]["connector_use_dns_cache"],
-                keepalive_timeout=CFG["VideoDownload"]["connector_keepalive_timeout"],
-                enable_cleanup_closed=CFG["VideoDownload"]["connector_enable_cleanup_closed"],
-                force_close=False,
-                family=socket.AF_INET,
-                resolver=aiohttp.AsyncResolver(),
-            )
-
-            timeout = ClientTimeout(
-                total=CFG["VideoDownload"]["timeout_total"],
-                connect=CFG["VideoDownload"]["timeout_connect"],
-                sock_read=CFG["VideoDownload"]["timeout_sock_read"],
-                sock_connect=CFG["VideoDownload"]["timeout_sock_connect"],
-            )
-
-            self._session = aiohttp.ClientSession(
-                connector=connector,
-                timeout=timeout,
-                headers={
-                    "user-agent": USERAGENT,
-                    "accept": "*/*",
-                    "accept-encoding": "gzip, deflate, br",
-                    "connection": "keep-alive",
-                },
-                cookie_jar=aiohttp.DummyCookieJar(),
-                auto_decompress=True,
-                read_bufsize=256 * 1024,
-            )
+        """取得排程器的共用 session 所有媒體與軌道共用同一組連線"""
+        self._session = await self.scheduler.session()
 
     async def close(self) -> None:
-        """關閉 session 與 thread pool 釋放所有資源"""
-        if self._session and not self._session.closed:
-            await self._session.close()
+        """關閉 merger 與 thread pool 釋放資源 共用 session 由排程器管理"""
+        for merger in self._stream_mergers.values():
+            await merger.close()
+        self._session = None
         if self._thread_pool is not None:
             self._thread_pool.shutdown(wait=True)
             self._thread_pool = None
 
-    async def download_file(self, url: str, save_path: Path) -> bool:
-        """下載單一檔案 失敗時使用指數退避重試"""
+    async def download_file(
+        self,
+        url: str,
+        save_path: Path,
+        manifest: SegmentManifest | None = None,
+        index: int = 0,
+        owner: str | None = None,
+    ) -> bool:
+        """下載單一檔案 失敗時使用指數退避重試 續傳模式下從已寫入的位置繼續
+
+        每次嘗試才向排程器取得名額 退避等待期間不佔用連線
+        """
         save_path.parent.mkdirp()
-        max_retries: int = int(CFG["VideoDownload"]["max_retries"])
+        max_retries: int = self.settings.max_retries
 
         for attempt in range(max_retries):
             await self._ensure_session()
             assert self._session is not None
 
             try:
-                return await self.attempt_download(url, save_path, attempt)
+                async with self.scheduler.slot(owner or self.media_id, url):
+                    return await self.attempt_download(url, save_path, attempt, manifest, index)
 
             except asyncio.CancelledError:
-                await self.cancel_cleanup(url, save_path)
+                await self.cancel_cleanup(url, save_path, manifest)
                 return False
 
             except (TimeoutError, aiohttp.ClientError) as exc:
+                if self._give_up(exc, url):
+                    return False
                 logger.warning(f"Download attempt {attempt + 1} failed: {exc}")
+                if isinstance(exc, TimeoutError):
+                    self.scheduler.congestion()
                 if attempt + 1 < max_retries:
-                    await asyncio.sleep(2 ** (attempt + 1))
+                    await asyncio.sleep(self.scheduler.backoff(attempt, self._retry_after(exc)))
                 else:
                     logger.error(f"Download failed after {max_retries} retries: {url}")
                     return False
@@ -173,34 +185,180 @@ class MediaDownloader:
 
         return False
 
-    async def attempt_download(self, url: str, save_path: Path, attempt: int) -> bool:
-        """發出單次 GET 請求並串流寫入磁碟"""
+    async def attempt_download(
+        self,
+        url: str,
+        save_path: Path,
+        attempt: int,
+        manifest: SegmentManifest | None = None,
+        index: int = 0,
+    ) -> bool:
+        """發出單次 GET 請求並串流寫入磁碟 有紀錄檔時以 Range 接續未完成的分段"""
         proxy: str = await _get_random_proxy() or ""
+        offset: int = self._resume_offset(save_path, manifest, index)
+        headers: dict[str, str] = {"range": f"bytes={offset}-"} if offset else {}
+
+        async with transport.session_for(MEDIA, url, proxy).get(url, proxy=proxy, headers=headers) as response:
+            if response.status == 416 and offset:
+                # 本地內容已超出遠端長度 代表檔案不可信 從頭重新下載
+                logger.warning(f"Range not satisfiable, restart segment: {save_path.name}")
+                save_path.unlink(missing_ok=True)
+                manifest.reset(index)
+                return await self.attempt_download(url, save_path, attempt, manifest, index)
+
+            self._check_status(response, (200, 206), attempt)
+
+            if manifest is None:
+                await self.stream_to_disk(response, save_path)
+                return True
+
+            if response.status != 206:
+                # 伺服器忽略 Range 直接回傳完整內容
+                offset = 0
+            expected: int | None = self._expected_size(response)
+            manifest.mark_partial(index, expected)
+            hasher = await sha256_of_prefix(save_path, offset) if offset else hashlib.sha256()
+
+            written: int = await self.stream_to_disk(response, save_path, "ab" if offset else "wb", hasher)
+            size: int = offset + written
+            if expected is not None and size != expected:
+                await manifest.save()
+                raise aiohttp.ClientPayloadError(f"Incomplete segment {save_path.name}: {size}/{expected} bytes")
+
+            manifest.mark_done(index, size, hasher.hexdigest())
+            await manifest.save()
+            return True
 
-        async with self._session.get(url, proxy=proxy) as response:
-            if response.status not in (200, 206):
-                logger.warning(
-                    f"Request failed with status {response.status}, "
-                    f"retrying (attempt {attempt + 1})..."
-                )
-                await asyncio.sleep(2 ** (attempt + 1))
-                return False
+    async def download_bytes(self, url: str, owner: str | None = None) -> bytes | None:
+        """下載單一分段至記憶體 不建立任何分段檔 失敗時使用指數退避重試"""
+        max_retries: int = self.settings.max_retries
+
+        for attempt in range(max_retries):
+            await self._ensure_session()
+            assert self._session is not None
+
+            try:
+                async with self.scheduler.slot(owner or self.media_id, url):
+                    return await self.attempt_download_bytes(url, attempt)
+
+            except asyncio.CancelledError:
+                progress_manager.remove_progress_bars(self.media_id)
+                await self.close()
+                logger.info(f"Download cancelled: {url}")
+                return None
+
+            except (TimeoutError, aiohttp.ClientError) as exc:
+                if self._give_up(exc, url):
+                    return None
+                logger.warning(f"Download attempt {attempt + 1} failed: {exc}")
+                if isinstance(exc, TimeoutError):
+                    self.scheduler.congestion()
+                if attempt + 1 < max_retries:
+                    await asyncio.sleep(self.scheduler.backoff(attempt, self._retry_after(exc)))
+                else:
+                    logger.error(f"Download failed after {max_retries} retries: {url}")
+                    return None
+
+            except Exception as exc:
+                if str(exc) == "Connection closed.":
+                    return None
+                logger.error(f"Unexpected error during download: {exc}")
+
+        return None
 
-            await self.stream_to_disk(response, save_path)
+    async def attempt_download_bytes(self, url: str, attempt: int) -> bytes | None:
+        """發出單次 GET 請求並讀取完整內容"""
+        proxy: str = await _get_random_proxy() or ""
+
+        async with transport.session_for(MEDIA, url, proxy).get(url, proxy=proxy) as response:
+            self._check_status(response, (200,), attempt)
+
+            expected: int | None = self._expected_size(response)
+            data: bytes = await response.read()
+            if expected is not None and len(data) != expected:
+                raise aiohttp.ClientPayloadError(f"Incomplete segment {url}: {len(data)}/{expected} bytes")
+            return data
+
+    def _check_status(self, response: aiohttp.ClientResponse, ok: tuple[int, ...], attempt: int) -> None:
+        """非預期的狀態碼丟出例外 交由重試流程在釋放排程名額後退避
+
+        429 與 5xx 代表來源過載 另外回報排程器縮小 window
+        """
+        if response.status in ok:
+            return
+        if response.status == 429 or response.status >= 500:
+            self.scheduler.congestion()
+        elif self._retryable_status(response.status):
+            logger.warning(f"Request failed with status {response.status}, retrying (attempt {attempt + 1})...")
+        raise aiohttp.ClientResponseError(
+            response.request_info,
+            response.history,
+            status=response.status,
+            message=response.reason or "",
+            headers=response.headers,
+        )
+
+    @staticmethod
+    def _retryable_status(status: int) -> bool:
+        """408 429 以外的 4xx 重試也不會成功 (與 ImageDownloader 相同)"""
+        return not 400 <= status < 500 or status in (408, 429)
+
+    def _give_up(self, exc: BaseException, url: str) -> bool:
+        if isinstance(exc, aiohttp.ClientResponseError) and not self._retryable_status(exc.status):
+            logger.error(f"Download failed: {url} - {exc.status} {exc.message}")
             return True
-    
+        return False
+
+    @staticmethod
+    def _retry_after(exc: BaseException) -> float | None:
+        headers = getattr(exc, "headers", None)
+        value: str | None = headers.get("retry-after") if headers else None
+        return float(value) if value and value.isdigit() else None
+
+    @staticmethod
+    def _resume_offset(save_path: Path, manifest: SegmentManifest | None, index: int) -> int:
+        """只有紀錄為 partial 的分段才接續 其他情況一律從頭下載"""
+        if manifest is None or manifest.entry(index).status != PARTIAL:
+            return 0
+        try:
+            return save_path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    @staticmethod
+    def _expected_size(response: aiohttp.ClientResponse) -> int | None:
+        """取得分段完整大小 經過壓縮的回應無法以長度判斷"""
+        if response.headers.get("content-encoding", "identity").lower() != "identity":
+            return None
+        if response.status == 206:
+            total: str = response.headers.get("content-range", "").rpartition("/")[2]
+            return int(total) if total.isdigit() else None
+        return response.content_length
+
     async def stream_to_disk(
         self,
         response: aiohttp.ClientResponse,
         save_path: Path,
-    ) -> None:
-        async with aiofiles.open(save_path, "wb") as fh:
+        mode: str = "wb",
+        hasher: "hashlib._Hash | None" = None,
+    ) -> int:
+        written: int = 0
+        async with aiofiles.open(save_path, mode) as fh:
             async for chunk in response.content.iter_chunked(32 * 1024):
                 await fh.write(chunk)
+                written += len(chunk)
+                if hasher is not None:
+                    hasher.update(chunk)
+        return written
 
-    async def cancel_cleanup(self, url: str, save_path: Path) -> None:
-        progress_manager.remove_all_progress_bars()
+    async def cancel_cleanup(self, url: str, save_path: Path, manifest: SegmentManifest | None = None) -> None:
+        progress_manager.remove_progress_bars(self.media_id)
         await self.close()
+        if manifest is not None:
+            # 續傳模式保留未完成的分段 下次執行從中斷處繼續
+            await manifest.save(force=True)
+            logger.info(f"Download cancelled, keep {Color.fg('denim')}{save_path}{Color.reset()} for resume")
+            return
         try:
             if save_path.exists():
                 save_path.unlink()
@@ -242,6 +400,10 @@ class MediaDownloader:
         track_dir: Path = self.mada_track_dir_path(track_type, track)
         output_file: Path = self.base_dir / f"{track_type}.{container}"
 
+        merger: StreamMerger | None = self._stream_mergers.get(track_type)
+        if merger is not None:
+            return await self.finish_stream_merge(track_type, merger)
+
         init_files: list[Path] = list(track_dir.glob(f"init_{track_type}.*"))
 
         if not init_files:
@@ -295,6 +457,20 @@ class MediaDownloader:
 
         return result
 
+    async def finish_stream_merge(self, track_type: str, merger: StreamMerger) -> bool:
+        """串流合併已在下載途中完成 只需確認所有分段都已接入"""
+        await merger.close()
+        if not merger.complete:
+            logger.warning(f"{track_type} stream merge stopped at segment {merger.next_index}/{merger.total}")
+            return False
+        if track_type == "audio":
+            self.dl_obj.audio = merger.output_file
+        elif track_type == "video":
+            self.dl_obj.video = merger.output_file
+        if merger.decryptor is not None:
+            self.dl_obj.decrypted.add(track_type)
+        return True
+
     async def merge_subtitle_track(
         self,
         track: Union[MediaTrack, HLSVariant, HLSSubTrack, SubtitleTrack],
@@ -327,9 +503,12 @@ class MediaDownloader:
     ) -> bool:
         """建立軌道目錄 先下載 init 再啟動分段下載"""
         track_dir: Path = self.mada_track_dir_path(track_type, track)
+        in_memory: bool = self.memory_buffer > 0 and track_type in ("video", "audio") and bool(track.segment_urls)
+        # 記憶體模式不會產生分段檔 只需要輸出目錄
+        work_dir: Path = self.base_dir if in_memory else track_dir
 
         try:
-            track_dir.mkdir(parents=True, exist_ok=True)
+            work_dir.mkdir(parents=True, exist_ok=True)
         except (FileNotFoundError, OSError) as exc:
             logger.info(
                 f"{Color.bg('firebrick')}The folder name may contain spaces or "
@@ -339,7 +518,7 @@ class MediaDownloader:
             logger.error(exc)
             return False
 
-        if not self.check_download_dir(track_dir):
+        if not self.check_download_dir(work_dir):
             return False
 
         # 下載初始化片段（init segment）
@@ -347,8 +526,26 @@ class MediaDownloader:
         is_init_url: bool = track.init_url.rstrip("/").split("/")[-1].split(".")[0] == "init"
         is_mp4: bool = track.mime_type in ("video/mp4", "audio/mp4", "application/mp4")
 
-        if is_init_url and is_mp4:
-            if not await self.download_file(track.init_url, init_path):
+        manifest: SegmentManifest | None = None
+        if self.resume:
+            manifest = SegmentManifest.load(
+                SegmentManifest.path_for(track_dir),
+                track_type,
+                track.id,
+                track.init_url if is_init_url and is_mp4 and not in_memory else None,
+                track.segment_urls or [],
+            )
+
+        init_data: bytes | None = None
+        if is_init_url and is_mp4 and in_memory:
+            init_data = await self.download_bytes(track.init_url)
+            if init_data is None:
+                logger.error(f"{track_type} initialization file download failed")
+                return False
+        elif is_init_url and is_mp4:
+            if manifest is not None and await manifest.verify(-1, init_path):
+                logger.debug(f"{track_type} initialization file already downloaded")
+            elif not await self.download_file(track.init_url, init_path, manifest, -1):
                 logger.error(f"{track_type} initialization file download failed")
                 return False
 
@@ -358,9 +555,25 @@ class MediaDownloader:
             f"{Color.fg('cyan')}{track.id}{Color.reset()}"
         )
 
+        merger: StreamMerger | None = None
+        if self.stream_merge and track_type in ("video", "audio") and track.segment_urls:
+            merger = StreamMerger(
+                self.base_dir / f"{track_type}.{container}",
+                track_type,
+                len(track.segment_urls),
+                manifest,
+                self.memory_buffer if in_memory else 0,
+                CencDecryptor(self.cenc_keys) if self.cenc_keys else None,
+            )
+            await merger.start(init_data if in_memory else init_path if is_init_url and is_mp4 else None)
+            self._stream_mergers[track_type] = merger
+        elif manifest is not None:
+            # 未啟用串流合併 已刪除的分段必須重新下載
+            manifest.reset_merged()
+
         if track.segment_urls:
             return await self.batch_download_segments(
-                track, track_dir, track_type, progress_manager
+                track, track_dir, track_type, progress_manager, manifest, merger
             )
 
         return True
@@ -371,11 +584,13 @@ class MediaDownloader:
         track_dir: Path,
         track_type: str,
         progress_manager: MultiTrackProgressManager,
+        manifest: SegmentManifest | None = None,
+        merger: StreamMerger | None = None,
     ) -> bool:
-        """並行下載所有分段 透過 semaphore 控制併發數 並即時更新進度條"""
+        """並行下載所有分段 由全域排程器分配連線名額 並即時更新進度條"""
         total: int = len(track.segment_urls)
         success_count: int = 0
-        semaphore: asyncio.Semaphore = asyncio.Semaphore(CFG["VideoDownload"]["semaphore"])
+        owner: str = f"{self.media_id}:{track_type}:{track.id}"
         progress_lock: asyncio.Lock = asyncio.Lock()
 
         progress: DownloadProgress = DownloadProgress(
@@ -389,32 +604,76 @@ class MediaDownloader:
             f"{int(self.video_duration % 60)} sec"
         )
         progress_bar = progress_manager.create_progress_bar(
-            track_type, total, duration_label
+            track_type, total, duration_label, owner=self.media_id
         )
 
+        if manifest is not None and manifest.completed_count():
+            logger.info(
+                f"{Color.fg('light_gray')}Resume {Color.bg('cyan')}{track_type}{Color.reset()} "
+                f"{Color.fg('light_gray')}track: {Color.fg('cyan')}{manifest.completed_count()}/{total}"
+                f"{Color.fg('light_gray')} segments already downloaded{Color.reset()}"
+            )
+
+        in_memory: bool = merger is not None and merger.memory_limit > 0
+
         async def _download_segment(index: int, url: str) -> bool:
-            async with semaphore:
-                seg_path: Path = track_dir / f"seg_{track_type}_{index}{Path(url).suffix}"
-                success: bool = await self.download_file(url, seg_path)
-                async with progress_lock:
-                    progress.completed_segments += 1
-                return success
+            seg_path: Path = track_dir / f"seg_{track_type}_{index}{Path(url).suffix}"
+            segment: Path | bytes | None = seg_path
+            nbytes: int = 0
+            if manifest is not None and await manifest.verify(index, seg_path):
+                success: bool = True
+            elif in_memory:
+                # 先預留緩衝區空間再佔用連線 讓 next_index 的分段永遠拿得到名額
+                try:
+                    await merger.reserve(index)
+                except MergeAborted:
+                    # 前面的分段已永久失敗 這條軌道不可能完成 不再下載
+                    segment = None
+                else:
+                    segment = await self.download_bytes(url, owner)
+                    if segment is None:
+                        await merger.release()
+                success: bool = segment is not None
+                if success:
+                    nbytes = len(segment)
+            else:
+                success: bool = await self.download_file(url, seg_path, manifest, index, owner)
+                if success:
+                    nbytes = seg_path.stat().st_size
+            if nbytes:
+                self.scheduler.record(nbytes)
+            if merger is not None:
+                if success:
+                    await merger.add(index, segment)
+                else:
+                    await merger.fail(index)
+            async with progress_lock:
+                progress.completed_segments += 1
+                progress.current_bytes += nbytes
+            return success
 
         coros = [
             _download_segment(i, url)
             for i, url in enumerate(track.segment_urls)
         ]
 
+        started: float = time.monotonic()
         try:
             for fut in asyncio.as_completed(coros):
                 success: bool = await fut
                 success_count += int(success)
+                elapsed: float = time.monotonic() - started
+                progress.speed_mbps = progress.current_bytes * 8 / elapsed / 1_000_000 if elapsed > 0 else 0.0
+                progress.window = self.scheduler.limit
                 progress_bar.update(download_progress=progress)
         except asyncio.CancelledError:
-            progress_manager.remove_all_progress_bars()
+            progress_manager.remove_progress_bars(self.media_id)
             await self.close()
             logger.info("Download cancelled")
             return False
+        finally:
+            if manifest is not None:
+                await manifest.save(force=True)
 
         return success_count == total
 
@@ -446,7 +705,7 @@ class MediaDownloader:
                         logger.error(f"Track download error: {res}")
 
             if track_tasks:
-                progress_manager.stop()
+                progress_manager.stop(self.media_id)
 
             if paramstore.get("skip_merge") is True:
                 logger.info(
@@ -523,6 +782,7 @@ class Start_Download_Queue:
         raw_mpd: ClientResponse,
         raw_hls: str,
         input_community_name: str,
+        mpd_content: MPDContent | None = None,
     ) -> None:
         self.decryption_key: list[str] = decryption_key
         self.public_info: PublicInfo = public_info
@@ -530,6 +790,7 @@ class Start_Download_Queue:
         self.raw_mpd: ClientResponse = raw_mpd
         self.raw_hls: str = raw_hls
         self.input_community_name: str = input_community_name
+        self.mpd_content: MPDContent | None = mpd_content
         self._community_name: str = None
         self._custom_community_name: str = None
         self.dl_obj: DownloadObjection = None
@@ -581,7 +842,9 @@ class Start_Download_Queue:
         playlist_content: MediaTrack | HLSVariant | HLSSubTrack | SubtitleTrack,
         savejsondata: save_json_data,
     ) -> tuple[bool, DownloadObjection]:
-        self.downloader: MediaDownloader = MediaDownloader(self.public_info.media_id, output_dir, self.playback_info.duration, savejsondata)
+        self.downloader: MediaDownloader = MediaDownloader(
+            self.public_info.media_id, output_dir, self.playback_info.duration, savejsondata, self.decryption_key
+        )
         success, dl_obj = await self.downloader.download_content(playlist_content)
         return success, dl_obj
 
@@ -621,13 +884,32 @@ class Start_Download_Queue:
             if paramstore.get("subs_only") is True:
                 SubtitleProcessor.print_subtitle_info(self.dl_obj)
             elif not paramstore.get("subs_only"):
-                await self.vv.re_name_folder(video_file_name, mux_bool_status)
+                final_dir: Path | None = await self.vv.re_name_folder(video_file_name, mux_bool_status)
+                await self.record_completed(final_dir, video_file_name, mux_bool_status)
             else:
                 raise RuntimeError("Unexpected error")
         else:
             logger.error("Failed to create output directory.")
             raise ValueError("No output directory")
 
+    async def record_completed(self, final_dir: Path | None, video_file_name: str, mux_bool_status: bool) -> None:
+        """混流與重新命名都成功才寫入下載紀錄"""
+        if mux_bool_status is not True or not video_file_name.endswith(f".{container}"):
+            return
+        if any(paramstore.get(flag) is True for flag in ("nodl", "skip_merge", "skip_mux", "video_dl_cancelled")):
+            return
+        media_id: str = str(self.public_info.media_id)
+        media_type: str | None = self.public_info.media_type
+        community_id: int | None = self.public_info.community_id
+        video_path: Path | None = None if final_dir is None else final_dir / video_file_name
+        if video_path is not None and video_path.is_file():
+            await uuid_store.mark_file_done(
+                media_id, media_type, community_id, video_path, checksum=get_settings().video.ledger_checksum
+            )
+        else:
+            # 不扁平化時同名檔案可能被改名 找不到成品仍記為完成
+            uuid_store.mark_done(media_id, media_type, community_id)
+
     async def run_dl(self) -> Never:
         start_time = None
         end_time = None
@@ -639,9 +921,11 @@ class Start_Download_Queue:
         if paramstore.get("end_time") is not None:
             end_time: float = self._video_start2end_time(paramstore.get("end_time"))
             
-        hls_content: HLSContent = await HLS_Paser().parse_playlist(self.raw_hls, self.playback_info.hls_playback_url)
-        mpd_parser: MPDParser = MPDParser(self.raw_mpd, self.playback_info.dash_playback_url)
-        mpd_content: MediaTrack | HLSVariant | HLSSubTrack | SubtitleTrack = await mpd_parser.parse_all_tracks()
+        # 先只解析 master playlist 選好軌道後才取得對應的 media playlist
+        hls_content: HLSContent = await HLS_Paser().parse_playlist(self.raw_hls, self.playback_info.hls_playback_url, fetch_segments=False)
+        mpd_content: MPDContent | None = self.mpd_content
+        if mpd_content is None:
+            mpd_content = await MPDParser(self.raw_mpd, self.playback_info.dash_playback_url).parse_all_tracks()
 
         if self.playback_info.drm_info is None or self.playback_info.drm_info == {}:
             selector: PlaylistSelector = PlaylistSelector(hls_content, mpd_content, "all", start_time, end_time)
@@ -650,7 +934,9 @@ class Start_Download_Queue:
             
         match paramstore.get("get_v_list"):
             case True:
-                PlaylistSelector(hls_content, mpd_content, "all", start_time, end_time).print_parsed_content()
+                list_selector: PlaylistSelector = PlaylistSelector(hls_content, mpd_content, "all", start_time, end_time)
+                await list_selector.resolve_all_hls()
+                list_selector.print_parsed_content()
             case _:
                 if paramstore.get("subs_only") is True:
                     playlist_content: HLSSubTrack | SubtitleTrack = await selector.select_tracks("None", "None", "H264", paramstore.get("slang"))
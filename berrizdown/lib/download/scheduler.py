@@ -0,0 +1,204 @@
+import asyncio
+import random
+import time
+from collections import defaultdict, deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from berrizdown.lib.settings import get_settings
+from berrizdown.unit.handle.handle_log import setup_logging
+from berrizdown.unit.http.transport import MEDIA, transport
+
+logger = setup_logging("scheduler", "peach")
+
+
+class AIMDController:
+    """依實測吞吐量調整同時下載數 吞吐量仍在成長就加一 遇到逾時 429 5xx 就減半"""
+
+    INTERVAL: float = 1.0
+    GAIN: float = 1.05
+
+    def __init__(self, window: int, minimum: int, maximum: int) -> None:
+        self.minimum: int = max(1, minimum)
+        self.maximum: int = max(self.minimum, maximum)
+        self.window: float = float(min(max(window, self.minimum), self.maximum))
+        self.mbps: float = 0.0
+        self._prev_mbps: float = 0.0
+        self._bytes: int = 0
+        self._t0: float = time.monotonic()
+        self._last_cut: float = 0.0
+
+    def on_bytes(self, nbytes: int) -> bool:
+        """累積傳輸量 每個取樣區間結束時決定是否擴大 window 回傳 window 是否變大"""
+        self._bytes += nbytes
+        now: float = time.monotonic()
+        elapsed: float = now - self._t0
+        if elapsed < self.INTERVAL:
+            return False
+        sample: float = self._bytes * 8 / elapsed / 1_000_000
+        self.mbps = sample if self.mbps == 0 else 0.5 * self.mbps + 0.5 * sample
+        self._bytes = 0
+        self._t0 = now
+
+        climbing: bool = self.mbps > self._prev_mbps * self.GAIN
+        self._prev_mbps = self.mbps
+        if not climbing or now - self._last_cut < self.INTERVAL or self.window >= self.maximum:
+            return False
+        self.window = min(self.maximum, self.window + 1)
+        return True
+
+    def on_congestion(self) -> None:
+        """同一個取樣區間內只減半一次 避免同批失敗把 window 壓到底"""
+        now: float = time.monotonic()
+        if now - self._last_cut < self.INTERVAL:
+            return
+        self._last_cut = now
+        self.window = max(self.minimum, self.window / 2)
+        # 減半前的吞吐量已不具參考價值 從新的 window 重新取樣
+        self.mbps = 0.0
+        self._prev_mbps = 0.0
+        self._bytes = 0
+        self._t0 = now
+
+
+class SegmentScheduler:
+    """行程內共用的分段下載排程器 所有軌道與媒體共用同一個 session 與連線預算
+
+    每個 owner (媒體 + 軌道) 各自排隊 空出的名額優先給目前佔用最少的 owner
+    同一 host 的同時連線數另有上限
+    """
+
+    BACKOFF_CAP: float = 30.0
+
+    def __init__(self, limit: int, per_host: int, per_owner: int, adaptive: bool = False) -> None:
+        self.max_limit: int = max(1, limit)
+        self.per_host: int = max(1, per_host)
+        self.per_owner: int = max(1, per_owner)
+        # 自適應模式由 window 決定總量 單一軌道可用滿整個 window
+        self.controller: AIMDController | None = (
+            AIMDController(self.per_owner, 1, self.max_limit) if adaptive else None
+        )
+        if self.controller is not None:
+            self.per_owner = self.max_limit
+        self._active: int = 0
+        self._host_active: defaultdict[str, int] = defaultdict(int)
+        self._owner_active: defaultdict[str, int] = defaultdict(int)
+        self._waiters: dict[str, deque[tuple[str, asyncio.Future]]] = {}
+
+    @property
+    def limit(self) -> int:
+        if self.controller is not None:
+            return int(self.controller.window)
+        return self.max_limit
+
+    @property
+    def mbps(self) -> float:
+        return self.controller.mbps if self.controller is not None else 0.0
+
+    def record(self, nbytes: int) -> None:
+        """回報完成的傳輸量 window 擴大時立即分派等待中的請求"""
+        if self.controller is not None and self.controller.on_bytes(nbytes):
+            self._dispatch()
+
+    def congestion(self) -> None:
+        """回報逾時或 429 / 5xx"""
+        if self.controller is not None:
+            self.controller.on_congestion()
+
+    def backoff(self, attempt: int, retry_after: float | None = None) -> float:
+        """指數退避加上隨機抖動 伺服器指定 Retry-After 時至少等待該秒數"""
+        delay: float = min(self.BACKOFF_CAP, 2 ** (attempt + 1)) * random.uniform(0.5, 1.0)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.BACKOFF_CAP * 4))
+        return delay
+
+    async def session(self) -> aiohttp.ClientSession:
+        """取得分段下載用的共用 session 所有媒體與軌道共用同一組連線"""
+        return transport.session(MEDIA)
+
+    async def close(self) -> None:
+        """所有下載結束後關閉共用 session"""
+        await transport.close(MEDIA)
+
+    @asynccontextmanager
+    async def slot(self, owner: str, url: str) -> AsyncIterator[None]:
+        """取得一個下載名額 離開時歸還並分派給下一個 owner"""
+        host: str = urlsplit(url).netloc
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(owner, deque()).append((host, future))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release(owner, host)
+            else:
+                self._discard(owner, host, future)
+            raise
+        try:
+            yield
+        finally:
+            self._release(owner, host)
+
+    def _acquire(self, owner: str, host: str) -> None:
+        self._active += 1
+        self._host_active[host] += 1
+        self._owner_active[owner] += 1
+
+    def _release(self, owner: str, host: str) -> None:
+        self._active -= 1
+        self._host_active[host] -= 1
+        self._owner_active[owner] -= 1
+        if self._host_active[host] <= 0:
+            del self._host_active[host]
+        if self._owner_active[owner] <= 0:
+            del self._owner_active[owner]
+        self._dispatch()
+
+    def _discard(self, owner: str, host: str, future: asyncio.Future) -> None:
+        queue: deque[tuple[str, asyncio.Future]] | None = self._waiters.get(owner)
+        if queue is None:
+            return
+        try:
+            queue.remove((host, future))
+        except ValueError:
+            pass
+        if not queue:
+            del self._waiters[owner]
+
+    def _dispatch(self) -> None:
+        """依公平順序分派空出的名額 每個 owner 取佇列中第一個 host 未滿的請求"""
+        while self._active < self.limit:
+            candidates: list[tuple[int, str, int]] = []
+            for owner, queue in self._waiters.items():
+                if self._owner_active.get(owner, 0) >= self.per_owner:
+                    continue
+                for pos, (host, _) in enumerate(queue):
+                    if self._host_active.get(host, 0) < self.per_host:
+                        candidates.append((self._owner_active.get(owner, 0), owner, pos))
+                        break
+            if not candidates:
+                return
+
+            _, owner, pos = min(candidates, key=lambda c: c[0])
+            queue = self._waiters[owner]
+            host, future = queue[pos]
+            del queue[pos]
+            if not queue:
+                del self._waiters[owner]
+            # 等待者已取消 不佔用名額
+            if future.done():
+                continue
+            self._acquire(owner, host)
+            future.set_result(None)
+
+
+download_scheduler: SegmentScheduler = SegmentScheduler(
+    get_settings().video.global_concurrency,
+    get_settings().video.global_limit_per_host,
+    get_settings().video.semaphore,
+    get_settings().video.adaptive_concurrency,
+)
@@ -0,0 +1,229 @@
+import asyncio
+import hashlib
+import os
+import time
+from dataclasses import asdict, dataclass
+from urllib.parse import urlsplit
+
+import orjson
+
+from berrizdown.lib.path import Path
+from berrizdown.unit.handle.handle_log import setup_logging
+
+logger = setup_logging("segment_manifest", "peach")
+
+
+PENDING = "pending"
+PARTIAL = "partial"
+DONE = "done"
+MERGED = "merged"
+
+
+def _url_key(url: str) -> str:
+    """CDN 簽名參數每次都會變動 只用路徑判斷是否為同一分段"""
+    return urlsplit(url).path
+
+
+@dataclass
+class SegmentEntry:
+    index: int
+    url: str
+    size: int | None = None
+    status: str = PENDING
+    sha256: str | None = None
+
+
+class SegmentManifest:
+    """單一軌道的分段下載紀錄 存放於 track_dir 旁 讓中斷的下載可以續傳"""
+
+    VERSION: int = 1
+    SAVE_EVERY: int = 32
+    SAVE_INTERVAL: float = 2.0
+
+    def __init__(self, path: Path, track_type: str, track_id: str) -> None:
+        self.path: Path = path
+        self.track_type: str = track_type
+        self.track_id: str = str(track_id)
+        self.init: SegmentEntry | None = None
+        self.entries: dict[int, SegmentEntry] = {}
+        self.merged_bytes: int = 0
+        # 輸出檔內容是否已在合併時解密 續傳時兩種內容不能混用
+        self.merge_mode: str = "plain"
+        self._dirty: int = 0
+        self._last_save: float = time.monotonic()
+        self._save_lock: asyncio.Lock = asyncio.Lock()
+
+    @staticmethod
+    def path_for(track_dir: Path) -> Path:
+        return track_dir.with_name(f"{track_dir.name}.manifest.json")
+
+    @classmethod
+    def load(cls, path: Path, track_type: str, track_id: str, init_url: str | None, segment_urls: list[str]) -> "SegmentManifest":
+        """讀取既有紀錄 只保留 URL 路徑相同的分段狀態"""
+        manifest: SegmentManifest = cls(path, track_type, track_id)
+        previous: dict[str, dict] = {}
+        if path.exists():
+            try:
+                raw: dict = orjson.loads(path.read_bytes())
+                if raw.get("version") == cls.VERSION and raw.get("track_id") == manifest.track_id:
+                    previous = {str(e["index"]): e for e in raw.get("segments", [])}
+                    if raw.get("init"):
+                        previous["init"] = raw["init"]
+                    manifest.merged_bytes = int(raw.get("merged_bytes", 0))
+                    manifest.merge_mode = raw.get("merge_mode", "plain")
+                else:
+                    logger.info(f"Manifest {path.name} belongs to another track, starting over")
+            except (OSError, orjson.JSONDecodeError, KeyError, TypeError) as e:
+                logger.warning(f"Ignore broken manifest {path}: {e}")
+
+        if init_url:
+            manifest.init = manifest._merge_entry(-1, init_url, previous.get("init"))
+        for index, url in enumerate(segment_urls):
+            manifest.entries[index] = manifest._merge_entry(index, url, previous.get(str(index)))
+        if manifest.merged_prefix() == 0:
+            manifest.reset_merged()
+        return manifest
+
+    @staticmethod
+    def _merge_entry(index: int, url: str, old: dict | None) -> SegmentEntry:
+        if old and _url_key(old.get("url", "")) == _url_key(url):
+            return SegmentEntry(index, url, old.get("size"), old.get("status", PENDING), old.get("sha256"))
+        return SegmentEntry(index, url)
+
+    def entry(self, index: int) -> SegmentEntry:
+        return self.init if index < 0 else self.entries[index]
+
+    def is_complete(self, index: int, save_path: Path) -> bool:
+        """紀錄為完成 且磁碟上的檔案大小與預期一致"""
+        entry: SegmentEntry = self.entry(index)
+        if entry is not None and entry.status == MERGED:
+            # 已接入輸出檔 分段檔案本身已刪除
+            return True
+        if entry is None or entry.status != DONE:
+            return False
+        try:
+            return entry.size is None or save_path.stat().st_size == entry.size
+        except FileNotFoundError:
+            return False
+
+    async def verify(self, index: int, save_path: Path) -> bool:
+        """續傳略過分段前 除了大小也比對紀錄的 sha256 內容不符時重設為 pending 重新下載"""
+        if not self.is_complete(index, save_path):
+            return False
+        entry: SegmentEntry = self.entry(index)
+        if entry.status == MERGED or entry.sha256 is None:
+            return True
+        try:
+            hasher = await sha256_of_prefix(save_path, save_path.stat().st_size)
+        except OSError:
+            hasher = None
+        if hasher is not None and hasher.hexdigest() == entry.sha256:
+            return True
+        logger.warning(f"Checksum mismatch, re-download segment: {save_path.name}")
+        self.reset(index)
+        return False
+
+    def completed_count(self) -> int:
+        return sum(1 for e in self.entries.values() if e.status in (DONE, MERGED))
+
+    def merged_prefix(self) -> int:
+        """從頭開始連續已接入輸出檔的分段數"""
+        count: int = 0
+        while count in self.entries and self.entries[count].status == MERGED:
+            count += 1
+        return count
+
+    def mark_merged(self, index: int, merged_bytes: int) -> None:
+        self.entry(index).status = MERGED
+        self.merged_bytes = merged_bytes
+        self._dirty += 1
+
+    def reset_merged(self) -> None:
+        """輸出檔遺失或不再使用串流合併時 已合併的分段只能重新下載"""
+        changed: bool = self.merged_bytes != 0
+        for entry in self.entries.values():
+            if entry.status == MERGED:
+                entry.status = PENDING
+                entry.size = None
+                entry.sha256 = None
+                changed = True
+        if changed:
+            self.merged_bytes = 0
+            self._dirty += 1
+
+    def mark_partial(self, index: int, size: int | None) -> None:
+        entry: SegmentEntry = self.entry(index)
+        entry.status = PARTIAL
+        if size is not None:
+            entry.size = size
+        self._dirty += 1
+
+    def mark_done(self, index: int, size: int, sha256: str) -> None:
+        entry: SegmentEntry = self.entry(index)
+        entry.status = DONE
+        entry.size = size
+        entry.sha256 = sha256
+        self._dirty += 1
+
+    def reset(self, index: int) -> None:
+        entry: SegmentEntry = self.entry(index)
+        entry.status = PENDING
+        entry.size = None
+        entry.sha256 = None
+        self._dirty += 1
+
+    def _to_bytes(self) -> bytes:
+        return orjson.dumps(
+            {
+                "version": self.VERSION,
+                "track_type": self.track_type,
+                "track_id": self.track_id,
+                "init": asdict(self.init) if self.init else None,
+                "merged_bytes": self.merged_bytes,
+                "merge_mode": self.merge_mode,
+                "segments": [asdict(e) for e in self.entries.values()],
+            }
+        )
+
+    def _write(self, data: bytes) -> None:
+        tmp: Path = self.path.with_name(f"{self.path.name}.tmp")
+        with open(tmp, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp, self.path)
+
+    async def save(self, force: bool = False) -> None:
+        """累積足夠變更或超過間隔時才寫入 避免每個分段都重寫一次紀錄檔"""
+        if not self._dirty:
+            return
+        if not force and self._dirty < self.SAVE_EVERY and time.monotonic() - self._last_save < self.SAVE_INTERVAL:
+            return
+        async with self._save_lock:
+            if not self._dirty:
+                return
+            self._dirty = 0
+            self._last_save = time.monotonic()
+            try:
+                await asyncio.to_thread(self._write, self._to_bytes())
+            except OSError as e:
+                logger.warning(f"Failed to save manifest {self.path}: {e}")
+
+    def unlink(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+async def sha256_of_prefix(path: Path, length: int) -> "hashlib._Hash":
+    """續傳時先將既有內容餵入 hasher 讓最終雜湊涵蓋整個檔案"""
+
+    def _read() -> "hashlib._Hash":
+        hasher = hashlib.sha256()
+        remaining: int = length
+        with open(path, "rb") as fh:
+            while remaining > 0:
+                chunk: bytes = fh.read(min(remaining, 1024 * 1024))
+                if not chunk:
+                    break
+                hasher.update(chunk)
+                remaining -= len(chunk)
+        return hasher
+
+    return await asyncio.to_thread(_read)
@@ -15,6 +15,7 @@ from berrizdown.unit.community.community import custom_dict, get_community
 from berrizdown.unit.handle.handle_board_from import BoardMain
 from berrizdown.unit.handle.handle_choice import Handle_Choice
 from berrizdown.unit.handle.handle_log import setup_logging
+from berrizdown.unit.http.context_loader import context_loader
 from berrizdown.unit.http.request_berriz_api import (
     Arits,
     BerrizAPIClient,
@@ -439,7 +440,8 @@ class Media:
 
     async def request_publicinfo(self) -> Public_context:
         data: dict = {}
-        data: dict[str, Any] = await self.public_context.get_public_context(self.segments[-1], use_proxy)
+        # 之後下載同一媒體時直接使用快取 不再重複請求
+        data: dict[str, Any] = await context_loader.public(self.segments[-1], use_proxy)
         if data[0].get("code") == "0000":
             return data
         else:
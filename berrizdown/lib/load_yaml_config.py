@@ -1,20 +1,17 @@
-import asyncio
 from logging import config
 import os
 import re
-import subprocess
 import sys
 from functools import lru_cache
 from typing import Any
 from urllib.parse import urlparse
 
-import aiofiles
 import rich.traceback
 from email_validator import EmailNotValidError, validate_email
-from ruamel.yaml import YAML
 
 from berrizdown.key.cdm_path import CDM_PATH
 from berrizdown.static.color import Color
+from berrizdown.static.config_file import read_config
 from berrizdown.static.parameter import paramstore
 from berrizdown.static.route import Route
 from berrizdown.static.version import __version__
@@ -32,29 +29,15 @@ DEFAULT_UA = f"Berrizdown / {__version__}"
 
 
 def check_email(email_str: str) -> bool:
+    # 只檢查格式 不做 DNS 查詢 每次啟動都不需要等網路
     try:
-        validate_email(email_str)
+        validate_email(email_str, check_deliverability=False)
         return True
     except EmailNotValidError as e:
         logger.error(f"Mail invaild:  '{email_str}' | {e}")
         return False
 
 
-def _check_tool_version(command_list: list) -> bool:
-    try:
-        result = subprocess.run(
-            command_list,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-            check=False,
-        )
-        return result.returncode == 0
-    except FileNotFoundError:
-        return False
-    except Exception:
-        return False
-
-
 class ConfigLoader:
     @classmethod
     @lru_cache(maxsize=1)
@@ -62,7 +45,7 @@ class ConfigLoader:
         if not os.path.exists(path):
             raise FileNotFoundError(f"Config file not found: {path}")
         """同步介面，快取並返回完整、驗證過的 config 字典"""
-        config = asyncio.run(cls._load_async(path))
+        config = read_config(path)
         try:
             cls.check_cfg(config)
         except Exception as e:
@@ -70,19 +53,6 @@ class ConfigLoader:
             sys.exit(1)
         return config
 
-    @staticmethod
-    async def _load_async(path: Path) -> dict:
-        if not path.exists():
-            raise FileNotFoundError(f"Config file not found: {path}")
-
-        async with aiofiles.open(path, encoding="utf-8") as f:
-            raw = await f.read()
-
-        try:
-            return YAML().load(raw)
-        except ValueError as e:
-            raise ValueError(f"Failed to parse YAML: {e}")
-
     @staticmethod
     def print_warning(invaild_message: str, invaild_value: Any, correct_message: str) -> None:
         logger.warning(
@@ -227,6 +197,8 @@ class ConfigLoader:
                 if _is_shaka_packager(value):
                     cont[field_name] = "SHAKA_PACKAGER"
                     # cont[field_name] = "mp4decrypt"
+                elif value.strip().lower() == "native":
+                    cont[field_name] = "NATIVE"
                 continue
             # Validate against allowed values
             if config_rules["allowed"]:
@@ -234,6 +206,15 @@ class ConfigLoader:
                     allowed_str = ", ".join(config_rules["allowed"])
                     raise ValueError(f"Container.{field_name} must be one of: {allowed_str}")
 
+        max_processes = cont.get("max_processes", 0)
+        if not isinstance(max_processes, int) or isinstance(max_processes, bool) or max_processes < 0:
+            ConfigLoader.print_warning("Container.max_processes", max_processes, "0")
+            cont["max_processes"] = 0
+
+        if not isinstance(cont.get("fused-decrypt", True), bool):
+            ConfigLoader.print_warning("Container.fused-decrypt", cont.get("fused-decrypt"), "true")
+            cont["fused-decrypt"] = True
+
         tools = ["mp4decrypt", "shaka-packager", "mkvmerge"]
         for key in tools:
             if not isinstance(cont.get(key), str):
@@ -592,13 +573,14 @@ class ConfigLoader:
             "use_dns_cache",
         )
         should_float: tuple[str, ...] = ("base_sleep", "max_sleep")
+        should_str_list: tuple[str, ...] = ("http2_hosts",)
 
         berriz = config.get("BerrizAPIClient", {})
 
         if not isinstance(berriz, dict):
             raise ValueError("BerrizAPIClient must be a dict")
 
-        allowed_keys: set[str] = set(should_int) | set(should_bool) | set(should_float)
+        allowed_keys: set[str] = set(should_int) | set(should_bool) | set(should_float) | set(should_str_list)
 
         extra_keys = [k for k in berriz.keys() if k not in allowed_keys]
         if extra_keys:
@@ -617,6 +599,9 @@ class ConfigLoader:
                 # accept float or int
                 if not (isinstance(v, float) or (isinstance(v, int) and not isinstance(v, bool))):
                     errors.append(f"'{k}' should be float (got {type(v).__name__})")
+            elif k in should_str_list:
+                if v is not None and not (isinstance(v, list) and all(isinstance(i, str) for i in v)):
+                    errors.append(f"'{k}' should be a list of str (got {type(v).__name__})")
 
         if errors:
             raise ValueError("Type errors in BerrizAPIClient: " + "; ".join(errors))
@@ -635,16 +620,20 @@ class ConfigLoader:
             "max_retries",
             "semaphore",
             "connector_ttl_dns_cache",
+            "segment_memory_buffer_mb",
+            "global_concurrency",
+            "global_limit_per_host",
         )
-        should_bool: tuple[str, ...] = ("connector_use_dns_cache",)
+        should_bool: tuple[str, ...] = ("connector_use_dns_cache", "resume", "stream_merge", "adaptive_concurrency", "pipeline_decrypt", "ledger_checksum")
         should_float: tuple[str, ...] = ()
+        should_str_list: tuple[str, ...] = ("http2_hosts",)
 
         video = config.get("VideoDownload", {})
 
         if not isinstance(video, dict):
             raise ValueError("VideoDownload must be a dict")
 
-        allowed_keys: set[str] = set(should_int) | set(should_bool) | set(should_float)
+        allowed_keys: set[str] = set(should_int) | set(should_bool) | set(should_float) | set(should_str_list)
 
         extra = [k for k in video.keys() if k not in allowed_keys]
         if extra:
@@ -662,6 +651,9 @@ class ConfigLoader:
             elif k in should_float:
                 if not (isinstance(v, float) or (isinstance(v, int) and not isinstance(v, bool))):
                     errors.append(f"'{k}' should be float (got {type(v).__name__})")
+            elif k in should_str_list:
+                if v is not None and not (isinstance(v, list) and all(isinstance(i, str) for i in v)):
+                    errors.append(f"'{k}' should be a list of str (got {type(v).__name__})")
 
         if errors:
             raise ValueError("Type errors in VideoDownload: " + "; ".join(errors))
@@ -730,6 +722,9 @@ CFG = ConfigLoader.load()
 
 # By edit tools {} remove or add tools to bypass tools_check()
 def tools_check() -> None:
+    # tool_registry 依執行檔 mtime/size 快取路徑與版本 執行檔沒變時不會再執行 --version
+    from berrizdown.lib.mux.tool_registry import tool_registry
+
     R = Route()
     
     R.mp4decrypt_path.parent.mkdir(parents=True, exist_ok=True)
@@ -741,32 +736,20 @@ def tools_check() -> None:
         "ffmpeg": R.ffmpeg,
         "ffprobe": R.ffprobe,
     }
-    if _check_tool_version(["mkvmerge", "--version"]):
-        # 版本檢查成功，不再需要檢查路徑
-        paramstore._store["mkvmerge_path_ok"] = True
-        tools.pop("mkvmerge", None)
     if CFG["Container"]["mux"] == "mkvtoolnix":
         tools.pop("ffmpeg", None)
     elif CFG["Container"]["mux"] == "ffmpeg":
         tools.pop("mkvmerge", None)
-    if _check_tool_version(["ffmpeg", "-version"]):
-        # 版本檢查成功，不再需要檢查路徑
-        paramstore._store["ffmpeg_path_ok"] = True
-        tools.pop("ffmpeg", None)
-    if _check_tool_version(["ffprobe", "-version"]):
-        # 版本檢查成功，不再需要檢查路徑
-        paramstore._store["ffprobe_path_ok"] = True
-        tools.pop("ffprobe", None)
-    if _check_tool_version(["packager", "--version"]):
-        # 版本檢查成功，不再需要檢查路徑
-        paramstore._store["packager_path_ok"] = True
-        tools.pop("packager", None)
     if CFG["Container"]["decryption-engine"] == "mp4decrypt":
         tools.pop("packager", None)
     elif CFG["Container"]["decryption-engine"] == "SHAKA_PACKAGER":
         tools.pop("mp4decrypt", None)
+    elif CFG["Container"]["decryption-engine"] == "NATIVE":
+        # 行程內解密 不需要外部解密工具
+        tools.pop("packager", None)
+        tools.pop("mp4decrypt", None)
 
-    missing = {name: path for name, path in tools.items() if not os.path.exists(path)}
+    missing = {name: path for name, path in tools.items() if not tool_registry.get(name).ok}
 
     if missing:
         # 確保在報錯時版本檢查失敗但存在於路徑中的工具也會被列出
@@ -793,8 +776,11 @@ def tools_check() -> None:
         raise FileNotFoundError(f"Required tools {', '.join(missing)} not found exit. Please manuel create tools folder and put executable file into tools folder.")
 
 
-try:
-    tools_check()
-except FileNotFoundError as e:
-    logger.info(e)
-    sys.exit(1)
+@lru_cache(maxsize=1)
+def ensure_tools() -> None:
+    """第一次需要外部工具 (mux 解密 ffprobe) 時才檢查 之後不再執行"""
+    try:
+        tools_check()
+    except FileNotFoundError as e:
+        logger.info(e)
+        sys.exit(1)
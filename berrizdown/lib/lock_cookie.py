@@ -1,11 +1,11 @@
-import asyncio
-
 from berrizdown.cookies.cookies import Berriz_cookie
 
 
 class Lock_Cookie:
     """一個用於異步獲取並鎖定 Cookie 會話的類別"""
 
+    _session: dict[str, str] | None = None
+
     @staticmethod
     async def cookie_session(clear=False) -> dict[str, str]:
         """異步獲取 Berriz 的 cookies"""
@@ -17,5 +17,9 @@ class Lock_Cookie:
                 return {}
         return {}
 
-
-cookie_session: dict[str, str] = asyncio.run(Lock_Cookie.cookie_session())
+    @classmethod
+    async def session(cls) -> dict[str, str]:
+        """第一次需要 cookie 時才載入 之後回傳同一個 dict (--help -nc 等不需要 cookie 的流程不會讀取)"""
+        if cls._session is None:
+            cls._session = await cls.cookie_session()
+        return cls._session
@@ -1,20 +1,35 @@
+from __future__ import annotations
+
 import asyncio
-import shutil
+import errno
+import os
+from typing import TYPE_CHECKING
 
 import aiofiles
 from rich.progress import BarColumn, DownloadColumn, Progress, SpinnerColumn, TextColumn
 
 from berrizdown.lib.path import Path
 from berrizdown.lib.load_yaml_config import CFG
+from berrizdown.lib.mux.cenc import CencDecryptor, CencError
 from berrizdown.static.color import Color
 from berrizdown.unit.handle.handle_log import setup_logging
 
+if TYPE_CHECKING:
+    from berrizdown.lib.download.segment_manifest import SegmentManifest
+
 logger = setup_logging("merge", "blush")
 
 
+class MergeAborted(RuntimeError):
+    """有分段永久失敗 串流合併無法再前進"""
+
+
 class MERGE:
-    MAX_CONCURRENCY: int = 4
     BUFFER_SIZE: int = 4 * 1024 * 1024
+    # 跨檔案系統或核心不支援時 改用下一種複製方式
+    _FALLBACK_ERRNOS: frozenset[int] = frozenset(
+        {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF, errno.EPERM, errno.ENOTSUP}
+    )
     
     @staticmethod
     async def save_subtitle(
@@ -38,15 +53,8 @@ class MERGE:
         segments: list[Path],
         track_type: str,
     ) -> bool:
-        temp_dir: Path = output_file.parent / f"temp_merging_{track_type}"
-        temp_dir.mkdirp()
-
+        """依序將 init 與所有分段直接寫入輸出檔 不再經過 chunk 暫存檔"""
         try:
-            # MPD init file
-            if init_files:
-                await asyncio.to_thread(shutil.copyfile, init_files[0], output_file)
-                logger.debug(f"{track_type} init file copied")
-
             # 預先收集 size 避免後續重複 stat()
             seg_info: list[tuple[Path, int]] = [(p, p.stat().st_size) for p in segments]
             total_bytes: float = sum(size for _, size in seg_info)
@@ -59,76 +67,258 @@ class MERGE:
                 TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
             )
 
-            # 分塊
-            chunk_size: int = 50
-            chunks: list[list[tuple[Path, int]]] = [seg_info[i : i + chunk_size] for i in range(0, len(seg_info), chunk_size)]
-
-            semaphore: asyncio.Semaphore = asyncio.Semaphore(MERGE.MAX_CONCURRENCY)
-
-            async def process_chunk(idx, chunk):
+            def merge_all() -> None:
+                fd: int = MERGE.open_output(output_file, truncate=True)
                 try:
-                    async with semaphore:
-                        return await MERGE.process_chunk_python(chunk, temp_dir / f"chunk_{idx}.tmp", progress, task_id, idx)
-                except asyncio.CancelledError:
-                    return False
+                    # MPD init file
+                    if init_files:
+                        MERGE.copy_into(init_files[0], fd)
+                        logger.debug(f"{track_type} init file copied")
+                    for seg, size in seg_info:
+                        MERGE.copy_into(seg, fd)
+                        progress.update(task_id, advance=size)
+                finally:
+                    os.close(fd)
 
             with progress:
                 task_id = progress.add_task(f"[cyan]{track_type}[/] merging", total=total_bytes)
                 try:
-                    results: asyncio.Task = await asyncio.gather(
-                        *[process_chunk(idx, chunk) for idx, chunk in enumerate(chunks)],
-                        return_exceptions=True,
-                    )
+                    await asyncio.to_thread(merge_all)
                 except asyncio.CancelledError:
                     return False
 
-                for idx, result in enumerate(results):
-                    if isinstance(result, Exception):
-                        logger.error(f"{track_type} chunk {idx} failed: {result}")
-                        shutil.rmtree(temp_dir, ignore_errors=True)
-                        return False
-
-            # 合併所有 chunk
-            with open(output_file, "ab") as outfile:
-                for idx in range(len(chunks)):
-                    temp_file = temp_dir / f"chunk_{idx}.tmp"
-                    if not temp_file.exists():
-                        continue
-                    try:
-                        with open(temp_file, "rb") as infile:
-                            shutil.copyfileobj(infile, outfile, length=MERGE.BUFFER_SIZE)
-                    except KeyboardInterrupt:
-                        return False
-
-            shutil.rmtree(temp_dir, ignore_errors=True)
             logger.info(f"{Color.fg('light_gray')}{track_type} {Color.fg('sienna')}Merger completed: {Color.fg('ash_gray')}{output_file}{Color.reset()}")
             return True
 
         except Exception as e:
             logger.error(f"{track_type} Merger failed: {str(e)}")
-            shutil.rmtree(temp_dir, ignore_errors=True)
             return False
 
     @staticmethod
-    async def process_chunk_python(
-        segments: list[tuple[Path, int]],
-        temp_file: Path,
-        progress: Progress,
-        task_id: int,
-        chunk_idx: int,
-    ) -> bool:
+    def open_output(output_file: Path, truncate: bool = False) -> int:
+        """copy_file_range 不接受 O_APPEND 的目標 改為開啟後自行移到檔尾"""
+        flags: int = os.O_WRONLY | os.O_CREAT | getattr(os, "O_BINARY", 0)
+        if truncate:
+            flags |= os.O_TRUNC
+        fd: int = os.open(output_file, flags, 0o644)
+        os.lseek(fd, 0, os.SEEK_END)
+        return fd
+
+    @staticmethod
+    def write_all(data: bytes, dst_fd: int) -> int:
+        """將記憶體中的分段完整寫入 dst_fd 目前位置"""
+        view = memoryview(data)
+        while view:
+            view = view[os.write(dst_fd, view):]
+        return len(data)
+
+    @staticmethod
+    def copy_into(src: Path, dst_fd: int) -> int:
+        """將 src 接到 dst_fd 目前位置 優先使用 copy_file_range / sendfile 由核心完成複製"""
+        with open(src, "rb") as infile:
+            src_fd: int = infile.fileno()
+            size: int = os.fstat(src_fd).st_size
+            copied: int = 0
+
+            if hasattr(os, "copy_file_range"):
+                try:
+                    while copied < size:
+                        n: int = os.copy_file_range(src_fd, dst_fd, size - copied)
+                        if n == 0:
+                            break
+                        copied += n
+                except OSError as e:
+                    if e.errno not in MERGE._FALLBACK_ERRNOS:
+                        raise
+
+            if copied < size and hasattr(os, "sendfile"):
+                try:
+                    while copied < size:
+                        n = os.sendfile(dst_fd, src_fd, copied, size - copied)
+                        if n == 0:
+                            break
+                        copied += n
+                except OSError as e:
+                    if e.errno not in MERGE._FALLBACK_ERRNOS:
+                        raise
+
+            if copied < size:
+                infile.seek(copied)
+                while chunk := infile.read(MERGE.BUFFER_SIZE):
+                    copied += MERGE.write_all(chunk, dst_fd)
+
+        return copied
+
+
+class StreamMerger:
+    """分段一下載完成就依序接到 video/audio 輸出檔 合併與下載同時進行
+
+    memory_limit > 0 時分段內容直接以 bytes 交給 merger 不落地成分段檔
+    尚未輪到的分段暫存在重排緩衝區 超過上限時後面的分段會等待
+    有 decryptor 時每個片段寫入前先解密 下載完成時輸出檔已是明文
+    """
+
+    def __init__(
+        self,
+        output_file: Path,
+        track_type: str,
+        total: int,
+        manifest: SegmentManifest | None = None,
+        memory_limit: int = 0,
+        decryptor: CencDecryptor | None = None,
+    ) -> None:
+        self.output_file: Path = output_file
+        self.track_type: str = track_type
+        self.total: int = total
+        self.manifest: SegmentManifest | None = manifest
+        self.memory_limit: int = memory_limit
+        self.decryptor: CencDecryptor | None = decryptor
+        self.next_index: int = 0
+        self.failed: bool = False
+        self.merged_bytes: int = 0
+        self.buffered_bytes: int = 0
+        self._reserved: int = 0
+        self._segment_size: int = 0
+        self._ready: dict[int, Path | bytes] = {}
+        self._fd: int | None = None
+        self._lock: asyncio.Lock = asyncio.Lock()
+        self._room: asyncio.Condition = asyncio.Condition()
+
+    @property
+    def complete(self) -> bool:
+        return self.next_index >= self.total
+
+    @property
+    def merge_mode(self) -> str:
+        return "plain" if self.decryptor is None else "decrypted"
+
+    async def _prepare_init(self, init_file: Path | bytes | None) -> bytes | None:
+        """讀取 init 有 decryptor 時同時取得各軌道的加密資訊 無法解密就改回合併後再解密"""
+        if init_file is None or isinstance(init_file, bytes):
+            data: bytes | None = init_file
+        else:
+            data = await asyncio.to_thread(init_file.read_bytes) if init_file.exists() else None
+        if self.decryptor is None:
+            return data
+
         try:
+            if data is None:
+                raise CencError("Missing init segment")
+            return await asyncio.to_thread(self.decryptor.decrypt_init, data)
+        except CencError as e:
+            logger.warning(
+                f"{Color.fg('light_gray')}{self.track_type} {Color.fg('sienna')}pipelined decryption disabled: "
+                f"{Color.fg('ash_gray')}{e}{Color.reset()}"
+            )
+            self.decryptor = None
+            return data
 
-            def copy_segments():
-                with open(temp_file, "wb") as outfile:
-                    for seg, size in segments:
-                        with open(seg, "rb") as infile:
-                            shutil.copyfileobj(infile, outfile, length=MERGE.BUFFER_SIZE)
-                        progress.update(task_id, advance=size)
+    async def start(self, init_file: Path | bytes | None) -> None:
+        """續傳時把輸出檔截回上次記錄的長度 否則重新寫入 init"""
+        init_data: bytes | None = await self._prepare_init(init_file)
+        resume_bytes: int = self.manifest.merged_bytes if self.manifest is not None else 0
+        if self.manifest is not None and self.manifest.merge_mode != self.merge_mode:
+            resume_bytes = 0
+        if resume_bytes and self.output_file.exists() and self.output_file.stat().st_size >= resume_bytes:
+            self._fd = await asyncio.to_thread(MERGE.open_output, self.output_file)
+            await asyncio.to_thread(os.ftruncate, self._fd, resume_bytes)
+            os.lseek(self._fd, 0, os.SEEK_END)
+            self.next_index = self.manifest.merged_prefix()
+            self.merged_bytes = resume_bytes
+            logger.info(f"{Color.fg('light_gray')}{self.track_type} {Color.fg('sienna')}continue merging from segment {self.next_index}{Color.reset()}")
+            return
 
-            await asyncio.to_thread(copy_segments)
-            return True
+        if self.manifest is not None:
+            self.manifest.reset_merged()
+            self.manifest.merge_mode = self.merge_mode
+        self._fd = await asyncio.to_thread(MERGE.open_output, self.output_file, True)
+        if init_data is not None:
+            self.merged_bytes = await asyncio.to_thread(MERGE.write_all, init_data, self._fd)
 
-        except Exception as e:
-            logger.error(f"Failed to process chunk {chunk_idx}: {e}")
-            return False
+    def _has_room(self) -> bool:
+        if self._segment_size == 0:
+            # 尚未得知分段大小 一次只放行一個
+            return self._reserved == 0
+        return self.buffered_bytes + (self._reserved + 1) * self._segment_size <= self.memory_limit
+
+    async def reserve(self, index: int) -> None:
+        """下載前先預留緩衝區空間 已滿時除了下一個要寫入的分段以外都先等待
+
+        合併已因分段失敗中止時丟出 MergeAborted 不再等待永遠不會空出的緩衝區
+        """
+        if self.memory_limit <= 0:
+            return
+        async with self._room:
+            await self._room.wait_for(lambda: self.failed or index <= self.next_index or self._fd is None or self._has_room())
+            if self.failed:
+                raise MergeAborted(f"{self.track_type} stream merge aborted at segment {self.next_index}")
+            self._reserved += 1
+
+    async def fail(self, index: int) -> None:
+        """分段重試用盡 next_index 不會再前進 喚醒所有等待 reserve 的分段並釋放緩衝區"""
+        async with self._lock:
+            if not self.failed:
+                logger.warning(f"{Color.fg('light_gray')}{self.track_type} {Color.fg('sienna')}segment {index} failed, stop stream merge{Color.reset()}")
+            self.failed = True
+            for item in self._ready.values():
+                if isinstance(item, bytes):
+                    self.buffered_bytes -= len(item)
+            self._ready = {i: item for i, item in self._ready.items() if not isinstance(item, bytes)}
+        async with self._room:
+            self._room.notify_all()
+
+    async def release(self) -> None:
+        """下載失敗時歸還預留的空間"""
+        if self.memory_limit <= 0:
+            return
+        async with self._room:
+            self._reserved = max(0, self._reserved - 1)
+            self._room.notify_all()
+
+    async def add(self, index: int, segment: Path | bytes) -> None:
+        """登記完成的分段 並把從 next_index 開始連續可用的分段寫入輸出檔"""
+        try:
+            async with self._lock:
+                if index < self.next_index or self._fd is None or (self.failed and isinstance(segment, bytes)):
+                    return
+                self._ready[index] = segment
+                if isinstance(segment, bytes):
+                    self.buffered_bytes += len(segment)
+                    self._segment_size = max(self._segment_size, len(segment))
+                while self.next_index in self._ready:
+                    item: Path | bytes = self._ready.pop(self.next_index)
+                    self.merged_bytes += await asyncio.to_thread(self._write_segment, item)
+                    if isinstance(item, bytes):
+                        self.buffered_bytes -= len(item)
+                    else:
+                        await asyncio.to_thread(item.unlink, True)
+                    if self.manifest is not None:
+                        self.manifest.mark_merged(self.next_index, self.merged_bytes)
+                        await self.manifest.save()
+                    self.next_index += 1
+        finally:
+            # 預留的空間已轉為實際佔用的緩衝區
+            if isinstance(segment, bytes):
+                await self.release()
+
+    def _write_segment(self, item: Path | bytes) -> int:
+        if self.decryptor is None:
+            if isinstance(item, bytes):
+                return MERGE.write_all(item, self._fd)
+            return MERGE.copy_into(item, self._fd)
+        data: bytes = item if isinstance(item, bytes) else item.read_bytes()
+        return MERGE.write_all(self.decryptor.decrypt_fragment(data), self._fd)
+
+    async def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        self._ready.clear()
+        self.buffered_bytes = 0
+        self._reserved = 0
+        async with self._room:
+            self._room.notify_all()
+        if self.manifest is not None:
+            await self.manifest.save(force=True)
+        if self.complete:
+            logger.info(f"{Color.fg('light_gray')}{self.track_type} {Color.fg('sienna')}Merger completed: {Color.fg('ash_gray')}{self.output_file}{Color.reset()}")
@@ -1,6 +1,5 @@
 import asyncio
 import ctypes
-import subprocess
 from typing import Any
 from pathlib import Path
 
@@ -9,6 +8,9 @@ from rich.progress import SpinnerColumn, TextColumn, Progress
 
 from berrizdown.lib.__init__ import container
 from berrizdown.lib.load_yaml_config import CFG, ConfigLoader
+from berrizdown.lib.mux.cenc import CencDecryptor, CencError, parse_keys
+from berrizdown.lib.mux.tool_registry import DECRYPTION_KEY, tool_registry
+from berrizdown.lib.mux.tool_runner import ToolResult, ffmpeg_progress, mkvmerge_progress, tool_runner
 from berrizdown.static.color import Color
 from berrizdown.static.parameter import paramstore
 from berrizdown.static.route import Route
@@ -24,6 +26,9 @@ def get_short_path_name(long_path: Path) -> str:
         raise TypeError("long_path must be a Path object or a string")
 
     long_path_str = str(Path(long_path).resolve())
+    if not hasattr(ctypes, "windll"):
+        # 非 Windows 平台沒有 8.3 短路徑
+        return long_path_str
     
     # 取得短路徑所需的緩衝區大小
     buffer_size = ctypes.windll.kernel32.GetShortPathNameW(long_path_str, None, 0)
@@ -60,6 +65,8 @@ class FFmpegMuxer:
         self.isdrm: bool = isdrm
         self.subs: dict[str, Path] = self.dl_obj.__dict__.get("subtitle") or {}
         self.short_input_output_path_dict: dict[str, str] = {}
+        # 交給 ffmpeg 在 mux 時一併解密的軌道 track_type -> key hex
+        self.input_keys: dict[str, str] = {}
 
     async def mux_main(self) -> bool:
 
@@ -87,6 +94,9 @@ class FFmpegMuxer:
             else:
                 track_tuple_type: tuple[str, str] = ("video", "audio")
 
+            if self.isdrm:
+                self.input_keys = await self.fused_decryption_keys(track_tuple_type)
+
             for track_type in track_tuple_type:
                 self.input_path: Path | None = getattr(self.dl_obj, track_type, None)
                 if self.input_path is None:
@@ -95,7 +105,7 @@ class FFmpegMuxer:
                 if not self.input_path.exists():
                     return False
 
-                if self.isdrm:
+                if self.isdrm and track_type not in getattr(self.dl_obj, "decrypted", ()) and track_type not in self.input_keys:
                     await self.decryption_track(track_type, progress, loop)
         except Exception:
             logger.warning("Mux cancelled got cancelled signal")
@@ -136,57 +146,47 @@ class FFmpegMuxer:
         match mux_tool:
             case "FFMPEG":
                 
-                FFMPEG_path: Path = Route().ffmpeg
-                if not FFMPEG_path.exists():
-                    if paramstore.get("ffmpeg_path_ok") is True:
-                        FFMPEG_path_str: str = "ffmpeg"
-                    else:
-                        logger.error(f"ffmpeg.exe not found at: {FFMPEG_path}")
-                        return False
-                else:
-                    FFMPEG_path_str: str = get_short_path_name(FFMPEG_path)
+                FFMPEG_path: str | None = await tool_registry.path_of_async("ffmpeg")
+                if FFMPEG_path is None:
+                    logger.error(f"ffmpeg.exe not found at: {Route().ffmpeg}")
+                    return False
+                FFMPEG_path_str: str = get_short_path_name(FFMPEG_path)
                     
                 cmd: list[str] = await self.build_ffmpeg_command(FFMPEG_path_str)
 
                 try:
                     with progress:
                         task_id = progress.add_task(description="[cyan]Using FFmpeg mux...[/cyan]", total=None)
-                        
-                        result: subprocess.CompletedProcess = await loop.run_in_executor(
-                            None,
-                            lambda: subprocess.run(
-                                cmd,
-                                capture_output=True,
-                                text=True,
-                                encoding="utf-8",
-                                errors="replace",
-                            )
-                        )
-                        progress.update(task_id, description="[green]FFmpeg mux complete！[/green]")
 
-                        if result.returncode != 0:
-                            logger.error(f"FFmpeg multiplexing failed:\n{result.stderr}")
-                            return False
-                        return True
+                        def _on_time(seconds: float) -> None:
+                            progress.update(task_id, description=f"[cyan]Using FFmpeg mux... [/cyan][blue]{int(seconds // 60)}:{int(seconds % 60):02d}[/blue]")
+
+                        result: ToolResult = await tool_runner.run(cmd, on_line=ffmpeg_progress(_on_time))
+                        progress.update(task_id, description="[green]FFmpeg mux complete！[/green]")
                 except Exception as e:
                     logger.error(f"FFmpeg mixing error: {str(e)}")
                     return False
+
+                if result.returncode != 0:
+                    if self.input_keys:
+                        logger.warning(f"FFmpeg decrypt + mux failed, retry with separate decryption:\n{result.stderr}")
+                        return await self.mux_after_decrypt(progress, loop)
+                    logger.error(f"FFmpeg multiplexing failed:\n{result.stderr}")
+                    return False
+                return True
                 
             case "MKVTOOLNIX":
                 
-                MKVTOOLNIX_path: Path = Route().mkvmerge_path
-                if not MKVTOOLNIX_path.exists():
-                    if paramstore.get("mkvmerge_path_ok") is True:
-                        MKVTOOLNIX_path_str: str = "mkvmerge"
-                    else:
-                        logger.error(f"mkvmerge.exe not found at: {MKVTOOLNIX_path}")
-                        return False
-                else:
-                    MKVTOOLNIX_path_str: str = get_short_path_name(MKVTOOLNIX_path)
+                MKVTOOLNIX_path: str | None = await tool_registry.path_of_async("mkvmerge")
+                if MKVTOOLNIX_path is None:
+                    logger.error(f"mkvmerge.exe not found at: {Route().mkvmerge_path}")
+                    return False
+                MKVTOOLNIX_path_str: str = get_short_path_name(MKVTOOLNIX_path)
                 
                 if paramstore.get("novideo"):
                     cmd: list[str] = [
                         MKVTOOLNIX_path_str,
+                        "--gui-mode",
                         "-o",
                         self.short_input_output_path_dict.get("output"),
                         self.short_input_output_path_dict.get("audio"),
@@ -194,6 +194,7 @@ class FFmpegMuxer:
                 elif paramstore.get("noaudio"):
                     cmd: list[str] = [
                         MKVTOOLNIX_path_str,
+                        "--gui-mode",
                         "-o",
                         self.short_input_output_path_dict.get("output"),
                         self.short_input_output_path_dict.get("video"),
@@ -201,6 +202,7 @@ class FFmpegMuxer:
                 else:
                     cmd: list[str] = [
                         MKVTOOLNIX_path_str,
+                        "--gui-mode",
                         "-o",
                         self.short_input_output_path_dict.get("output"),
                         self.short_input_output_path_dict.get("video"),
@@ -219,21 +221,15 @@ class FFmpegMuxer:
                 try:
                     with progress:
                         task_id = progress.add_task(description="[cyan]Using mkvmerge mux...[/cyan]", total=None)
-                        
-                        result: subprocess.CompletedProcess = await loop.run_in_executor(
-                            None,
-                            lambda: subprocess.run(
-                                cmd,
-                                capture_output=True,
-                                text=True,
-                                encoding="utf-8",
-                                errors="replace",
-                            )
-                        )
+
+                        def _on_percent(percent: float) -> None:
+                            progress.update(task_id, description=f"[cyan]Using mkvmerge mux... [/cyan][blue]{percent:.0f}%[/blue]")
+
+                        result: ToolResult = await tool_runner.run(cmd, on_line=mkvmerge_progress(_on_percent))
                         progress.update(task_id, description="[green]mkvmerge mux complete！[/green]")
 
                     if result.returncode != 0:
-                        logger.error(f"mkvmerge multiplexing failed:\n{result}")
+                        logger.error(f"mkvmerge multiplexing failed:\n{result.stdout}\n{result.stderr}")
                         return False
                     logger.info(f"{Color.fg('gray')}Mixed flow completed: {self.temp_mux_path}{Color.reset()}")
                     return True
@@ -244,6 +240,54 @@ class FFmpegMuxer:
                 logger.error(f"Unsupported mux tool: {mux_tool}")
                 return False
 
+    async def fused_decryption_keys(self, track_types: tuple[str, ...]) -> dict[str, str]:
+        """找出可以直接交給 ffmpeg -decryption_key 解密的軌道
+
+        ffmpeg 只支援單一 KID 的 cenc (AES-CTR) 其他情況 (cbcs 多 KID mkvmerge) 走原本的解密流程
+        """
+        if CFG["Container"].get("fused-decrypt", True) is not True:
+            return {}
+        # 不會進入 mux 的情況仍要留下解密後的檔案
+        if any(paramstore.get(flag) is True for flag in ("skip_mux", "slice_path_fail", "video_dl_cancelled")):
+            return {}
+        if str(CFG["Container"]["mux"]).upper() != "FFMPEG":
+            return {}
+        if not await tool_registry.supports_async("ffmpeg", DECRYPTION_KEY):
+            return {}
+        keys: dict[bytes, bytes] = parse_keys(self.decryption_key)
+        if not keys:
+            return {}
+        input_keys: dict[str, str] = {}
+        for track_type in track_types:
+            path: Path | None = getattr(self.dl_obj, track_type, None)
+            if path is None or track_type in getattr(self.dl_obj, "decrypted", ()):
+                continue
+            try:
+                tracks = await asyncio.to_thread(CencDecryptor.read_protection, path)
+            except (CencError, OSError) as e:
+                logger.debug(f"Cannot read protection info of {path}: {e}")
+                continue
+            if len(tracks) != 1:
+                continue
+            info = next(iter(tracks.values()))
+            if info.scheme == b"cenc" and info.kid in keys:
+                input_keys[track_type] = keys[info.kid].hex()
+        if input_keys:
+            logger.debug(f"Decrypt inside ffmpeg mux: {', '.join(input_keys)}")
+        return input_keys
+
+    async def mux_after_decrypt(self, progress: Progress, loop: asyncio.AbstractEventLoop) -> bool:
+        """ffmpeg 解密失敗時 改用設定的解密工具先解密再重新 mux"""
+        track_types: list[str] = list(self.input_keys)
+        self.input_keys = {}
+        for track_type in track_types:
+            self.input_path = getattr(self.dl_obj, track_type)
+            decrypted_file: Path | None = await self.decryption_track(track_type, progress, loop)
+            if decrypted_file is None:
+                return False
+            self.short_input_output_path_dict[track_type] = get_short_path_name(decrypted_file)
+        return await self.choese_mux_tool(progress, loop)
+
     async def decryption_track(self, track_type: str, progress: Progress, loop: asyncio.AbstractEventLoop) -> Path | None:
         """Handle decryption if needed and return final file path"""
         decryption_key: str = await self.process_decryption_key()
@@ -283,15 +327,17 @@ class FFmpegMuxer:
                 return await self._decrypt_file_mp4decrypt(input_short, progress, track_type, loop)
             case "SHAKA_PACKAGER":
                 return await self._decrypt_file_packager(input_short, progress, track_type, loop)
+            case "NATIVE":
+                return await self._decrypt_file_native(progress, track_type, loop)
             case _:
                 ConfigLoader.print_warning("decryptionengine", decryptionengine, "shaka-packager")
                 return await self._decrypt_file_packager(input_short, progress, track_type, loop)
 
     async def _decrypt_file_mp4decrypt(
         self, input_short: str, progress: Progress, track_type: str, loop: asyncio.AbstractEventLoop) -> bool:
-        mp4decrypt_path: Path = Route().mp4decrypt_path
-        if not mp4decrypt_path.exists():
-            logger.error(f"mp4decrypt.exe not found at: {mp4decrypt_path}")
+        mp4decrypt_path: str | None = await tool_registry.path_of_async("mp4decrypt")
+        if mp4decrypt_path is None:
+            logger.error(f"mp4decrypt.exe not found at: {Route().mp4decrypt_path}")
             return False
 
         try:
@@ -312,42 +358,55 @@ class FFmpegMuxer:
                     total=None
                 )
                 
-                await loop.run_in_executor(
-                    None, 
-                    lambda: subprocess.run(
-                        command,
-                        check=True,
-                        capture_output=True,
-                        text=True,
-                        encoding="utf-8",
-                        errors="replace",
-                    )
-                )
+                result: ToolResult = await tool_runner.run(command)
+                if not result.ok:
+                    logger.error(f"Decryption failed: {result.stderr}")
+                    return False
                 progress.update(task_id, description=f"[green]　Decryption complete: [/green][blue]{track_type}[/blue]\n[yellow]{self.key}[/yellow]")
 
             return True
 
-        except subprocess.CalledProcessError as e:
-            logger.error(f"Decryption failed: {e.stderr}")
-            return False
         except Exception as e:
             logger.error(f"Unexpected error: {str(e)}")
             return False
 
+    async def _decrypt_file_native(self, progress: Progress, track_type: str, loop: asyncio.AbstractEventLoop) -> bool:
+        """行程內直接解密 cenc / cbcs 分段 MP4 不需要外部工具"""
+        keys: dict[bytes, bytes] = parse_keys(self.decryption_key)
+        if not keys:
+            logger.error(f"No valid key for native decryption: {self.key}")
+            return False
+
+        decryptor: CencDecryptor = CencDecryptor(keys)
+        try:
+            with progress:
+                task_id = progress.add_task(
+                    description=f"[cyan]　native decryption in progress: [/cyan][blue]{track_type}[/blue]",
+                    total=None
+                )
+
+                # 與外部工具共用 CPU 上限
+                async with tool_runner.semaphore:
+                    await loop.run_in_executor(None, decryptor.decrypt_file, self.input_path, Path(self.output_path))
+                progress.update(task_id, description=f"[green]　Decryption complete: [/green][blue]{track_type}[/blue]\n[yellow]{self.key}[/yellow]")
+
+            return True
+
+        except (CencError, OSError) as e:
+            logger.error(f"Native decryption failed: {e}")
+            Path(self.output_path).unlink(missing_ok=True)
+            return False
+
     async def _decrypt_file_packager(
         self, input_short: str, progress: Progress, track_type: str, loop: asyncio.AbstractEventLoop) -> bool:
-            packager_path: Path = Route().packager_path
+            packager_path: str | None = await tool_registry.path_of_async("packager")
             packager_output_path: Path = Path(self.output_path).with_suffix(".m4v")
 
             # 檢查路徑邏輯
-            if not packager_path.exists():
-                if paramstore.get("packager_path_ok") is True:
-                    packager_path_str = "packager"
-                else:
-                    logger.error(f"shaka-packager.exe not found at: {packager_path}")
-                    return False
-            else:
-                packager_path_str: str = get_short_path_name(packager_path)
+            if packager_path is None:
+                logger.error(f"shaka-packager.exe not found at: {Route().packager_path}")
+                return False
+            packager_path_str: str = get_short_path_name(packager_path)
 
             # 處理 Key 的邏輯
             key_lines: list[str] = self.key.strip().splitlines()
@@ -376,23 +435,13 @@ class FFmpegMuxer:
                         total=None
                     )
                     
-                    await loop.run_in_executor(
-                        None,
-                        lambda: subprocess.run(
-                            command,
-                            check=True,
-                            capture_output=True,
-                            text=True,
-                            encoding="utf-8",
-                            errors="replace",
-                        )
-                    )
-                    
+                    result: ToolResult = await tool_runner.run(command)
+                    if not result.ok:
+                        logger.error(f"Packager failed: {result.stderr}")
+                        return False
+
                     progress.update(task_id, description=f"[green]　Decryption complete: [/green][blue]{track_type}[/blue]\n[yellow]{self.key}[/yellow]")
 
-            except subprocess.CalledProcessError as e:
-                logger.error(f"Packager failed: {e.stderr}")
-                return False
             except Exception as e:
                 logger.exception(f"Unexpected error running packager: {e}")
                 return False
@@ -424,12 +473,16 @@ class FFmpegMuxer:
 
         # 加入 video
         if self.short_input_output_path_dict.get("video") and not paramstore.get("novideo"):
+            if "video" in self.input_keys:
+                command.extend(["-decryption_key", self.input_keys["video"]])
             command.extend(["-i", self.short_input_output_path_dict["video"]])
             has_video = True
             input_index += 1
 
         # 加入 audio
         if self.short_input_output_path_dict.get("audio") and not paramstore.get("noaudio"):
+            if "audio" in self.input_keys:
+                command.extend(["-decryption_key", self.input_keys["audio"]])
             command.extend(["-i", self.short_input_output_path_dict["audio"]])
             has_audio = True
             input_index += 1
@@ -475,6 +528,9 @@ class FFmpegMuxer:
         # 通用參數
         command.extend([
             "-buffer_size", "32M",
+            # 進度輸出到 stdout 由 tool_runner 逐行解析
+            "-progress", "pipe:1",
+            "-nostats",
             "-y",
             self.short_input_output_path_dict["output"],
         ])
@@ -41,6 +41,8 @@ class HLSVariant:
     id: str | None = None
     width: int | None = None
     height: int | None = None
+    # False 表示 media playlist 尚未取得 選中後才由 HLSParser.resolve 補上 segments
+    resolved: bool = False
 
     def __post_init__(self):
         if self.segments and not self.segment_urls:
@@ -77,6 +79,7 @@ class HLSAudioTrack:
     audio_sampling_rate: int | None = 48000
     width: int | None = None
     height: int | None = None
+    resolved: bool = False
 
     def __post_init__(self):
         if self.segments and not self.segment_urls:
@@ -109,6 +112,7 @@ class HLSSubTrack:
     height: None = None
     bandwidth: None = None
     channels: None = None
+    resolved: bool = False
 
     def __post_init__(self):
         if self.segments and not self.segment_urls:
@@ -198,14 +202,44 @@ class HLSParser:
             logger.warning(f"Failed to fetch segments for {track_type} {url}: {e}")
             return []
 
+    async def resolve(self, *tracks: Any) -> None:
+        """並行取得尚未解析的 HLS 軌道的 media playlist 其他來源的軌道直接略過"""
+        pending: dict[int, HLSVariant | HLSAudioTrack | HLSSubTrack] = {
+            id(track): track
+            for track in tracks
+            if isinstance(track, (HLSVariant, HLSAudioTrack, HLSSubTrack)) and not track.resolved
+        }
+        if not pending:
+            return
+
+        results: list[list[HLSSegment]] = await asyncio.gather(
+            *(
+                self._fetch_segments_safe(
+                    track.playlist_url if isinstance(track, HLSVariant) else track.uri,
+                    "variant" if isinstance(track, HLSVariant) else "audio" if isinstance(track, HLSAudioTrack) else "subtitle",
+                    str(track.id),
+                )
+                for track in pending.values()
+            )
+        )
+        for track, segments in zip(pending.values(), results):
+            track.segments = segments
+            track.segment_urls = [seg.url for seg in segments]
+            track.resolved = True
+
     async def parse_playlist(self, m3u8_content_str: str, m3u8_url: str, fetch_segments: bool = True) -> HLSContent:
-        """解析 M3U8 播放清單並傳回所有內容"""
+        """解析 M3U8 播放清單並傳回所有內容
+
+        fetch_segments 為 False 時只解析 master playlist 軌道的 segments 之後再用 resolve 取得
+        """
         lines: list[str] = self._preprocess_content(m3u8_content_str)
         base_url: str = m3u8_url.rsplit("/", 1)[0] + "/"
         if self._check_master_playlist(lines):
-            video_variants: list[HLSVariant] = await self._parse_all_video_variants(lines, m3u8_url, fetch_segments)
-            audio_tracks: list[HLSAudioTrack] = await self._parse_all_audio_tracks(lines, m3u8_url, fetch_segments)
-            subtitle_tracks: list[HLSSubTrack] = await self._parse_all_sub_tracks(lines, m3u8_url, fetch_segments)
+            video_variants: list[HLSVariant] = await self._parse_all_video_variants(lines, m3u8_url)
+            audio_tracks: list[HLSAudioTrack] = await self._parse_all_audio_tracks(lines, m3u8_url)
+            subtitle_tracks: list[HLSSubTrack] = await self._parse_all_sub_tracks(lines, m3u8_url)
+            if fetch_segments:
+                await self.resolve(*video_variants, *audio_tracks, *subtitle_tracks)
             return HLSContent(
                 video_variants=video_variants,
                 audio_tracks=audio_tracks,
@@ -215,16 +249,16 @@ class HLSParser:
             )
         else:
             logger.warning("Direct media playlist detected")
-            media_playlist: HLSMediaPlaylist = await self.parse_media_playlist(m3u8_url)
-            subtitle_tracks: list[HLSSubTrack] = await self._parse_all_sub_tracks(lines, m3u8_url, fetch_segments)
+            subtitle_tracks: list[HLSSubTrack] = await self._parse_all_sub_tracks(lines, m3u8_url)
 
             default_variant: HLSVariant = HLSVariant(
                 bandwidth=0,
                 resolution=None,
                 codecs=None,
                 playlist_url=m3u8_url,
-                segments=media_playlist.segments if fetch_segments else [],
             )
+            if fetch_segments:
+                await self.resolve(default_variant, *subtitle_tracks)
 
             return HLSContent(
                 video_variants=[default_variant],
@@ -234,21 +268,21 @@ class HLSParser:
                 is_master_playlist=False,
             )
 
-    async def _parse_all_video_variants(self, lines: list[str], m3u8_url: str, fetch_segments: bool = True) -> list[HLSVariant]:
+    async def _parse_all_video_variants(self, lines: list[str], m3u8_url: str) -> list[HLSVariant]:
         """解析所有視訊變體"""
         variants: list = []
 
         i = 0
         while i < len(lines):
             if lines[i].startswith("#EXT-X-STREAM-INF:"):
-                variant: HLSVariant | None = await self._parse_single_variant(lines, i, m3u8_url, fetch_segments)
+                variant: HLSVariant | None = self._parse_single_variant(lines, i, m3u8_url)
                 if variant:
                     variants.append(variant)
             i += 1
 
         return sorted(variants, key=lambda v: v.bandwidth)
 
-    async def _parse_single_variant(self, lines: list[str], index: int, m3u8_url: str, fetch_segments: bool) -> HLSVariant | None:
+    def _parse_single_variant(self, lines: list[str], index: int, m3u8_url: str) -> HLSVariant | None:
         """解析單一視訊變體"""
         line: list[str] = lines[index]
 
@@ -280,11 +314,6 @@ class HLSParser:
         frame_rate: float | None = float(attrs["frame_rate"]) if "frame_rate" in attrs else None
         avg_bandwidth: int | None = int(attrs["avg_bandwidth"]) if "avg_bandwidth" in attrs else None
 
-        # 取得 segments
-        segments: list[HLSSegment] = []
-        if fetch_segments:
-            segments = await self._fetch_segments_safe(playlist_url, "variant", f"{resolution} @ {bandwidth // 1000}kbps")
-
         return HLSVariant(
             bandwidth=bandwidth,
             resolution=resolution,
@@ -292,34 +321,33 @@ class HLSParser:
             playlist_url=playlist_url,
             frame_rate=frame_rate,
             average_bandwidth=avg_bandwidth,
-            segments=segments,
         )
 
-    async def _parse_all_audio_tracks(self, lines: list[str], m3u8_url: str, fetch_segments: bool = True):
+    async def _parse_all_audio_tracks(self, lines: list[str], m3u8_url: str):
         """解析所有音訊軌道"""
         audio_tracks: list[HLSAudioTrack] = []
 
         for line in lines:
             if line.startswith("#EXT-X-MEDIA:") and "TYPE=AUDIO" in line:
-                track: HLSAudioTrack | None = await self._parse_single_audio_track(line, m3u8_url, fetch_segments)
+                track: HLSAudioTrack | None = self._parse_single_audio_track(line, m3u8_url)
                 if track:
                     audio_tracks.append(track)
 
         return audio_tracks
     
-    async def _parse_all_sub_tracks(self, lines: list[str], m3u8_url: str, fetch_segments: bool = True):
+    async def _parse_all_sub_tracks(self, lines: list[str], m3u8_url: str):
         """解析所有字幕軌道"""
         sub_tracks: list[HLSSubTrack] = []
 
         for line in lines:
             if line.startswith("#EXT-X-MEDIA:") and "TYPE=SUBTITLES" in line:
-                track = await self._parse_single_sub_track(line, m3u8_url, fetch_segments)
+                track = self._parse_single_sub_track(line, m3u8_url)
                 if track:
                     sub_tracks.append(track)
 
         return sub_tracks
 
-    async def _parse_single_audio_track(self, line: str, m3u8_url: str, fetch_segments: bool) -> HLSAudioTrack | None:
+    def _parse_single_audio_track(self, line: str, m3u8_url: str) -> HLSAudioTrack | None:
         """解析單一音訊軌道"""
         attrs: dict[str, Any] = self._extract_attributes(
             line,
@@ -341,23 +369,15 @@ class HLSParser:
         bandwidth: int | None = int(attrs["bandwidth"]) if "bandwidth" in attrs else None
         channels: str | None = attrs.get("channels")
 
-        tasks: list = []
-        segments_task = None
-        if fetch_segments:
-            segments_task = asyncio.create_task(self._fetch_segments_safe(uri, "audio", f"'{name}' [{language}]"))
-            tasks.append(segments_task)
-        segments = (await asyncio.gather(*[t for t in tasks if t is not None]))[0]
-        
         return HLSAudioTrack(
             name=name,
             language=language,
             uri=uri,
             bandwidth=bandwidth,
             channels=channels,
-            segments=segments,
         )
         
-    async def _parse_single_sub_track(self, line: str, m3u8_url: str, fetch_segments: bool) -> HLSSubTrack | None:
+    def _parse_single_sub_track(self, line: str, m3u8_url: str) -> HLSSubTrack | None:
         """解析單一字幕軌道"""
         attrs: dict[str, Any] = self._extract_attributes(
             line,
@@ -375,20 +395,12 @@ class HLSParser:
         name: str | None = attrs.get("name", "Unknown")
         language: str | None = attrs.get("language")
 
-        tasks: list = []
-        segments_task = None
-        if fetch_segments:
-            segments_task: asyncio.Task = asyncio.create_task(self._fetch_segments_safe(uri, "subtitle", f"'{name}' [{language}]"))
-            tasks.append(segments_task)
-        segments: list[HLSSegment] = (await asyncio.gather(*[t for t in tasks if t is not None]))[0]
-
         return HLSSubTrack(
             name=name,
             language=language,
             uri=uri,
             bandwidth=None,
             channels=None,
-            segments=segments,
         )
 
     async def parse_media_playlist(self, playlist_url: str) -> HLSMediaPlaylist:
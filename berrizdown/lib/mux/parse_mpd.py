@@ -1,8 +1,15 @@
-import xml.etree.ElementTree as ET
+import asyncio
+from array import array
+from bisect import bisect_right
+from collections.abc import Iterator, Sequence
 from dataclasses import dataclass, field
-from typing import Any
+from functools import cached_property
+from io import BytesIO
+from typing import Any, overload
 from urllib.parse import urljoin
 
+from lxml import etree
+
 from berrizdown.unit.handle.handle_log import setup_logging
 
 logger = setup_logging("parse_mpd", "periwinkle")
@@ -15,6 +22,94 @@ class Segment:
     r: int
 
 
+class SegmentUrls(Sequence[str]):
+    """SegmentTimeline 的 URL 檢視 只保存 (t, d, r) 與模板 用到時才產生 URL
+
+    每個 S 元素是一段 run 以 run 為單位二分搜尋 一般 MPD 只有幾段 run 索引與時間查詢接近 O(1)
+    """
+
+    __slots__ = ("_prefix", "_suffix", "_t", "_d", "_first")
+
+    def __init__(self, base_url: str, media_template: str, rep_id: str, timeline: list[Segment]) -> None:
+        # 模板只差 $Time$ 先解析成絕對路徑 之後只需要字串串接
+        resolved: str = urljoin(base_url, media_template.replace("$RepresentationID$", rep_id))
+        self._prefix, sep, self._suffix = resolved.partition("$Time$")
+        if not sep:
+            self._prefix, self._suffix = resolved, None
+        self._t: array = array("q")
+        self._d: array = array("q")
+        # 每段 run 第一個片段的索引 最後多一個總數當哨兵
+        self._first: array = array("q", [0])
+        for seg in timeline:
+            self._t.append(seg.t)
+            self._d.append(seg.d)
+            self._first.append(self._first[-1] + max(seg.r, 0) + 1)
+
+    def __len__(self) -> int:
+        return self._first[-1]
+
+    def __repr__(self) -> str:
+        return f"SegmentUrls({len(self)} segments, {len(self._t)} runs)"
+
+    def _run(self, index: int) -> int:
+        return bisect_right(self._first, index, 0, len(self._t)) - 1
+
+    def _url(self, time: int) -> str:
+        if self._suffix is None:
+            return self._prefix
+        return f"{self._prefix}{time}{self._suffix}"
+
+    def _normalize(self, index: int) -> int:
+        length: int = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("segment index out of range")
+        return index
+
+    @overload
+    def __getitem__(self, index: int) -> str: ...
+    @overload
+    def __getitem__(self, index: slice) -> list[str]: ...
+    def __getitem__(self, index: int | slice) -> str | list[str]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return self._url(self.time_of(index))
+
+    def __iter__(self) -> Iterator[str]:
+        for run in range(len(self._t)):
+            t, d = self._t[run], self._d[run]
+            for k in range(self._first[run + 1] - self._first[run]):
+                yield self._url(t + k * d)
+
+    def time_of(self, index: int) -> int:
+        """片段的起始時間 (timescale 單位)"""
+        index = self._normalize(index)
+        run: int = self._run(index)
+        return self._t[run] + (index - self._first[run]) * self._d[run]
+
+    def duration_of(self, index: int) -> int:
+        return self._d[self._run(self._normalize(index))]
+
+    def index_at(self, time: int) -> int:
+        """包含該時間點的片段索引 超出範圍時夾在頭尾"""
+        if not self:
+            raise IndexError("empty segment timeline")
+        run: int = bisect_right(self._t, time) - 1
+        if run < 0:
+            return 0
+        count: int = self._first[run + 1] - self._first[run]
+        offset: int = min(max(time - self._t[run], 0) // max(self._d[run], 1), count - 1)
+        return self._first[run] + offset
+
+    def url_at(self, time: int) -> str | None:
+        """依起始時間取得 URL 時間不是片段起點時回傳 None"""
+        if not self:
+            return None
+        index: int = self.index_at(time)
+        return self[index] if self.time_of(index) == time else None
+
+
 @dataclass
 class MediaTrack:
     id: str
@@ -22,7 +117,7 @@ class MediaTrack:
     codecs: str
     segments: list[Segment]
     init_url: str
-    segment_urls: list[str]
+    segment_urls: Sequence[str]
     mime_type: str
     width: int | None = None
     height: int | None = None
@@ -42,7 +137,7 @@ class SubtitleTrack:
     codecs: None
     bandwidth: int
     init_url: str | None
-    segment_urls: list[str]
+    segment_urls: Sequence[str]
     segment_timeline: list[Segment]
     timescale: int | None = None
     segment_template: str | None = None
@@ -55,6 +150,9 @@ class MPDContent:
     subtitle_tracks: list[SubtitleTrack]
     base_url: str
     drm_info: dict[str, Any]
+    # 所有 cenc:pssh / mspr:pro 原文 給 Key_handle 依長度挑選 Widevine / PlayReady
+    cenc_pssh: list[str] = field(default_factory=list)
+    mspr_pro: list[str] = field(default_factory=list)
 
 
 class Codec:
@@ -105,20 +203,27 @@ class MPDParser:
 
     def __init__(self, raw_mpd_text: Any, mpd_url: str):
         self.mpd_url: str = mpd_url
-        self.root: ET.Element = self._parse_xml(raw_mpd_text)
+        self.xml_data: bytes = self._to_bytes(raw_mpd_text)
         self.namespaces: dict[str, str] = self.NAMESPACES
         self.base_url: str = mpd_url.rsplit("/", 1)[0] + "/"
 
-    def _parse_xml(self, text_response: str) -> ET.Element:
-        """解析 XML 文字為 ElementTree Element"""
-        xml_text: str = text_response
-        if not isinstance(xml_text, str):
-            raise TypeError(f"Expected text attribute to be str, got {type(xml_text)}")
-        return ET.fromstring(xml_text)
+    @staticmethod
+    def _to_bytes(text_response: str | bytes) -> bytes:
+        """lxml 不接受帶 encoding 宣告的 str 一律轉成 bytes"""
+        if isinstance(text_response, bytes):
+            return text_response
+        if not isinstance(text_response, str):
+            raise TypeError(f"Expected text attribute to be str, got {type(text_response)}")
+        return text_response.encode("utf-8")
+
+    @cached_property
+    def root(self) -> etree._Element:
+        """完整的 XML 樹 只有結構檢查會用到 解析軌道走 iterparse"""
+        return etree.fromstring(self.xml_data, etree.XMLParser(resolve_entities=False, huge_tree=True))
 
     def _get_attr(
         self,
-        element: ET.Element,
+        element: etree._Element,
         attr: str,
         required: bool = False,
         attr_type: type = str,
@@ -141,24 +246,29 @@ class MPDParser:
 
         return value
 
-    def _parse_drm_info(self) -> dict[str, Any]:
-        """從 MPD 解析 DRM/ContentProtection 訊息"""
-        drm_info: dict[str, Any] = {}
-
+    def _collect_drm(
+        self,
+        prot: etree._Element,
+        drm_info: dict[str, Any],
+        seen: set[str],
+        cenc_pssh: list[str],
+        mspr_pro: list[str],
+    ) -> None:
+        """從單一 ContentProtection 收集 DRM 訊息 每種 scheme 以第一個出現的為準"""
+        scheme: str = prot.get("schemeIdUri", "")
         for key, config in self.DRM_SCHEMES.items():
-            value: str | None = self._extract_drm_value(config)
+            if key in seen or scheme != config["uri"]:
+                continue
+            seen.add(key)
+            value: str | None = self._extract_drm_value(prot, config)
             if value:
                 drm_info[key] = value
 
-        return drm_info
+        cenc_pssh.extend(p.text.strip() for p in prot.iterfind("./cenc:pssh", self.namespaces) if p.text)
+        mspr_pro.extend(p.text.strip() for p in prot.iterfind("./mspr:pro", self.namespaces) if p.text)
 
-    def _extract_drm_value(self, config: dict[str, Any]) -> str | None:
+    def _extract_drm_value(self, prot: etree._Element, config: dict[str, Any]) -> str | None:
         """提取單一 DRM 值"""
-        prot: ET.Element = self.root.find(f".//ContentProtection[@schemeIdUri='{config['uri']}']", self.namespaces)
-
-        if prot is None:
-            return None
-
         # Get value
         if "attr" in config:
             value: str = prot.get(config["attr"], "")
@@ -174,9 +284,9 @@ class MPDParser:
         transformer: Any = config.get("transformer", lambda x: x)
         return transformer(value)
 
-    def _parse_segment_timeline(self, seg_template: ET.Element) -> list[Segment]:
+    def _parse_segment_timeline(self, seg_template: etree._Element) -> list[Segment]:
         """解析 SegmentTimeline 為 Segment 列表"""
-        seg_timeline: ET.Element = seg_template.find("./SegmentTimeline", self.namespaces)
+        seg_timeline: etree._Element = seg_template.find("./SegmentTimeline", self.namespaces)
         if seg_timeline is None:
             return []
 
@@ -209,37 +319,11 @@ class MPDParser:
 
     def _generate_segment_urls(
         self, rep_id: str, media_template: str, segments: list[Segment]
-    ) -> list[str]:
-        """生成所有片段的 URL 列表"""
-        segment_urls: list[str] = []
-
-        for seg in segments:
-            urls = self._expand_segment(seg, rep_id, media_template)
-            segment_urls.extend(urls)
-
-        return segment_urls
-
-    def _expand_segment(
-        self, seg: Segment, rep_id: str, media_template: str
-    ) -> list[str]:
-        """展開單一 segment（處理重複）"""
-        urls: list[str] = []
-        current_time: int = seg.t
-
-        for _ in range(seg.r + 1):
-            url: str = self._format_segment_url(media_template, rep_id, current_time)
-            urls.append(urljoin(self.base_url, url))
-            current_time += seg.d
-
-        return urls
-
-    def _format_segment_url(self, template: str, rep_id: str, time: int) -> str:
-        """格式化 segment URL"""
-        return template.replace("$RepresentationID$", rep_id).replace(
-            "$Time$", str(time)
-        )
+    ) -> SegmentUrls:
+        """建立片段 URL 檢視 不預先展開成字串列表"""
+        return SegmentUrls(self.base_url, media_template, rep_id, segments)
 
-    def _extract_templates(self, seg_template: ET.Element) -> tuple[str, str]:
+    def _extract_templates(self, seg_template: etree._Element) -> tuple[str, str]:
         """提取初始化和媒體模板"""
         init_template: str = seg_template.get("initialization")
         media_template: str = seg_template.get("media")
@@ -252,7 +336,7 @@ class MPDParser:
         return init_template, media_template
 
     def _extract_optional_attributes(
-        self, rep: ET.Element, adapt_set: ET.Element, seg_template: ET.Element
+        self, rep: etree._Element, adapt_set: etree._Element, seg_template: etree._Element
     ) -> dict[str, Any]:
         mime_type: str = rep.get("mimeType") or adapt_set.get("mimeType", "")
 
@@ -268,7 +352,12 @@ class MPDParser:
             "mime_type": mime_type,
         }
 
-    def _is_subtitle_adapt_set(self, adapt_set: ET.Element, mime_type: str) -> bool:
+    def _find_inherited(self, rep: etree._Element, adapt_set: etree._Element, path: str) -> etree._Element | None:
+        """Representation 沒有時沿用 AdaptationSet 的子元素"""
+        elem: etree._Element | None = rep.find(path, self.namespaces)
+        return elem if elem is not None else adapt_set.find(path, self.namespaces)
+
+    def _is_subtitle_adapt_set(self, adapt_set: etree._Element, mime_type: str) -> bool:
         """判斷 AdaptationSet 是否為字幕軌道"""
         content_type = adapt_set.get("contentType", "")
         if content_type == "text":
@@ -286,14 +375,12 @@ class MPDParser:
 
     def _parse_subtitle_representation(
         self,
-        rep: ET.Element,
-        adapt_set: ET.Element,
+        rep: etree._Element,
+        adapt_set: etree._Element,
         lang: str | None,
     ) -> SubtitleTrack | None:
         """解析字幕 Representation 為 SubtitleTrack"""
-        seg_template: ET.Element = rep.find("./SegmentTemplate", self.namespaces) or adapt_set.find(
-            "./SegmentTemplate", self.namespaces
-        )
+        seg_template: etree._Element | None = self._find_inherited(rep, adapt_set, "./SegmentTemplate")
 
         try:
             rep_id: str = self._get_attr(
@@ -306,9 +393,7 @@ class MPDParser:
             mime_type: str = rep.get("mimeType") or adapt_set.get("mimeType", "")
 
             if seg_template is None:
-                base_url_elem: ET.Element = rep.find(
-                    "./BaseURL", self.namespaces
-                ) or adapt_set.find("./BaseURL", self.namespaces)
+                base_url_elem: etree._Element | None = self._find_inherited(rep, adapt_set, "./BaseURL")
                 segment_url: str | None = (
                     urljoin(self.base_url, base_url_elem.text.strip())
                     if base_url_elem is not None and base_url_elem.text
@@ -333,7 +418,7 @@ class MPDParser:
             init_url: str = urljoin(
                 self.base_url, init_template.replace("$RepresentationID$", rep_id)
             )
-            segment_urls: list[str] = self._generate_segment_urls(rep_id, media_template, segments)
+            segment_urls: SegmentUrls = self._generate_segment_urls(rep_id, media_template, segments)
             timescale: int = self._get_attr(
                 seg_template, "timescale", attr_type=int, default=1
             )
@@ -358,15 +443,13 @@ class MPDParser:
 
     def _parse_representation(
         self,
-        rep: ET.Element,
-        adapt_set: ET.Element,
+        rep: etree._Element,
+        adapt_set: etree._Element,
         lang: str | None = None,
     ) -> MediaTrack | None:
         """解析單一 Representation 為 MediaTrack"""
         # 查找 SegmentTemplate
-        seg_template: ET.Element = rep.find("./SegmentTemplate", self.namespaces) or adapt_set.find(
-            "./SegmentTemplate", self.namespaces
-        )
+        seg_template: etree._Element | None = self._find_inherited(rep, adapt_set, "./SegmentTemplate")
 
         if seg_template is None:
             return None
@@ -396,7 +479,7 @@ class MPDParser:
 
             # 生成 URLs
             init_url: str = urljoin(self.base_url, init_template.replace("$RepresentationID$", rep_id))
-            segment_urls: list[str] = self._generate_segment_urls(rep_id, media_template, segments)
+            segment_urls: SegmentUrls = self._generate_segment_urls(rep_id, media_template, segments)
 
             # 提取可選屬性
             optional_attrs: dict[str, any] = self._extract_optional_attributes(rep, adapt_set, seg_template)
@@ -420,62 +503,109 @@ class MPDParser:
             logger.warning(f"Failed to parse Representation {rep_id}: {e}")
             return None
 
-    async def parse_all_tracks(self) -> MPDContent:
-        """解析 MPD 並返回所有視訊 音訊 字幕軌道"""
-        period: ET.Element = self.root.find("./Period", self.namespaces)
-        if period is None:
-            raise ValueError("MPD contains no Period elements")
+    def _collect_adaptation_set(
+        self,
+        adapt_set: etree._Element,
+        video_tracks: list[MediaTrack],
+        audio_tracks: list[MediaTrack],
+        subtitle_tracks: list[SubtitleTrack],
+    ) -> None:
+        """解析一個 AdaptationSet 的所有 Representation"""
+        # 從 AdaptationSet 層級讀取 (可能是空的)
+        adapt_mime_type: str = adapt_set.get("mimeType", "")
+        lang: str | None = adapt_set.get("lang") or None
+
+        if self._is_subtitle_adapt_set(adapt_set, adapt_mime_type):
+            for rep_element in adapt_set.findall(
+                "./Representation", self.namespaces
+            ):
+                track = self._parse_subtitle_representation(
+                    rep_element, adapt_set, lang
+                )
+                if track:
+                    subtitle_tracks.append(track)
+            return
+
+        for rep_element in adapt_set.findall("./Representation", self.namespaces):
+            track = self._parse_representation(rep_element, adapt_set, lang)
+
+            if track:
+                # 先使用 AdaptationSet 的 mimeType
+                # 不存在用 Representation 的 mimeType (已存儲在 track.mime_type)
+                effective_mime: str = adapt_mime_type or track.mime_type
+
+                if effective_mime.startswith("video"):
+                    video_tracks.append(track)
+                elif effective_mime.startswith("audio"):
+                    audio_tracks.append(track)
+
+    def parse(self) -> MPDContent:
+        """以 iterparse 逐個 AdaptationSet 解析 處理完就釋放 大型 LIVE MPD 不必整棵樹留在記憶體
+
+        只取第一個 Period 的軌道 DRM 訊息則從整份文件收集
+        """
+        mpd_ns: str = f"{{{self.NAMESPACES['']}}}"
+        period_tag: str = f"{mpd_ns}Period"
+        adapt_tag: str = f"{mpd_ns}AdaptationSet"
+        prot_tag: str = f"{mpd_ns}ContentProtection"
 
         video_tracks: list[MediaTrack] = []
         audio_tracks: list[MediaTrack] = []
         subtitle_tracks: list[SubtitleTrack] = []
-
-        for adapt_set in period.findall("./AdaptationSet", self.namespaces):
-            # 從 AdaptationSet 層級讀取 (可能是空的)
-            adapt_mime_type: str = adapt_set.get("mimeType", "")
-            lang: str | None = adapt_set.get("lang") or None
-
-            if self._is_subtitle_adapt_set(adapt_set, adapt_mime_type):
-                for rep_element in adapt_set.findall(
-                    "./Representation", self.namespaces
-                ):
-                    track = self._parse_subtitle_representation(
-                        rep_element, adapt_set, lang
-                    )
-                    if track:
-                        subtitle_tracks.append(track)
+        drm_info: dict[str, Any] = {}
+        seen: set[str] = set()
+        cenc_pssh: list[str] = []
+        mspr_pro: list[str] = []
+        first_period: etree._Element | None = None
+
+        for event, elem in etree.iterparse(
+            BytesIO(self.xml_data),
+            events=("start", "end"),
+            tag=(period_tag, adapt_tag, prot_tag),
+            resolve_entities=False,
+            huge_tree=True,
+        ):
+            if event == "start":
+                if elem.tag == period_tag and first_period is None:
+                    first_period = elem
                 continue
 
-            for rep_element in adapt_set.findall("./Representation", self.namespaces):
-                track = self._parse_representation(rep_element, adapt_set, lang)
-
-                if track:
-                    # 先使用 AdaptationSet 的 mimeType
-                    # 不存在用 Representation 的 mimeType (已存儲在 track.mime_type)
-                    effective_mime: str = adapt_mime_type or track.mime_type
-
-                    if effective_mime.startswith("video"):
-                        video_tracks.append(track)
-                    elif effective_mime.startswith("audio"):
-                        audio_tracks.append(track)
+            if elem.tag == prot_tag:
+                self._collect_drm(elem, drm_info, seen, cenc_pssh, mspr_pro)
+            elif elem.tag == adapt_tag:
+                if first_period is not None and elem.getparent() is first_period:
+                    self._collect_adaptation_set(elem, video_tracks, audio_tracks, subtitle_tracks)
+                # 已處理的節點不再需要
+                elem.clear(keep_tail=True)
+                while elem.getprevious() is not None:
+                    del elem.getparent()[0]
+
+        if first_period is None:
+            raise ValueError("MPD contains no Period elements")
 
         return MPDContent(
             video_tracks=video_tracks,
             audio_tracks=audio_tracks,
             subtitle_tracks=subtitle_tracks,
             base_url=self.base_url,
-            drm_info=self._parse_drm_info(),
+            drm_info=drm_info,
+            cenc_pssh=cenc_pssh,
+            mspr_pro=mspr_pro,
         )
 
+    async def parse_all_tracks(self) -> MPDContent:
+        """解析 MPD 並返回所有視訊 音訊 字幕軌道"""
+        return await asyncio.to_thread(self.parse)
+
     def validate_mpd_structure(self) -> list[str]:
         issues: list[str] = []
 
-        period: ET.Element | None = self.root.find("./Period", self.namespaces)
+        period: etree._Element | None = self.root.find("./Period", self.namespaces)
         if period is None:
             issues.append("ERROR: No Period element found")
             return issues
 
-        adapt_sets: list[ET.Element] = period.findall("./AdaptationSet", self.namespaces)
+        adapt_sets: list[etree._Element] = period.findall("./AdaptationSet", self.namespaces)
         if not adapt_sets:
             issues.append("WARNING: No AdaptationSet elements found")
 
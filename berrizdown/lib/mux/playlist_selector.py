@@ -5,8 +5,9 @@ from typing import Any, Optional, Union
 from InquirerPy import inquirer
 from rich.console import Console
 
-from berrizdown.lib.mux.parse_hls import HLSAudioTrack, HLSContent, HLSSegment, HLSVariant, HLSSubTrack
-from berrizdown.lib.mux.parse_mpd import MediaTrack, MPDContent, Segment, SubtitleTrack
+from berrizdown.lib.mux.parse_hls import HLSAudioTrack, HLSContent, HLSParser, HLSSegment, HLSVariant, HLSSubTrack
+from berrizdown.lib.mux.parse_mpd import MediaTrack, MPDContent, Segment, SegmentUrls, SubtitleTrack
+from berrizdown.lib.processbar.processbar import MultiTrackProgressManager
 from berrizdown.static.color import Color
 from berrizdown.static.parameter import paramstore
 from berrizdown.unit.handle.handle_log import setup_logging
@@ -118,6 +119,9 @@ class PlaylistSelector:
         else:
             selected_sub, sub_type = await self._select_subtitle_tracks(s_lang_choice)
 
+        # 只取得實際選中的 HLS 軌道的 media playlist
+        await self._resolve_hls(selected_video, selected_audio, selected_sub)
+
         # 更新 paramstore
         self._update_paramstore(video_type, audio_type)
         content_type: str | None = video_type if video_type == audio_type else "mixed"
@@ -231,51 +235,53 @@ class PlaylistSelector:
         is_subtitle = track_type is TrackType.SUB
         prompt_msg = f"Choose {'one or more' if is_subtitle else 'a'} {track_type.value} track [{self.select_mode.upper()}]:"
 
-        try:
-            if is_subtitle:
-                selected = await inquirer.checkbox(
+        # --parallel-titles 時多部影片可能同時要求選擇軌道
+        async with MultiTrackProgressManager().prompt():
+            try:
+                if is_subtitle:
+                    selected = await inquirer.checkbox(
+                        message=prompt_msg,
+                        choices=choices,
+                        default=choices[-1:] if choices else [],
+                    ).execute_async()
+
+                    if not selected:
+                        logger.info("No subtitle tracks selected or cancelled")
+                        return None, None
+
+                    selected_tracks = []
+                    selected_labels = []
+                    for choice in selected:
+                        track, label = value_map.get(choice, (None, None))
+                        if track is not None:
+                            selected_tracks.append(track)
+                            selected_labels.append(label)
+
+                    return (
+                        selected_tracks if selected_tracks else None,
+                        selected_labels if selected_labels else None,
+                    )
+
+                # 單選
+                default_choice = choices[-1] if choices else None
+                answer = await inquirer.select(
                     message=prompt_msg,
                     choices=choices,
-                    default=choices[-1:] if choices else [],
+                    default=default_choice,
                 ).execute_async()
 
-                if not selected:
-                    logger.info("No subtitle tracks selected or cancelled")
+                if answer not in value_map:
                     return None, None
 
-                selected_tracks = []
-                selected_labels = []
-                for choice in selected:
-                    track, label = value_map.get(choice, (None, None))
-                    if track is not None:
-                        selected_tracks.append(track)
-                        selected_labels.append(label)
-
-                return (
-                    selected_tracks if selected_tracks else None,
-                    selected_labels if selected_labels else None,
-                )
-
-            # 單選
-            default_choice = choices[-1] if choices else None
-            answer = await inquirer.select(
-                message=prompt_msg,
-                choices=choices,
-                default=default_choice,
-            ).execute_async()
+                track, label = value_map[answer]
+                return track, label
 
-            if answer not in value_map:
+            except KeyboardInterrupt:
+                logger.info("User cancelled track selection")
+                return None, None
+            except Exception as e:
+                logger.exception("Track selection prompt failed: %s", e)
                 return None, None
-
-            track, label = value_map[answer]
-            return track, label
-
-        except KeyboardInterrupt:
-            logger.info("User cancelled track selection")
-            return None, None
-        except Exception as e:
-            logger.exception("Track selection prompt failed: %s", e)
-            return None, None
     
     async def _auto_select_track(
         self, target: int, track_type: TrackType
@@ -545,6 +551,27 @@ class PlaylistSelector:
             raise ValueError("No audio tracks available")
         return await self._ask_track(TrackType.AUDIO)
 
+    @staticmethod
+    async def _resolve_hls(*selected: Any) -> None:
+        """補齊選中 HLS 軌道的 segments 字幕可能是 list"""
+        tracks: list[Any] = []
+        for item in selected:
+            if isinstance(item, list):
+                tracks.extend(item)
+            elif item is not None:
+                tracks.append(item)
+        await HLSParser().resolve(*tracks)
+
+    async def resolve_all_hls(self) -> None:
+        """列出全部軌道前使用 需要每個 HLS 軌道的 segments 數量"""
+        if self.hls_content is None:
+            return
+        await self._resolve_hls(
+            self.hls_content.video_variants,
+            self.hls_content.audio_tracks,
+            self.hls_content.sub_tracks,
+        )
+
     async def _apply_filters(
         self, track: Any | None, track_type: str | None
     ) -> tuple[Any | None, float | None, float | None]:
@@ -640,44 +667,43 @@ class PlaylistSelector:
 
         timeline: list = track.segment_timeline
         timescale: int = getattr(track, "timescale", 1) or 1
-        url_map: dict[int, str] = self._build_url_map(track, timeline, timescale)
+        view: SegmentUrls = (
+            track.segment_urls
+            if isinstance(track.segment_urls, SegmentUrls)
+            else SegmentUrls("", track.segment_template or f"{track.id}/$Time$.m4s", str(track.id), timeline)
+        )
 
         segments: list[SegmentInfo] = []
         actual_start: float | None = None
         actual_end: float | None = None
-        cumulative_time: float = 0.0 # 用於追蹤累積時間 (當 t 不存在時)
-
-        for seg in timeline:
-            # 獲取時間戳 (t 可能不存在,使用累積時間)
-            seg_t: float = getattr(seg, "t", int(cumulative_time * timescale))
-            seg_d: float = getattr(seg, "d", 0)
-            seg_r: float = getattr(seg, "r", 0)
-            repeat_count: int = (seg_r + 1) if seg_r >= 0 else 1
-
-            for r in range(repeat_count):
-                current_t: float = seg_t + r * seg_d
-                current_start: float|int = current_t / timescale
-                current_end: float|int = current_start + seg_d / timescale
-                
-                # 使用重疊邏輯判定
-                if self._in_time_range(current_start, current_end):
-                    if actual_start is None:
-                        actual_start: float = current_start
-                    actual_end: float = current_end
-                    url: str = url_map.get(current_t) or self._generate_segment_url(track, current_t)
-                    segments.append(
-                        SegmentInfo(
-                            url=url,
-                            start_time=current_start,
-                            duration=seg_d / timescale,
-                            index=len(segments),
-                        )
-                    )
-                elif self.end_time and current_start >= self.end_time + self.TIME_TOLERANCE:
-                    # 已超過結束時間(含容差),提早退出
-                    break
 
-                cumulative_time = current_end
+        # 直接跳到起始時間附近 往前多看一個片段讓容差判定維持一致
+        first: int = 0
+        if self.start_time is not None and len(view):
+            first = max(view.index_at(int((self.start_time - self.TIME_TOLERANCE) * timescale)) - 1, 0)
+
+        for index in range(first, len(view)):
+            current_t: int = view.time_of(index)
+            seg_d: int = view.duration_of(index)
+            current_start: float = current_t / timescale
+            current_end: float = current_start + seg_d / timescale
+
+            # 使用重疊邏輯判定
+            if self._in_time_range(current_start, current_end):
+                if actual_start is None:
+                    actual_start = current_start
+                actual_end = current_end
+                segments.append(
+                    SegmentInfo(
+                        url=view[index],
+                        start_time=current_start,
+                        duration=seg_d / timescale,
+                        index=len(segments),
+                    )
+                )
+            elif self.end_time and current_start >= self.end_time + self.TIME_TOLERANCE:
+                # 已超過結束時間(含容差),提早退出
+                break
 
         # 確保返回值合理
         if segments:
@@ -707,43 +733,6 @@ class PlaylistSelector:
                 return False
         return True
 
-    def _build_url_map(self, track: Any, timeline: list, timescale: int) -> dict[int, str]:
-        """建置時間戳到 URL 的映射"""
-        url_map: dict[int, str] = {}
-        if not hasattr(track, "segment_urls") or not track.segment_urls:
-            return url_map
-
-        url_idx: int = 0
-        cumulative_t: float = 0
-
-        for seg in timeline:
-            seg_t: float = getattr(seg, "t", cumulative_t)
-            seg_d: float = getattr(seg, "d", 0)
-            seg_r: float = getattr(seg, "r", 0)
-            repeat_count: int = (seg_r + 1) if seg_r >= 0 else 1
-
-            for r in range(repeat_count):
-                current_t: float = seg_t + r * seg_d
-                if url_idx < len(track.segment_urls):
-                    url_map[current_t] = track.segment_urls[url_idx]
-                    url_idx += 1
-
-            cumulative_t: float = seg_t + repeat_count * seg_d
-
-        return url_map
-
-    def _generate_segment_url(self, track: Any, time: int) -> str:
-        """生成 MPD segment URL (使用模板或回退)"""
-        if hasattr(track, "segment_template") and track.segment_template:
-            return (
-                track.segment_template
-                .replace("$RepresentationID$", str(track.id))
-                .replace("$Time$", str(time))
-                .replace("$Bandwidth$", str(track.bandwidth))
-                .replace("$Number$", str(time))
-            )
-        return f"{track.id}/{time}.m4s"
-
     def _convert_to_mpd_segments(self, seg_infos: list[SegmentInfo], timescale: int) -> list[Segment]:
         """轉換 SegmentInfo 到 MPD Segment 格式"""
         return [Segment(t=int(s.start_time * timescale), d=int(s.duration * timescale), r=0) for s in seg_infos]
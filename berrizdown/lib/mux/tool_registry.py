@@ -0,0 +1,186 @@
+import asyncio
+import os
+import shutil
+import subprocess
+import threading
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+import orjson
+
+from berrizdown.lib.path import Path
+from berrizdown.static.route import Route
+from berrizdown.unit.handle.handle_log import setup_logging
+
+logger = setup_logging("tool_registry", "lavender")
+
+
+# 查詢版本用的參數 None 表示沒有版本參數 只確認檔案存在
+VERSION_ARGS: dict[str, list[str] | None] = {
+    "ffmpeg": ["-version"],
+    "ffprobe": ["-version"],
+    "mkvmerge": ["--version"],
+    "packager": ["--version"],
+    "mp4decrypt": None,
+}
+
+# ffmpeg mov demuxer 支援 -decryption_key (mux 時直接解密 cenc)
+DECRYPTION_KEY = "decryption_key"
+
+
+@dataclass
+class ToolInfo:
+    name: str
+    path: str | None = None
+    version: str | None = None
+    mtime_ns: int | None = None
+    size: int | None = None
+    capabilities: list[str] = field(default_factory=list)
+    # PATH 上找到但無法執行 一樣快取 執行檔沒變就不再重試
+    usable: bool = True
+
+    @property
+    def ok(self) -> bool:
+        return self.path is not None and self.usable
+
+    def supports(self, capability: str) -> bool:
+        return capability in self.capabilities
+
+
+def _bundled(name: str) -> Path:
+    R = Route()
+    return {
+        "ffmpeg": R.ffmpeg,
+        "ffprobe": R.ffprobe,
+        "mkvmerge": R.mkvmerge_path,
+        "packager": R.packager_path,
+        "mp4decrypt": R.mp4decrypt_path,
+    }[name]
+
+
+def _fingerprint(path: str) -> tuple[int, int] | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _run(cmd: list[str]) -> str | None:
+    """回傳 stdout 失敗時回傳 None"""
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, errors="replace", timeout=15, check=False)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout if result.returncode == 0 else None
+
+
+class ToolRegistry:
+    """外部工具的路徑 版本與能力
+
+    優先使用 lib/tools 內附的執行檔 沒有時才找 PATH
+    結果依執行檔的路徑 mtime size 存在 lock/tool_registry.json 執行檔沒變就不再執行 --version
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path: Path = path
+        self._state: dict[str, dict[str, Any]] | None = None
+        self._tools: dict[str, ToolInfo] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+    def _load(self) -> dict[str, dict[str, Any]]:
+        if self._state is None:
+            self._state = {}
+            if self.path.exists():
+                try:
+                    self._state = orjson.loads(self.path.read_bytes())
+                except (OSError, orjson.JSONDecodeError) as e:
+                    logger.warning(f"Ignore broken tool registry {self.path}: {e}")
+        return self._state
+
+    def _save(self) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp: Path = self.path.with_name(f"{self.path.name}.tmp")
+            tmp.write_bytes(orjson.dumps(self._state, option=orjson.OPT_INDENT_2))
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning(f"Failed to save tool registry {self.path}: {e}")
+
+    def get(self, name: str) -> ToolInfo:
+        """同一個行程只解析一次 之後直接回傳"""
+        with self._lock:
+            info: ToolInfo | None = self._tools.get(name)
+            if info is None:
+                info = self._resolve(name)
+                self._tools[name] = info
+            return info
+
+    def path_of(self, name: str) -> str | None:
+        info: ToolInfo = self.get(name)
+        return info.path if info.ok else None
+
+    def supports(self, name: str, capability: str) -> bool:
+        return self.get(name).supports(capability)
+
+    async def get_async(self, name: str) -> ToolInfo:
+        """event loop 中使用 尚未解析時 --version 等子行程在執行緒中執行 不阻塞其他下載"""
+        info: ToolInfo | None = self._tools.get(name)
+        if info is not None:
+            return info
+        return await asyncio.to_thread(self.get, name)
+
+    async def path_of_async(self, name: str) -> str | None:
+        info: ToolInfo = await self.get_async(name)
+        return info.path if info.ok else None
+
+    async def supports_async(self, name: str, capability: str) -> bool:
+        return (await self.get_async(name)).supports(capability)
+
+    def _resolve(self, name: str) -> ToolInfo:
+        bundled: Path = _bundled(name)
+        if bundled.is_file():
+            path, is_bundled = str(bundled), True
+        else:
+            path, is_bundled = shutil.which(name), False
+        state: dict[str, dict[str, Any]] = self._load()
+        if path is None:
+            if state.pop(name, None) is not None:
+                self._save()
+            return ToolInfo(name)
+
+        key: tuple[int, int] | None = _fingerprint(path)
+        cached: dict[str, Any] | None = state.get(name)
+        if cached is not None and cached.get("path") == path and (cached.get("mtime_ns"), cached.get("size")) == key:
+            try:
+                return ToolInfo(**cached)
+            except TypeError:
+                # 舊版或損壞的紀錄 重新檢查
+                pass
+
+        info: ToolInfo = self._probe(name, path, is_bundled, key)
+        state[name] = asdict(info)
+        self._save()
+        return info
+
+    def _probe(self, name: str, path: str, is_bundled: bool, key: tuple[int, int] | None) -> ToolInfo:
+        mtime_ns, size = key if key is not None else (None, None)
+        version: str | None = None
+        args: list[str] | None = VERSION_ARGS[name]
+        if args is not None:
+            output: str | None = _run([path, *args])
+            if output is None and not is_bundled:
+                # PATH 上找到但無法執行 視為沒有安裝
+                return ToolInfo(name, path, None, mtime_ns, size, usable=False)
+            if output:
+                version = next((line.strip() for line in output.splitlines() if line.strip()), None)
+        capabilities: list[str] = []
+        if name == "ffmpeg" and version is not None:
+            demuxer_help: str | None = _run([path, "-hide_banner", "-h", "demuxer=mov"])
+            if demuxer_help and "-decryption_key" in demuxer_help:
+                capabilities.append(DECRYPTION_KEY)
+        logger.debug(f"Probed {name}: {path} {version or ''} {capabilities}")
+        return ToolInfo(name, path, version, mtime_ns, size, capabilities)
+
+
+tool_registry: ToolRegistry = ToolRegistry(Route().tool_registry)
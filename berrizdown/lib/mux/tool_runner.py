@@ -0,0 +1,167 @@
+import asyncio
+import os
+import re
+from collections import deque
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+
+from berrizdown.lib.load_yaml_config import CFG
+from berrizdown.unit.handle.handle_log import setup_logging
+
+logger = setup_logging("tool_runner", "lavender")
+
+
+# ffmpeg -progress pipe:1 每段輸出 out_time_us=...
+FFMPEG_TIME = re.compile(r"^out_time_(?:us|ms)=(\d+)$")
+# mkvmerge --gui-mode 輸出 #GUI#progress 45%
+MKVMERGE_PROGRESS = re.compile(r"^#GUI#progress (\d+)%$")
+
+
+@dataclass
+class ToolResult:
+    returncode: int
+    stdout: str
+    stderr: str
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0
+
+
+class ToolRunner:
+    """外部工具 (ffmpeg mkvmerge packager mp4decrypt ffprobe) 的非同步執行器
+
+    - 以 asyncio.create_subprocess_exec 執行 不佔用 executor 執行緒
+    - CPU 密集的工具共用同一個上限 多部影片同時進入 mux 階段也不會塞爆 CPU
+    - 逐行讀取輸出 只保留最後幾行 需要時交給 on_line 解析進度
+    - 被取消時直接結束子行程
+    """
+
+    TAIL_LINES: int = 50
+
+    def __init__(self, limit: int) -> None:
+        self.limit: int = max(1, limit)
+        self._semaphore: asyncio.Semaphore | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.limit)
+        return self._semaphore
+
+    async def run(
+        self,
+        cmd: Sequence[str | os.PathLike],
+        heavy: bool = True,
+        on_line: Callable[[str], None] | None = None,
+        keep_stdout: bool = False,
+    ) -> ToolResult:
+        """執行指令並等待結束 heavy 為 False 的輕量工具 (ffprobe) 不受上限限制
+
+        keep_stdout 為 True 時保留完整 stdout (ffprobe JSON) 否則 stdout 與 stderr 都只保留結尾
+        """
+        if not heavy:
+            return await self._run(cmd, on_line, keep_stdout)
+        async with self.semaphore:
+            return await self._run(cmd, on_line, keep_stdout)
+
+    async def _run(
+        self,
+        cmd: Sequence[str | os.PathLike],
+        on_line: Callable[[str], None] | None,
+        keep_stdout: bool,
+    ) -> ToolResult:
+        args: list[str] = [os.fspath(c) for c in cmd]
+        logger.debug(f"Run: {' '.join(args)}")
+        proc: asyncio.subprocess.Process = await asyncio.create_subprocess_exec(
+            *args,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        stdout_lines: deque[str] | list[str] = [] if keep_stdout else deque(maxlen=self.TAIL_LINES)
+        stderr_lines: deque[str] = deque(maxlen=self.TAIL_LINES)
+        try:
+            await asyncio.gather(
+                self._pump(proc.stdout, stdout_lines, on_line),
+                self._pump(proc.stderr, stderr_lines, on_line),
+            )
+            returncode: int = await proc.wait()
+        except asyncio.CancelledError:
+            await self._kill(proc)
+            raise
+        return ToolResult(returncode, "\n".join(stdout_lines), "\n".join(stderr_lines))
+
+    @staticmethod
+    async def _pump(
+        stream: asyncio.StreamReader | None,
+        sink: deque[str] | list[str],
+        on_line: Callable[[str], None] | None,
+    ) -> None:
+        if stream is None:
+            return
+        pending: bytes = b""
+        while chunk := await stream.read(65536):
+            # ffmpeg 的進度列用 \r 覆寫 同樣視為換行
+            pending += chunk.replace(b"\r", b"\n")
+            *lines, pending = pending.split(b"\n")
+            for raw in lines:
+                ToolRunner._emit(raw, sink, on_line)
+        if pending:
+            ToolRunner._emit(pending, sink, on_line)
+
+    @staticmethod
+    def _emit(raw: bytes, sink: deque[str] | list[str], on_line: Callable[[str], None] | None) -> None:
+        line: str = raw.decode("utf-8", errors="replace").strip()
+        if not line:
+            return
+        sink.append(line)
+        if on_line is not None:
+            try:
+                on_line(line)
+            except Exception as e:
+                logger.debug(f"Progress callback failed on {line!r}: {e}")
+
+    @staticmethod
+    async def _kill(proc: asyncio.subprocess.Process) -> None:
+        if proc.returncode is not None:
+            return
+        try:
+            proc.kill()
+        except ProcessLookupError:
+            return
+        await asyncio.shield(proc.wait())
+        logger.warning(f"Killed child process {proc.pid}")
+
+
+def ffmpeg_progress(update: Callable[[float], None]) -> Callable[[str], None]:
+    """解析 ffmpeg -progress 輸出 回報已處理的秒數"""
+
+    def on_line(line: str) -> None:
+        if match := FFMPEG_TIME.match(line):
+            update(int(match.group(1)) / 1_000_000)
+
+    return on_line
+
+
+def mkvmerge_progress(update: Callable[[float], None]) -> Callable[[str], None]:
+    """解析 mkvmerge --gui-mode 的進度輸出"""
+
+    def on_line(line: str) -> None:
+        if match := MKVMERGE_PROGRESS.match(line):
+            update(float(match.group(1)))
+
+    return on_line
+
+
+def _default_limit() -> int:
+    configured = CFG["Container"].get("max_processes", 0)
+    if isinstance(configured, int) and not isinstance(configured, bool) and configured > 0:
+        return configured
+    return max(1, (os.cpu_count() or 2) // 2)
+
+
+tool_runner: ToolRunner = ToolRunner(_default_limit())
@@ -1,18 +1,23 @@
 import os
+from typing import Any
 
 import ffmpeg
-from berrizdown.static.parameter import paramstore
+import orjson
+
+from berrizdown.lib.mux.tool_registry import tool_registry
+from berrizdown.lib.mux.tool_runner import ToolResult, tool_runner
 
 
 class VideoInfo:
-    def __init__(self, path: str):
+    def __init__(self, path: str, probe_data: dict[str, Any] | None = None):
         if not os.path.exists(path):
             raise FileNotFoundError(f"File not found: {path}")
         
         self.path = path
         
-        if paramstore.get("ffprobe_path_ok") is True:
-            self._probe_data = ffmpeg.probe(self.path)
+        self.ffprobe: str | None = tool_registry.path_of("ffprobe")
+        if self.ffprobe is not None:
+            self._probe_data = probe_data if probe_data is not None else ffmpeg.probe(self.path, cmd=self.ffprobe)
 
             self._format = self._probe_data["format"]
             self._vstreams = self._probe_data["streams"]
@@ -20,6 +25,23 @@ class VideoInfo:
             self._size_bytes = int(self._format.get("size", 0))
             self._duration_sec = float(self._format.get("duration", 0.0))
 
+    @classmethod
+    async def probe(cls, path: str) -> "VideoInfo":
+        """非同步執行 ffprobe 不佔用 executor 執行緒"""
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"File not found: {path}")
+        ffprobe: str | None = await tool_registry.path_of_async("ffprobe")
+        if ffprobe is None:
+            return cls(path)
+        result: ToolResult = await tool_runner.run(
+            [ffprobe, "-show_format", "-show_streams", "-of", "json", path],
+            heavy=False,
+            keep_stdout=True,
+        )
+        if not result.ok:
+            raise ffmpeg.Error("ffprobe", result.stdout.encode(), result.stderr.encode())
+        return cls(path, orjson.loads(result.stdout))
+
     @property
     def size(self) -> str:
         size_gb = self._size_bytes / (1024**3)
@@ -104,7 +126,7 @@ class VideoInfo:
         return "unknown"
 
     def as_dict(self) -> dict:
-        if paramstore.get("ffprobe_path_ok") is True:
+        if self.ffprobe is not None:
             return {
                 "size": self.size,
                 "duration": self.duration,
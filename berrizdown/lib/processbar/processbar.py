@@ -1,4 +1,7 @@
+import asyncio
 import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from typing import Optional
 
 from rich.console import Console
@@ -22,11 +25,30 @@ class MultiTrackProgressManager:
         self.console = Console()
         self.progress_bars: dict[str, ProgressBar] = {}
         self.live: Live | None = None
+        # 同時下載多部影片時 每部各 start 一次 全部 stop 後才關閉 Live
+        self._users: int = 0
+        self._prompt_lock: asyncio.Lock = asyncio.Lock()
         self._initialized = True
 
-    def create_progress_bar(self, track_type: str, total: int, video_duration: str) -> "ProgressBar":
-        progress_bar = ProgressBar(total=total, video_duration=video_duration, prefix=track_type, manager=self)
-        self.progress_bars[track_type] = progress_bar
+    @asynccontextmanager
+    async def prompt(self) -> AsyncIterator[None]:
+        """互動選單期間暫停進度條 多部影片同時處理時一次只顯示一個選單"""
+        async with self._prompt_lock:
+            live: Live | None = self.live
+            if live is not None:
+                live.stop()
+            try:
+                yield
+            finally:
+                if live is not None and self.live is live:
+                    live.start()
+
+    def create_progress_bar(self, track_type: str, total: int, video_duration: str, owner: str | None = None) -> "ProgressBar":
+        """owner 為媒體 ID 多部影片同時下載時進度條各自獨立"""
+        key: str = f"{owner}:{track_type}" if owner else track_type
+        prefix: str = f"{owner[:8]} {track_type}" if owner and self._users > 1 else track_type
+        progress_bar = ProgressBar(total=total, video_duration=video_duration, prefix=prefix, manager=self)
+        self.progress_bars[key] = progress_bar
         return progress_bar
 
     def _generate_table(self) -> Table:
@@ -39,6 +61,7 @@ class MultiTrackProgressManager:
         return table
 
     def start(self):
+        self._users += 1
         if self.live is None:
             self.live = Live(
                 self._generate_table(),
@@ -52,10 +75,24 @@ class MultiTrackProgressManager:
         if self.live:
             self.live.update(self._generate_table())
 
-    def stop(self):
+    def stop(self, owner: str | None = None):
+        self._users = max(0, self._users - 1)
+        if self._users > 0:
+            # 其他影片仍在下載 只移除這部影片的進度條
+            if owner:
+                self.remove_progress_bars(owner)
+            return
         if self.live:
             self.live.stop()
             self.live = None
+        if owner:
+            self.remove_progress_bars(owner)
+
+    def remove_progress_bars(self, owner: str):
+        """移除指定媒體的進度條"""
+        for key in [k for k in self.progress_bars if k.startswith(f"{owner}:")]:
+            del self.progress_bars[key]
+        self.update()
 
     def remove_all_progress_bars(self):
         """移除所有進度條"""
@@ -93,6 +130,7 @@ class ProgressBar:
         self.ping_ms: float = 0.0
         self.total_size_mb: float = 0.0
         self.duration_seconds: str = video_duration
+        self.window: int = 0
 
     def _generate_rich_text(self) -> Text:
         percent = self.current / self.total if self.total > 0 else 0
@@ -116,6 +154,10 @@ class ProgressBar:
             extra_info.append((f"{self.ping_ms:.0f}ms", "red"))
         if self.total_size_mb > 0:
             extra_info.append((f"~{self.total_size_mb:.1f}MB", "blue"))
+        if self.speed_mbps > 0:
+            extra_info.append((f"{self.speed_mbps:.1f}Mbps", "green"))
+        if self.window > 0:
+            extra_info.append((f"x{self.window}", "magenta"))
 
         if extra_info:
             text.append(" | ")
@@ -141,6 +183,8 @@ class ProgressBar:
                 self.ping_ms = download_progress.ping_ms
             if hasattr(download_progress, "total_size_mb"):
                 self.total_size_mb = download_progress.total_size_mb
+            if hasattr(download_progress, "window"):
+                self.window = download_progress.window
 
         elif progress is not None:
             self.current = progress
@@ -1,5 +1,3 @@
-import asyncio
-
 from berrizdown.lib.mux.videoinfo import VideoInfo
 from berrizdown.lib.path import Path
 from berrizdown.static.parameter import paramstore
@@ -10,16 +8,12 @@ logger = setup_logging("extract_video_info", "dark_green")
 
 async def extract_video_info(path: Path) -> tuple[str, str, str]:
     """異步提取最終 MP4 檔案的編解碼器、畫質標籤和音頻編解碼器"""
-    vv: VideoInfo = VideoInfo(path)
+    vv: VideoInfo = await VideoInfo.probe(path)
 
-    # 使用 TaskGroup 並將 FFmpeg 探針的同步操作包裝成異步
-    async with asyncio.TaskGroup() as tg:
-        codec_task: asyncio.Task[str] = tg.create_task(asyncio.to_thread(lambda: vv.codec))
-        quality_task: asyncio.Task[str] = tg.create_task(asyncio.to_thread(lambda: vv.quality_label))
-        audio_task: asyncio.Task[str] = tg.create_task(asyncio.to_thread(lambda: vv.audio_codec))
-    video_codec: str = codec_task.result()
-    video_quality_label: str = quality_task.result()
-    video_audio_codec: str = audio_task.result()
+    # ffprobe 結果已取得 以下只是讀取資料
+    video_codec: str = vv.codec
+    video_quality_label: str = vv.quality_label
+    video_audio_codec: str = vv.audio_codec
     if video_audio_codec == "unknown":
         if paramstore.get("noaudio") is True:
             video_audio_codec = "{audio}"
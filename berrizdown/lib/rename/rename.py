@@ -10,6 +10,7 @@ from berrizdown.lib.__init__ import (
 )
 from berrizdown.lib.load_yaml_config import CFG
 from berrizdown.lib.mux.mux import FFmpegMuxer
+from berrizdown.lib.mux.tool_registry import tool_registry
 from berrizdown.lib.name_metadata import meta_name
 from berrizdown.lib.path import Path
 from berrizdown.lib.rename.extract_video_info import extract_video_info
@@ -125,7 +126,7 @@ class SUCCESS:
         video_codec: str
         video_quality_label: str
         video_audio_codec: str
-        if paramstore.get("ffprobe_path_ok") is True:
+        if await tool_registry.path_of_async("ffprobe") is not None:
             video_codec, video_quality_label, video_audio_codec = await extract_video_info(self.path)
         else:
             video_codec, video_quality_label, video_audio_codec = "unknow_codec", "unknown_resolution", "unknown_audio_codec"
@@ -0,0 +1,168 @@
+from collections.abc import Mapping
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any
+
+from berrizdown.lib.load_yaml_config import CFG, YAML_PATH, ConfigLoader
+from berrizdown.lib.path import Path
+from berrizdown.static.config_file import read_config
+from berrizdown.unit.handle.handle_log import setup_logging
+
+logger = setup_logging("settings", "fresh_chartreuse")
+
+
+@dataclass(frozen=True, slots=True)
+class APIClientSettings:
+    """BerrizAPIClient 區段"""
+
+    show_log: bool
+    base_sleep: float
+    max_sleep: float
+    max_retries: int
+    connector_limit: int
+    connector_limit_per_host: int
+    keepalive_timeout: float
+    enable_cleanup_closed: bool
+    force_close: bool
+    use_dns_cache: bool
+    ttl_dns_cache: int | None
+    timeouttotal: float
+    timeeoutconnect: float
+    timeoutsock_connect: float
+    timeeoutsock_read: float
+    http2_hosts: tuple[str, ...]
+
+    @classmethod
+    def from_section(cls, section: Mapping[str, Any]) -> "APIClientSettings":
+        return cls(
+            show_log=section.get("show_log") is True,
+            base_sleep=float(section["base_sleep"]),
+            max_sleep=float(section["max_sleep"]),
+            max_retries=int(section["max_retries"]),
+            connector_limit=int(section["connector_limit"]),
+            connector_limit_per_host=int(section["connector_limit_per_host"]),
+            keepalive_timeout=float(section["keepalive_timeout"]),
+            enable_cleanup_closed=bool(section["enable_cleanup_closed"]),
+            force_close=bool(section["force_close"]),
+            use_dns_cache=bool(section["use_dns_cache"]),
+            ttl_dns_cache=section.get("ttl_dns_cache"),
+            timeouttotal=float(section["timeouttotal"]),
+            timeeoutconnect=float(section["timeeoutconnect"]),
+            timeoutsock_connect=float(section["timeoutsock_connect"]),
+            timeeoutsock_read=float(section["timeeoutsock_read"]),
+            http2_hosts=tuple(section.get("http2_hosts") or ()),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class VideoDownloadSettings:
+    """VideoDownload 區段 選填的鍵套用與原本 .get() 相同的預設值"""
+
+    connector_limit: int
+    connector_limit_per_host: int
+    connector_ttl_dns_cache: int | None
+    connector_use_dns_cache: bool
+    connector_keepalive_timeout: float
+    connector_enable_cleanup_closed: bool
+    timeout_total: float
+    timeout_connect: float
+    timeout_sock_read: float
+    timeout_sock_connect: float
+    max_retries: int
+    semaphore: int
+    global_concurrency: int
+    global_limit_per_host: int
+    adaptive_concurrency: bool
+    resume: bool
+    stream_merge: bool
+    segment_memory_buffer_mb: int
+    pipeline_decrypt: bool
+    ledger_checksum: bool
+    http2_hosts: tuple[str, ...]
+
+    @classmethod
+    def from_section(cls, section: Mapping[str, Any]) -> "VideoDownloadSettings":
+        return cls(
+            connector_limit=int(section["connector_limit"]),
+            connector_limit_per_host=int(section["connector_limit_per_host"]),
+            connector_ttl_dns_cache=section.get("connector_ttl_dns_cache"),
+            connector_use_dns_cache=bool(section["connector_use_dns_cache"]),
+            connector_keepalive_timeout=float(section["connector_keepalive_timeout"]),
+            connector_enable_cleanup_closed=bool(section["connector_enable_cleanup_closed"]),
+            timeout_total=float(section["timeout_total"]),
+            timeout_connect=float(section["timeout_connect"]),
+            timeout_sock_read=float(section["timeout_sock_read"]),
+            timeout_sock_connect=float(section["timeout_sock_connect"]),
+            max_retries=int(section["max_retries"]),
+            semaphore=int(section["semaphore"]),
+            global_concurrency=int(section.get("global_concurrency", section["semaphore"])),
+            global_limit_per_host=int(section.get("global_limit_per_host", section["connector_limit_per_host"])),
+            adaptive_concurrency=section.get("adaptive_concurrency", False) is True,
+            resume=section.get("resume", False) is True,
+            stream_merge=section.get("stream_merge", False) is True,
+            segment_memory_buffer_mb=int(section.get("segment_memory_buffer_mb", 0) or 0),
+            pipeline_decrypt=section.get("pipeline_decrypt", False) is True,
+            ledger_checksum=section.get("ledger_checksum", False) is True,
+            http2_hosts=tuple(section.get("http2_hosts") or ()),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class DuplicateSettings:
+    """duplicate.overrides 區段"""
+
+    image: bool
+    video: bool
+    post: bool
+    notice: bool
+    cmt: bool
+
+    @classmethod
+    def from_section(cls, section: Mapping[str, Any]) -> "DuplicateSettings":
+        overrides: Mapping[str, Any] = section.get("overrides") or {}
+        return cls(*(bool(overrides.get(key, False)) for key in ("image", "video", "post", "notice", "cmt")))
+
+
+@dataclass(frozen=True, slots=True)
+class Settings:
+    """驗證過的設定 只在啟動 (或 reload) 時建立一次
+
+    熱路徑讀取屬性 不再逐層查 CFG dict 其他區段仍可由 raw 以唯讀方式取得
+    """
+
+    api: APIClientSettings
+    video: VideoDownloadSettings
+    duplicate: DuplicateSettings
+    raw: Mapping[str, Any]
+
+    @classmethod
+    def from_config(cls, config: dict[str, Any]) -> "Settings":
+        return cls(
+            api=APIClientSettings.from_section(config["BerrizAPIClient"]),
+            video=VideoDownloadSettings.from_section(config["VideoDownload"]),
+            duplicate=DuplicateSettings.from_section(config["duplicate"]),
+            raw=MappingProxyType(config),
+        )
+
+
+_current: Settings = Settings.from_config(CFG)
+
+
+def get_settings() -> Settings:
+    return _current
+
+
+def reload_settings(path: Path = YAML_PATH) -> Settings:
+    """重新讀取 berrizconfig.yaml 驗證失敗時保留原本的設定
+
+    CFG 會就地更新 之後建立的物件 (session 下載器等) 使用新值 已建立的物件不受影響
+    """
+    global _current
+    config: dict[str, Any] = read_config(path)
+    if config is not CFG:
+        ConfigLoader.check_cfg(config)
+        CFG.clear()
+        CFG.update(config)
+    _current = Settings.from_config(CFG)
+    logger.info("Settings reloaded")
+    return _current
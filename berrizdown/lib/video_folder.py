@@ -102,13 +102,33 @@ class Video_folder:
                 self.output_dir: Path = new_path
                 return new_path
             case _:
-                temp_folder_name: str = f"temp_{self.time_str}_{self.media_id}_{datetime.now().strftime('%Y%m%d%H%M%S%f')}"
+                temp_prefix: str = f"temp_{self.time_str}_{self.media_id}"
+                if CFG["VideoDownload"].get("resume") is True:
+                    resumable_dir: Path | None = self.find_resumable_temp_dir(temp_prefix)
+                    if resumable_dir is not None:
+                        logger.info(f"{Color.fg('light_gray')}Resume unfinished download in {Color.fg('aquamarine')}{resumable_dir}{Color.reset()}")
+                        self.output_dir: Path = resumable_dir
+                        return self.output_dir
+                temp_folder_name: str = f"{temp_prefix}_{datetime.now().strftime('%Y%m%d%H%M%S%f')}"
                 temp_name: str = self.FilenameSanitizer(temp_folder_name)
                 temp_dir: Path = Path.cwd() / self.base_dir / temp_name
                 temp_dir.mkdirp()
                 self.output_dir: Path = Path(temp_dir.resolve())
                 return self.output_dir  # for Download reutrn temp folder name path
 
+    def find_resumable_temp_dir(self, temp_prefix: str) -> Path | None:
+        """尋找同一媒體中斷後留下 且含有分段紀錄檔的暫存資料夾"""
+        parent: Path = Path.cwd() / self.base_dir
+        if not parent.is_dir():
+            return None
+        candidates: list[Path] = [
+            p for p in parent.glob(f"{self.FilenameSanitizer(temp_prefix)}_*")
+            if p.is_dir() and any(p.glob("*.manifest.json"))
+        ]
+        if not candidates:
+            return None
+        return Path(max(candidates, key=lambda p: p.stat().st_mtime).resolve())
+
     def get_unique_folder_name(self, base_name: str, full_path: Path) -> Path:
         """確保資料夾名稱唯一性，避免衝突"""
         base_name: str = self.FilenameSanitizer(base_name)
@@ -119,8 +139,8 @@ class Video_folder:
             counter += 1
         return new_path
 
-    async def re_name_folder(self, video_file_name: str, mux_bool_status: bool) -> None:
-        """將下載完成後的暫存資料夾名稱重新命名為最終標題"""
+    async def re_name_folder(self, video_file_name: str, mux_bool_status: bool) -> Path | None:
+        """將下載完成後的暫存資料夾名稱重新命名為最終標題 回傳影片最後所在的資料夾"""
         skip_conditions: list = [
             paramstore.get("video_dl_cancelled"),
             paramstore.get("skip_merge"),
@@ -130,14 +150,14 @@ class Video_folder:
         if self._should_flatten_subfolder(skip_conditions, mux_bool_status):
             await self._flatten_to_parent(video_file_name)
             await self._maybe_cleanup_artifacts()
-            return
+            return Path(self.output_dir).parent.parent
         # 檢查 output_dir 是否設定
         if not self._validate_output_dir():
-            return
+            return None
         # 準備路徑與前置檢查
         new_path, full_path, original_name = self._prepare_paths()
         if not self._ensure_uuid_in_original_name(full_path, original_name):
-            return
+            return None
         # 刪除暫存資料夾 merge mux false
         await self._delete_temp_if_needed(full_path, mux_bool_status)
         # 取得唯一新路徑並執行重命名
@@ -145,6 +165,7 @@ class Video_folder:
         await self.rename_folder(full_path, _new_path)
         # 列印路徑資訊
         self._print_path_info(skip_conditions, _new_path, video_file_name)
+        return _new_path if _new_path.exists() else full_path
 
     def _should_flatten_subfolder(self, skip_conditions: list, mux_bool_status: bool) -> bool:
         return paramstore.get("nosubfolder") is True and not any(skip_conditions) and mux_bool_status is True
@@ -1,9 +1,14 @@
+import asyncio
 import atexit
+import hashlib
 import os
 import queue
 import sqlite3
 import threading
 import time
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import Any
 
 from berrizdown.lib.path import Path
 from berrizdown.static.route import Route
@@ -13,56 +18,121 @@ logger = setup_logging("download_lock", "forest_green")
 
 DB: Path = Route().download_info_db
 
+STARTED = "started"
+DONE = "done"
+
+Write = tuple[str, tuple[Any, ...]]
+
+
+@dataclass
+class LedgerEntry:
+    media_id: str
+    media_type: str | None
+    community_id: int | None
+    status: str
+    path: str | None
+    bytes: int | None
+    checksum: str | None
+    started_at: float | None
+    completed_at: float | None
+
+
+def file_digest(path: Path) -> tuple[int, str]:
+    """回傳檔案大小與 sha256"""
+    with open(path, "rb") as f:
+        digest = hashlib.file_digest(f, "sha256")
+    return path.stat().st_size, digest.hexdigest()
+
 
 class UUIDSetStore:
+    """已下載 ID 紀錄
+
+    啟動後第一次查詢時一次載入全部 ID 到記憶體 之後 exists / exists_many 不需要任何 I/O
+    寫入由背景執行緒批次送進同一個長駐的 WAL 連線
+
+    downloads 表是完整的下載紀錄 (類型 社群 路徑 大小 checksum 狀態 時間) checksum 只在 ledger_checksum 開啟時計算
+    開始時記為 started 確認完成後才記為 done 並加入 uuid_set
+    """
+
     def __init__(self) -> None:
         lock_dir: str = os.path.join(os.getcwd(), "berrizdown", "lock")
-        os.makedirs(lock_dir, exist_ok=True)
-
         self.filename: str = os.path.join(lock_dir, DB)
         self.lock: threading.Lock = threading.Lock()
 
-        self.task_queue: queue.Queue[str] = queue.Queue()
+        self.task_queue: queue.Queue[Write] = queue.Queue()
         self.stop_event: threading.Event = threading.Event()
         self.flush_interval: int = 1
 
-        self.buffer: list[str] = []
+        self.buffer: list[Write] = []
         self.buffer_limit = 100
         self.last_flush_time = time.time()
 
-        self.worker_thread: threading.Thread = threading.Thread(target=self._worker, daemon=True)
+        self._conn: sqlite3.Connection | None = None
+        self._known: set[str] | None = None
+        self.worker_thread: threading.Thread | None = None
 
-        self._init_db()
-        self.worker_thread.start()
-        atexit.register(self.stop)
-
-    def _init_db(self) -> None:
-        with self.lock:
-            conn = sqlite3.connect(self.filename)
-            cursor = conn.cursor()
-            cursor.execute(
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.filename), exist_ok=True)
+            conn = sqlite3.connect(self.filename, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
                 """
                 CREATE TABLE IF NOT EXISTS uuid_set (
                     uuid TEXT PRIMARY KEY
                 )
                 """
             )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS downloads (
+                    media_id TEXT PRIMARY KEY,
+                    media_type TEXT,
+                    community_id INTEGER,
+                    status TEXT NOT NULL,
+                    path TEXT,
+                    bytes INTEGER,
+                    checksum TEXT,
+                    started_at REAL,
+                    completed_at REAL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS downloads_community ON downloads (community_id, completed_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS downloads_completed ON downloads (completed_at)")
             conn.commit()
-            conn.close()
+            self._conn = conn
+        return self._conn
+
+    def _load(self) -> set[str]:
+        if self._known is None:
+            with self.lock:
+                if self._known is None:
+                    try:
+                        rows = self._connect().execute("SELECT uuid FROM uuid_set")
+                        self._known = {row[0] for row in rows}
+                    except sqlite3.Error as e:
+                        logger.error(f"[UUIDSetStore] Load DB failed: {e}")
+                        self._known = set()
+                    logger.debug(f"[UUIDSetStore] Loaded {len(self._known)} ids")
+        return self._known
+
+    def _start_worker(self) -> None:
+        if self.worker_thread is None:
+            self.worker_thread = threading.Thread(target=self._worker, daemon=True)
+            self.worker_thread.start()
+            atexit.register(self.stop)
 
     def _flush_buffer_to_db(self) -> None:
         if not self.buffer:
             return
         try:
             with self.lock:
-                conn = sqlite3.connect(self.filename)
-                cursor = conn.cursor()
-                cursor.executemany(
-                    "INSERT OR IGNORE INTO uuid_set (uuid) VALUES (?)",
-                    [(u,) for u in self.buffer],
-                )
-                conn.commit()
-                conn.close()
+                conn = self._connect()
+                with conn:
+                    for sql, params in self.buffer:
+                        conn.execute(sql, params)
             self.buffer.clear()
         except Exception as e:
             logger.error(f"[UUIDSetStore] Batch DB insert failed: {e}")
@@ -70,8 +140,8 @@ class UUIDSetStore:
     def _worker(self) -> None:
         while not self.stop_event.is_set() or not self.task_queue.empty() or self.buffer:
             try:
-                uuid_str: str = self.task_queue.get(timeout=self.flush_interval)
-                self.buffer.append(uuid_str)
+                write: Write = self.task_queue.get(timeout=self.flush_interval)
+                self.buffer.append(write)
                 self.task_queue.task_done()
             except queue.Empty:
                 pass
@@ -80,26 +150,140 @@ class UUIDSetStore:
                 self._flush_buffer_to_db()
                 self.last_flush_time = time.time()
 
+    def _put(self, sql: str, params: tuple[Any, ...]) -> None:
+        self._start_worker()
+        self.task_queue.put((sql, params))
+
     def add(self, uuid_str: str) -> None:
         if not isinstance(uuid_str, str):
             raise ValueError("UUID must be a string")
-        self.task_queue.put(uuid_str)
+        known: set[str] = self._load()
+        if uuid_str in known:
+            return
+        known.add(uuid_str)
+        self._put("INSERT OR IGNORE INTO uuid_set (uuid) VALUES (?)", (uuid_str,))
 
-    def exists(self, uuid_str: str) -> bool:
+    def mark_started(self, media_id: str, media_type: str | None, community_id: int | None) -> None:
+        """開始處理 已完成的紀錄不會被覆寫"""
+        self._put(
+            """
+            INSERT INTO downloads (media_id, media_type, community_id, status, started_at) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(media_id) DO UPDATE SET
+                media_type = excluded.media_type,
+                community_id = excluded.community_id,
+                status = excluded.status,
+                started_at = excluded.started_at
+            WHERE downloads.status != ?
+            """,
+            (media_id, media_type, community_id, STARTED, time.time(), DONE),
+        )
+
+    def mark_done(
+        self,
+        media_id: str,
+        media_type: str | None,
+        community_id: int | None,
+        path: Path | None = None,
+        size: int | None = None,
+        checksum: str | None = None,
+    ) -> None:
+        """確認完成後寫入 同時加入 uuid_set 供重複檢查"""
+        self._put(
+            """
+            INSERT INTO downloads (media_id, media_type, community_id, status, path, bytes, checksum, started_at, completed_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(media_id) DO UPDATE SET
+                media_type = excluded.media_type,
+                community_id = excluded.community_id,
+                status = excluded.status,
+                path = excluded.path,
+                bytes = excluded.bytes,
+                checksum = excluded.checksum,
+                completed_at = excluded.completed_at
+            """,
+            (media_id, media_type, community_id, DONE, None if path is None else str(path), size, checksum, None, time.time()),
+        )
+        self.add(media_id)
+
+    async def mark_file_done(
+        self, media_id: str, media_type: str | None, community_id: int | None, path: Path, checksum: bool = False
+    ) -> None:
+        """記錄成品大小後記為完成 checksum 為 True 時另外計算 sha256 (需要讀完整個檔案)"""
+        digest: str | None = None
+        try:
+            if checksum:
+                size, digest = await asyncio.to_thread(file_digest, path)
+            else:
+                size = path.stat().st_size
+        except OSError as e:
+            logger.warning(f"[UUIDSetStore] Cannot read {path}: {e}")
+            size = None
+        self.mark_done(media_id, media_type, community_id, path, size, digest)
+
+    def _query(self, sql: str, params: tuple[Any, ...] = ()) -> list[tuple[Any, ...]]:
+        """只讀得到已寫入的資料 背景寫入會在 flush_interval 內完成"""
         with self.lock:
-            conn = sqlite3.connect(self.filename)
-            cursor = conn.cursor()
-            cursor.execute("SELECT 1 FROM uuid_set WHERE uuid = ?", (uuid_str,))
-            exists = cursor.fetchone() is not None
-            conn.close()
-        return exists
+            try:
+                return self._connect().execute(sql, params).fetchall()
+            except sqlite3.Error as e:
+                logger.error(f"[UUIDSetStore] Query failed: {e}")
+                return []
+
+    def entry(self, media_id: str) -> LedgerEntry | None:
+        rows = self._query("SELECT * FROM downloads WHERE media_id = ?", (media_id,))
+        return LedgerEntry(*rows[0]) if rows else None
+
+    def unfinished(self, community_id: int | None = None) -> list[LedgerEntry]:
+        """開始過但沒有完成的項目 可用來重試"""
+        if community_id is None:
+            rows = self._query("SELECT * FROM downloads WHERE status != ? ORDER BY started_at", (DONE,))
+        else:
+            rows = self._query(
+                "SELECT * FROM downloads WHERE status != ? AND community_id = ? ORDER BY started_at", (DONE, community_id)
+            )
+        return [LedgerEntry(*row) for row in rows]
+
+    def completed(self, community_id: int | None = None, since: float = 0.0) -> list[LedgerEntry]:
+        """since (unix time) 之後完成的項目 新的在前"""
+        if community_id is None:
+            rows = self._query(
+                "SELECT * FROM downloads WHERE status = ? AND completed_at >= ? ORDER BY completed_at DESC", (DONE, since)
+            )
+        else:
+            rows = self._query(
+                "SELECT * FROM downloads WHERE status = ? AND community_id = ? AND completed_at >= ? ORDER BY completed_at DESC",
+                (DONE, community_id, since),
+            )
+        return [LedgerEntry(*row) for row in rows]
+
+    def disk_usage(self) -> dict[int | None, int]:
+        """各社群已完成檔案的總大小 (bytes)"""
+        rows = self._query(
+            "SELECT community_id, SUM(bytes) FROM downloads WHERE status = ? AND bytes IS NOT NULL GROUP BY community_id", (DONE,)
+        )
+        return {community_id: total for community_id, total in rows}
+
+    def exists(self, uuid_str: str) -> bool:
+        return uuid_str in self._load()
+
+    def exists_many(self, uuids: Iterable[str]) -> set[str]:
+        """回傳已存在的 ID"""
+        known: set[str] = self._load()
+        return {u for u in uuids if u in known}
 
     def stop(self) -> None:
         try:
-            if not self.stop_event.is_set():
+            if self.worker_thread is not None and not self.stop_event.is_set():
                 self.stop_event.set()
                 self.worker_thread.join()
                 # Ensure remaining buffered UUIDs are saved
                 self._flush_buffer_to_db()
+            if self._conn is not None:
+                with self.lock:
+                    self._conn.close()
+                    self._conn = None
         except KeyboardInterrupt:
             pass
+
+
+uuid_store: UUIDSetStore = UUIDSetStore()
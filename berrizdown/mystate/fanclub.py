@@ -1,7 +1,7 @@
 from typing import Any
 
 from berrizdown.lib.__init__ import use_proxy
-from berrizdown.lib.lock_cookie import Lock_Cookie, cookie_session
+from berrizdown.lib.lock_cookie import Lock_Cookie
 from berrizdown.unit.handle.handle_log import setup_logging
 from berrizdown.unit.http.request_berriz_api import My
 
@@ -10,8 +10,7 @@ logger = setup_logging("fanclub", "orange")
 
 class FanClub:
     async def check_cookie(self) -> str | None:
-        if cookie_session == {}:
-            await Lock_Cookie.cookie_session()
+        await Lock_Cookie.session()
 
     _fanclub_cache: dict[str, Any] | None = None
 
@@ -22,7 +21,7 @@ class FanClub:
         return self._fanclub_cache
 
     async def fanclub_main(self) -> str | None:
-        if cookie_session == {}:
+        if await Lock_Cookie.session() == {}:
             return "COOKIE_NOT_FOUND"
         data: dict[str, Any] = await self.request_fanclub()
         code: str | None = data.get("code")
@@ -6,7 +6,7 @@ from rich.console import Console
 from rich.table import Table
 
 from berrizdown.lib.__init__ import use_proxy
-from berrizdown.lib.lock_cookie import Lock_Cookie, cookie_session
+from berrizdown.lib.lock_cookie import Lock_Cookie
 from berrizdown.static.color import Color
 from berrizdown.unit.handle.handle_log import setup_logging
 from berrizdown.unit.http.request_berriz_api import My, BerrizAPIClient
@@ -19,8 +19,7 @@ async def request_my() -> None:
     """
     異步請求多個使用者相關的 API 端點，處理 Cookie，並記錄解析後的個人資訊
     """
-    if not cookie_session:
-        await Lock_Cookie.cookie_session()
+    await Lock_Cookie.session()
 
     try:
         results = await asyncio.gather(
@@ -1,11 +1,10 @@
 from functools import cached_property, lru_cache
 
-import aiohttp
-
 from berrizdown.readydl_pyplayready.pyplayready.cdm import Cdm
 from berrizdown.readydl_pyplayready.pyplayready.device import Device
 from berrizdown.readydl_pyplayready.pyplayready.system.pssh import PSSH
 from berrizdown.unit.handle.handle_log import setup_logging
+from berrizdown.unit.http.transport import DRM, transport
 
 logger = setup_logging("playready", "graphite")
 
@@ -42,21 +41,17 @@ class PlayReadyDRM:
             challenge: bytes = self.cdm.get_license_challenge(self.session_id, pssh_obj.wrm_headers[0])
             headers: dict[str, str] = self.build_pr_headers(acquirelicenseassertion)
 
-            async with aiohttp.ClientSession(
-                timeout=aiohttp.ClientTimeout(total=13.0),
-                connector=aiohttp.TCPConnector(ssl=True),
-            ) as client:
-                async with client.post(
-                    url="https://berriz.drmkeyserver.com/playready_license",
-                    headers=headers,
-                    data=challenge
-                ) as response:
-                    if response.status not in range(200, 299):
-                        logger.error(f"Invalid response status code: {response.status} {await response.text()}")
-                    else:
-                        license_text = await response.text()
-                        self.cdm.parse_license(self.session_id, license_text)
-                        return self.parse_response_key()
+            async with transport.session(DRM).post(
+                url="https://berriz.drmkeyserver.com/playready_license",
+                headers=headers,
+                data=challenge
+            ) as response:
+                if response.status not in range(200, 299):
+                    logger.error(f"Invalid response status code: {response.status} {await response.text()}")
+                else:
+                    license_text = await response.text()
+                    self.cdm.parse_license(self.session_id, license_text)
+                    return self.parse_response_key()
 
         except Exception as e:
             logger.error(e)
@@ -0,0 +1,93 @@
+import os
+from pathlib import Path
+from typing import Any
+
+import orjson
+from ruamel.yaml import YAML
+
+YAML_PATH: Path = Path(__file__).parent.parent.joinpath("berrizconfig.yaml")
+# 解析後的設定 依 YAML 的 mtime/size 快取 檔案沒變就不用再跑 ruamel
+CACHE_PATH: Path = Path(__file__).parent.parent.joinpath("lock", "config_cache.json")
+# 舊版的 pickle 快取 寫入新快取時順便刪除
+LEGACY_CACHE_PATH: Path = CACHE_PATH.with_name("config_cache.pickle")
+CACHE_VERSION: int = 2
+
+_loaded: dict[Path, tuple[tuple[int, int], dict[str, Any]]] = {}
+
+
+def _plain(obj: Any) -> Any:
+    """ruamel 的 CommentedMap / ScalarFloat 等轉成一般的 dict list float"""
+    if isinstance(obj, dict):
+        return {k: _plain(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_plain(v) for v in obj]
+    if isinstance(obj, bool) or obj is None:
+        return obj
+    if isinstance(obj, int):
+        return int(obj)
+    if isinstance(obj, float):
+        return float(obj)
+    if isinstance(obj, str):
+        return str(obj)
+    return obj
+
+
+def _key(path: Path) -> tuple[int, int]:
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def _read_cache(path: Path, key: tuple[int, int]) -> dict[str, Any] | None:
+    if path != YAML_PATH:
+        return None
+    try:
+        cached = orjson.loads(CACHE_PATH.read_bytes())
+        if cached.get("version") == CACHE_VERSION and tuple(cached.get("key", ())) == key:
+            return cached["config"]
+    except (OSError, orjson.JSONDecodeError, AttributeError, KeyError, TypeError):
+        pass
+    return None
+
+
+def _write_cache(path: Path, key: tuple[int, int], config: dict[str, Any]) -> None:
+    if path != YAML_PATH:
+        return
+    try:
+        data: bytes = orjson.dumps({"version": CACHE_VERSION, "key": key, "config": config})
+    except TypeError:
+        return
+    # 非字串的 key 或日期等型別無法原樣還原 這種設定不快取
+    if orjson.loads(data)["config"] != config:
+        return
+    try:
+        CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        tmp: Path = CACHE_PATH.with_name(f"{CACHE_PATH.name}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, CACHE_PATH)
+        LEGACY_CACHE_PATH.unlink(missing_ok=True)
+    except OSError:
+        pass
+
+
+def read_config(path: Path = YAML_PATH) -> dict[str, Any]:
+    """讀取 berrizconfig.yaml 整個行程共用同一個 dict
+
+    handle_log Route unit ConfigLoader 都從這裡取得設定 只有 YAML 改變時才重新解析
+    """
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"Config file not found: {path}")
+    key: tuple[int, int] = _key(path)
+    loaded = _loaded.get(path)
+    if loaded is not None and loaded[0] == key:
+        return loaded[1]
+
+    config: dict[str, Any] | None = _read_cache(path, key)
+    if config is None:
+        try:
+            config = _plain(YAML().load(path.read_text(encoding="utf-8")))
+        except ValueError as e:
+            raise ValueError(f"Failed to parse YAML: {e}")
+        _write_cache(path, key, config)
+    _loaded[path] = (key, config)
+    return config
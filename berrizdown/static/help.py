@@ -61,6 +61,9 @@ def print_help() -> None:
         "--cdm",
         "--cache",
         "--no-cache",
+        "--no-api-cache",
+        "--sync",
+        "--parallel-titles",
         "--save-dir",
         "",
         "-S, --subs-only",
@@ -122,6 +125,9 @@ def print_help() -> None:
         "override the CDM that will be used for decryption",
         "disable the use of the CDM and only retrieve decryption keys from Key Vaults",
         "disable the use of Key Vaults and retrieve decryption keys only from CDM",
+        "ignore the on-disk API response cache and always request fresh metadata",
+        "only list and download items newer than the previous --sync run (no selection prompt)",
+        "process up to N videos / lives at once (default 1) | --parallel-titles 3",
         "Set output directory and override default path in berrizconfig.yaml",
         "",
         "Only download subtitle tracks",
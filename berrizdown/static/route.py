@@ -1,17 +1,13 @@
 from __future__ import annotations
 
 import rich.traceback
-from ruamel.yaml import YAML
 
 from berrizdown.lib.path import Path
+from berrizdown.static.config_file import read_config
 
 rich.traceback.install()
 
-with open(
-    Path(__file__).parent.parent.joinpath("berrizconfig.yaml"),
-    encoding="utf-8",
-) as f:
-    CFG: dict = YAML().load(f.read())
+CFG: dict = read_config()
 
 
 class Route:
@@ -25,5 +21,8 @@ class Route:
         self.mkvmerge_path: Path = mainpath.parent.parent.joinpath("lib", "tools", CFG["Container"]["mkvmerge"])
         self.Proxy_list = mainpath.parent.parent.joinpath("static", "proxy", "proxy.txt")
         self.download_info_db = mainpath.parent.parent.joinpath("lock", "download_info.db")
+        self.api_cache_db = mainpath.parent.parent.joinpath("lock", "api_cache.db")
+        self.sync_cursor = mainpath.parent.parent.joinpath("lock", "sync_cursor.json")
+        self.tool_registry = mainpath.parent.parent.joinpath("lock", "tool_registry.json")
         self.ffmpeg = mainpath.parent.parent.joinpath("lib", "tools", CFG["Container"]["ffmpeg"])
         self.ffprobe = mainpath.parent.parent.joinpath("lib", "tools", CFG["Container"]["ffprobe"])
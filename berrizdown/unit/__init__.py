@@ -1,15 +1,12 @@
-import asyncio
 import re
 import unicodedata
 from functools import lru_cache
 
-import aiofiles
 import httpagentparser
-import yaml
-from fake_useragent import UserAgent
 
 from berrizdown.lib.path import Path
 from berrizdown.static.color import Color
+from berrizdown.static.config_file import read_config
 from berrizdown.static.version import __version__
 from berrizdown.unit.handle.handle_log import setup_logging
 
@@ -28,24 +25,8 @@ class ConfigLoader:
     @classmethod
     @lru_cache(maxsize=1)
     def load(cls, path: Path = YAML_PATH) -> dict:
-        config = asyncio.run(cls._load_async(path))
-        return config
-
-    @staticmethod
-    async def _load_async(path: Path) -> dict:
-        if not path.exists():
-            raise FileNotFoundError(f"Config file not found: {path}")
-
-        async with aiofiles.open(path, encoding="utf-8") as f:
-            raw = await f.read()
-
-        try:
-            return yaml.safe_load(raw)
-        except yaml.YAMLError as e:
-            raise ValueError(f"Failed to parse YAML: {e}")
-
-
-CFG = ConfigLoader.load()
+        """第一次用到時才讀取 與 lib.load_yaml_config 共用同一份解析結果"""
+        return read_config(path)
 
 
 def is_user_agent(ua: str) -> bool:
@@ -55,7 +36,9 @@ def is_user_agent(ua: str) -> bool:
     return bool(parsed.get("platform") or parsed.get("browser"))
 
 
+@lru_cache(maxsize=1)
 def get_useragent() -> str:
+    CFG = ConfigLoader.load()
     USERAGENT = CFG["headers"]["User-Agent"]
     fakseua = CFG["headers"]["Fake-User-Agent"]
     try:
@@ -66,6 +49,8 @@ def get_useragent() -> str:
         if not isinstance(fakseua, bool):
             raise AttributeError
         if fakseua is True:
+            from fake_useragent import UserAgent
+
             ua = UserAgent(platforms="mobile")
             USERAGENT = ua.random
     except AttributeError:
@@ -75,7 +60,14 @@ def get_useragent() -> str:
     return USERAGENT
 
 
-USERAGENT = get_useragent()
+def __getattr__(name: str) -> object:
+    # 保留給外部 from ... import USERAGENT 的相容寫法 (import 當下即會求值)
+    # 專案內一律在組 headers 時呼叫 get_useragent() 才能真正延遲
+    if name == "USERAGENT":
+        return get_useragent()
+    if name == "CFG":
+        return ConfigLoader.load()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 class FilenameSanitizer:
@@ -48,6 +48,8 @@ class CleanFiles:
                     base_dir / f"audio_decrypted.{container}",
                     base_dir / f"audio.{container}",
                 ]
+            if CFG["VideoDownload"].get("resume") is True:
+                file_paths.extend([base_dir / "video.manifest.json", base_dir / "audio.manifest.json"])
 
             for fp in file_paths:
                 try:
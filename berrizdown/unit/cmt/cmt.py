@@ -110,13 +110,14 @@ class MainProcessor:
         img_metadata["raw_name"] = base_name
         return OutputFormatter(f"{CFG['output_template']['image_file_name']}").format(img_metadata)
 
-    async def parse_and_download(self) -> None:
-        """Parse data image URLs and download them with concurrency control."""
+    async def parse_and_download(self) -> bool:
+        """Parse data image URLs and download them with concurrency control. Returns True when every image was saved."""
         tasks = (
             asyncio.create_task(self.process_image()),
             asyncio.create_task(self.save_CMT_json()),
         )
-        await asyncio.gather(*tasks)
+        images_saved, _ = await asyncio.gather(*tasks)
+        return images_saved
 
     def make_cmt_link(self) -> str:
         if self.index["replyInfo"]["isReply"] is True:
@@ -147,17 +148,22 @@ class MainProcessor:
                 )
                 await self.save_json_data._write_file(json_file_path, json_data)
 
-    async def process_image(self) -> None:
-        if paramstore.get("nodl") is True or paramstore.get("noimages") is True:
+    async def process_image(self) -> bool:
+        if paramstore.get("nodl") is True:
             logger.info(f"{Color.fg('light_gray')}Skip downloading{Color.reset()} {Color.fg('light_gray')}CMT IMAGE")
-        else:
-            for x in self._cmt_media["media"]["photo"]:
-                image_url: str = x.get("imageUrl", "NOIMAGE")
-                if image_url.startswith("http"):
-                    base_name, ext = get_image_ext_basename(image_url)
-                    imagepath = Path(self.folder_path) / Path(f"{self.image_file_name(base_name)}{ext}")
-                    image_bytes = await self.ImageDownloader.download_image(image_url)
-                    await self.ImageDownloader._write_to_file(image_bytes, imagepath)
+            return False
+        if paramstore.get("noimages") is True:
+            logger.info(f"{Color.fg('light_gray')}Skip downloading{Color.reset()} {Color.fg('light_gray')}CMT IMAGE")
+            return True
+        saved: bool = True
+        for x in self._cmt_media["media"]["photo"]:
+            image_url: str = x.get("imageUrl", "NOIMAGE")
+            if image_url.startswith("http"):
+                base_name, ext = get_image_ext_basename(image_url)
+                imagepath = Path(self.folder_path) / Path(f"{self.image_file_name(base_name)}{ext}")
+                if await self.ImageDownloader.download_to_file(image_url, imagepath) is None:
+                    saved = False
+        return saved
 
 
 class RUN_CMT:
@@ -182,8 +188,8 @@ class RUN_CMT:
     def translate(self) -> Translate:
         return Translate()
 
-    async def run_cmt_dl(self) -> None:
-        """Top Async ENTER"""
+    async def run_cmt_dl(self) -> list[Any]:
+        """Top Async ENTER, returns the contentIds saved completely"""
         semaphore = asyncio.Semaphore(7)
         all_folders: list[Path] = []
         if paramstore.get("nodl") is True:
@@ -199,7 +205,7 @@ class RUN_CMT:
                         return "NODL"
                     self.folder_name.add(index["title"])
                     all_folders.append(folder)
-                    await MainProcessor(
+                    saved: bool = await MainProcessor(
                         cmt_media,
                         index,
                         folder,
@@ -209,13 +215,20 @@ class RUN_CMT:
                         self.input_community_name,
                         cmt_meta,
                     ).parse_and_download()
-                    return "OK"
+                    return "OK" if saved else "PARTIAL"
                 except asyncio.CancelledError:
                     await self.handle_cancel()
                     raise asyncio.CancelledError
 
         tasks = [asyncio.create_task(process(index)) for index in self.selected_media]
-        await asyncio.gather(*tasks)
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        saved: list[Any] = []
+        for index, result in zip(self.selected_media, results):
+            if isinstance(result, BaseException):
+                logger.error(f"CMT {index.get('contentId')} failed: {result}")
+            elif result == "OK":
+                saved.append(index["contentId"])
+        return saved
 
     async def cmt_media(self, index: dict[str, Any]) -> dict[str, Any]:
         data = await self.get_cmt_info(index["contentId"])
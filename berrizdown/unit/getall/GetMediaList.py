@@ -5,17 +5,18 @@ from functools import cached_property
 from typing import Any, TypedDict
 
 from berrizdown.lib.__init__ import use_proxy
-from berrizdown.lib.lock_cookie import cookie_session
+from berrizdown.lib.lock_cookie import Lock_Cookie
 from berrizdown.mystate.fanclub import FanClub
 from berrizdown.static.color import Color
 from berrizdown.static.parameter import paramstore
+from berrizdown.unit.getall.sync_cursor import sync_cursor
 from berrizdown.unit.handle.handle_log import setup_logging
 from berrizdown.unit.http.request_berriz_api import Live, MediaList
 
 MediaItem = dict[str, str | dict | bool]
 SelectedMedia = dict[str, list[dict]]
-MediaResult = tuple[list[dict[str, Any]], list[dict[str, Any]], dict[str, Any], bool]
-LiveResult = tuple[list[dict[str, Any]], dict[str, Any], bool]
+MediaResult = tuple[list[dict[str, Any]], list[dict[str, Any]], dict[str, Any] | None]
+LiveResult = tuple[list[dict[str, Any]], dict[str, Any] | None]
 
 logger = setup_logging("GetMediaList", "turquoise")
 
@@ -153,7 +154,7 @@ class MediaParser:
 
         output_vods, output_photos, output_lives = v_nfc, p_nfc, l_nfc
 
-        has_valid_cookie: bool = not (cookie_session == {} or paramstore.get("no_cookie") is True)
+        has_valid_cookie: bool = not (paramstore.get("no_cookie") is True or await Lock_Cookie.session() == {})
 
         if has_valid_cookie:
             is_fanclub_match: bool = True
@@ -283,24 +284,19 @@ class MediaFetcher:
         vod_total: list[dict] = []
         photo_total: list[dict] = []
         live_total: list[dict] = []
-        params: dict[str, Any] = await self._build_params(cursor=None)
+        # media 與 live 各自分頁 下一頁的 params 為 None 表示該清單已結束
+        params_media: dict[str, Any] | None = await self._build_params(cursor=None)
+        params_live: dict[str, Any] | None = dict(params_media)
 
-        while True:
-            media_data, live_data = await self._fetch_data(params)
+        while params_media is not None or params_live is not None:
+            media_data, live_data = await self._fetch_data(params_media, params_live)
 
             if not (media_data or live_data):
                 self.error_printer(media_data, live_data)
                 break
 
             # 並行解析 + build params
-            (
-                (vods, photos, params_media, has_next_media),
-                (
-                    lives,
-                    params_live,
-                    has_next_live,
-                ),
-            ) = await asyncio.gather(
+            (vods, photos, params_media), (lives, params_live) = await asyncio.gather(
                 self._process_media_chunk(media_data),
                 self._process_live_chunk(live_data),
             )
@@ -308,15 +304,6 @@ class MediaFetcher:
             photo_total.extend(photos)
             live_total.extend(lives)
 
-            if not (has_next_media or has_next_live):
-                break
-
-            # 合併下一輪要用的 params
-            params = {
-                "media": params_media,
-                "live": params_live,
-            }
-
         return vod_total, photo_total, live_total
 
     def error_printer(self, media_data: dict[str, Any], live_data: dict[str, Any]) -> None:
@@ -328,11 +315,20 @@ class MediaFetcher:
             M = "Media and Live data"
             logger.warning(f"Fail to get 【{Color.fg('light_yellow')}{M}{Color.fg('gold')}】")
 
-    async def _fetch_data(self, params: dict[str, Any]) -> tuple[dict[str, Any] | None, dict[str, Any] | None]:
+    async def _fetch_data(
+        self, params_media: dict[str, Any] | None, params_live: dict[str, Any] | None
+    ) -> tuple[dict[str, Any] | None, dict[str, Any] | None]:
+        async def _none() -> None:
+            return None
+
         try:
             async with asyncio.TaskGroup() as tg:
-                media_task = tg.create_task(self.MediaList.media_list(self.community_id, params, use_proxy))
-                live_task = tg.create_task(self.LIVE.fetch_live_replay(self.community_id, params, use_proxy))
+                media_task = tg.create_task(
+                    self.MediaList.media_list(self.community_id, params_media, use_proxy) if params_media is not None else _none()
+                )
+                live_task = tg.create_task(
+                    self.LIVE.fetch_live_replay(self.community_id, params_live, use_proxy) if params_live is not None else _none()
+                )
         except ExceptionGroup:
             return {}, {}
 
@@ -340,20 +336,44 @@ class MediaFetcher:
         live_data = live_task.result()
         return media_data, live_data
 
-    async def _process_media_chunk(self, media_data: dict[str, Any]) -> tuple[list[VODMediaItem], list[PhotoMediaItem], dict[str, Any], bool]:
+    def _sync_filter(self, list_type: str, data: dict[str, Any]) -> bool:
+        """--sync 時只保留比上次更新的項目 回傳是否已碰到已知項目"""
+        contents: list[dict[str, Any]] | None = data.get("data", {}).get("contents")
+        if not sync_cursor.enabled or not isinstance(contents, list):
+            return False
+        fresh, reached = sync_cursor.filter(
+            self.community_id,
+            list_type,
+            contents,
+            lambda item: item.get("media", {}).get("publishedAt"),
+            lambda item: item.get("media", {}).get("mediaSeq"),
+        )
+        data["data"]["contents"] = fresh
+        return reached
+
+    async def _process_media_chunk(self, media_data: dict[str, Any] | None) -> MediaResult:
+        if not media_data:
+            return [], [], None
         media_data = self.normalization(media_data)
+        reached: bool = self._sync_filter("media", media_data)
         vods, photos, _, cursor, has_next = await self.MP.parse(media_data)
-        next_params: dict[str, Any] = await self._build_params(cursor)
-        return vods, photos, next_params, has_next
+        if not has_next or reached:
+            return vods, photos, None
+        return vods, photos, await self._build_params(cursor)
 
-    async def _process_live_chunk(self, live_data: dict[str, Any]) -> tuple[list[LiveMediaItem], dict[str, Any], bool]:
+    async def _process_live_chunk(self, live_data: dict[str, Any] | None) -> LiveResult:
+        if not live_data:
+            return [], None
         live_data = self.normalization(live_data)
+        reached: bool = self._sync_filter("live", live_data)
         _, _, lives, cursor, has_next = await self.MP.parse(live_data)
-        next_params: dict[str, Any] = await self._build_params(cursor)
-        return lives, next_params, has_next
+        if not has_next or reached:
+            return lives, None
+        return lives, await self._build_params(cursor)
 
     async def _build_params(self, cursor: str | None) -> dict[str, Any]:
-        pagesize: int = 999999999
+        # 同步模式通常只需要第一頁 不必一次要求整個清單
+        pagesize: int = sync_cursor.PAGE_SIZE if sync_cursor.enabled else 999999999
         params: dict[str, Any] = {"pageSize": pagesize, "languageCode": "en"}
         if cursor:
             params["next"] = cursor
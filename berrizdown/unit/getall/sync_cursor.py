@@ -0,0 +1,156 @@
+import os
+from collections.abc import Callable, Iterable
+from datetime import datetime
+from typing import Any
+
+import orjson
+
+from berrizdown.lib.path import Path
+from berrizdown.static.parameter import paramstore
+from berrizdown.static.route import Route
+from berrizdown.unit.handle.handle_log import setup_logging
+
+logger = setup_logging("sync_cursor", "turquoise")
+
+
+Item = dict[str, Any]
+Mark = dict[str, Any]
+# (項目的各種 ID, publishedAt, seq)
+Candidate = tuple[frozenset[str], str | None, int | None]
+
+# 佇列中使用的 ID 欄位 原始清單的項目可能包在 media / post 底下
+_ID_KEYS: tuple[str, ...] = ("mediaId", "postId", "contentId", "communityNoticeId")
+
+
+def _item_ids(item: Item) -> frozenset[str]:
+    ids: set[str] = set()
+    for source in (item, item.get("media"), item.get("post")):
+        if isinstance(source, dict):
+            ids.update(str(source[key]) for key in _ID_KEYS if source.get(key) is not None)
+    return frozenset(ids)
+
+
+def _parse_time(value: str | None) -> datetime | None:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+class SyncCursor:
+    """--sync 模式下 記錄每個社群 每種清單上次看到最新的 publishedAt / seq
+
+    清單由新到舊排列 分頁時一遇到已知項目就停止 只回傳比紀錄更新的項目
+    新項目先記為候選 處理成功的 ID 經 confirm 確認後才暫存為新紀錄 再由 commit 寫入
+    被篩選掉 沒有選取或處理失敗的項目不會推進紀錄
+    """
+
+    PAGE_SIZE: int = 50
+
+    def __init__(self, path: Path) -> None:
+        self.path: Path = path
+        self._marks: dict[str, dict[str, Mark]] | None = None
+        self._pending: dict[tuple[str, str], Mark] = {}
+        self._candidates: dict[tuple[str, str], list[Candidate]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return paramstore.get("sync") is True
+
+    def _load(self) -> dict[str, dict[str, Mark]]:
+        if self._marks is None:
+            self._marks = {}
+            if self.path.exists():
+                try:
+                    self._marks = orjson.loads(self.path.read_bytes())
+                except (OSError, orjson.JSONDecodeError) as e:
+                    logger.warning(f"Ignore broken sync state {self.path}: {e}")
+        return self._marks
+
+    def mark(self, community_id: int | str, list_type: str) -> Mark | None:
+        return self._load().get(str(community_id), {}).get(list_type)
+
+    @staticmethod
+    def _is_newer(published_at: str | None, seq: int | None, mark: Mark) -> bool:
+        if seq is not None and mark.get("seq") is not None:
+            return seq > mark["seq"]
+        current, known = _parse_time(published_at), _parse_time(mark.get("publishedAt"))
+        if current is None or known is None:
+            # 無法比較時視為新項目 寧可多下載也不要漏掉
+            return True
+        return current > known
+
+    def filter(
+        self,
+        community_id: int | str,
+        list_type: str,
+        items: list[Item],
+        published_at: Callable[[Item], str | None],
+        seq: Callable[[Item], int | None] = lambda _: None,
+    ) -> tuple[list[Item], bool]:
+        """回傳這一頁中的新項目 以及是否已碰到上次的位置 (可以停止分頁)"""
+        if not self.enabled:
+            return items, False
+        mark: Mark | None = self.mark(community_id, list_type)
+        if mark is None:
+            fresh: list[Item] = items
+        else:
+            fresh = [item for item in items if self._is_newer(published_at(item), seq(item), mark)]
+        self._candidates.setdefault((str(community_id), list_type), []).extend(
+            (_item_ids(item), published_at(item), seq(item)) for item in fresh
+        )
+        return fresh, len(fresh) < len(items)
+
+    def confirm(self, processed_ids: Iterable[Any]) -> None:
+        """以處理成功的 ID 暫存新紀錄
+
+        由舊到新推進 遇到第一個未處理的項目就停止 否則下次會略過比它舊的內容
+        """
+        done: set[str] = {str(media_id) for media_id in processed_ids}
+        for (community_id, list_type), candidates in self._candidates.items():
+            processed: list[Candidate] = []
+            # 候選依清單順序 (新到舊) 累積
+            for candidate in reversed(candidates):
+                if not candidate[0] & done:
+                    break
+                processed.append(candidate)
+            self._stage(community_id, list_type, processed)
+        self._candidates.clear()
+
+    def _stage(self, community_id: str, list_type: str, candidates: list[Candidate]) -> None:
+        key: tuple[str, str] = (community_id, list_type)
+        newest: Mark = dict(self._pending.get(key) or self.mark(community_id, list_type) or {})
+        changed: bool = False
+        for _, item_time, item_seq in candidates:
+            if item_seq is not None and (newest.get("seq") is None or item_seq > newest["seq"]):
+                newest["seq"] = item_seq
+                changed = True
+            parsed: datetime | None = _parse_time(item_time)
+            if parsed is not None and (
+                (known := _parse_time(newest.get("publishedAt"))) is None or parsed > known
+            ):
+                newest["publishedAt"] = item_time
+                changed = True
+        if changed:
+            self._pending[key] = newest
+
+    def commit(self) -> None:
+        """本次執行完成後寫入新的高水位"""
+        if not self._pending:
+            return
+        marks: dict[str, dict[str, Mark]] = self._load()
+        for (community_id, list_type), mark in self._pending.items():
+            marks.setdefault(community_id, {})[list_type] = mark
+        self._pending.clear()
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp: Path = self.path.with_name(f"{self.path.name}.tmp")
+            tmp.write_bytes(orjson.dumps(marks, option=orjson.OPT_INDENT_2))
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning(f"Failed to save sync state {self.path}: {e}")
+
+
+sync_cursor: SyncCursor = SyncCursor(Route().sync_cursor)
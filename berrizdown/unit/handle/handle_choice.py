@@ -10,6 +10,7 @@ from berrizdown.static.color import Color
 from berrizdown.static.parameter import paramstore
 from berrizdown.unit.getall.GetMediaList import MediaFetcher
 from berrizdown.unit.getall.GetNotifyList import NotifyFetcher
+from berrizdown.unit.getall.sync_cursor import sync_cursor
 from berrizdown.unit.handle.handle_log import setup_logging
 from berrizdown.unit.http.request_berriz_api import BerrizAPIClient
 from berrizdown.unit.main_process import MediaProcessor
@@ -237,7 +238,12 @@ class Handle_Choice:
             return None
 
         self.print_user_chosen()
-        await self.process_selected_media()
+        completed: set[str] | None = await self.process_selected_media()
+        # 全部處理完才記錄高水位 中途中斷或失敗時下次仍會取得這些內容
+        if completed is None:
+            return None
+        sync_cursor.confirm(completed)
+        sync_cursor.commit()
 
     def print_chosen_boards(self, media: FilteredMediaLists) -> None:
         active: list[tuple[str, list[dict[str, Any]]]] = [
@@ -290,8 +296,10 @@ class Handle_Choice:
         self.selected_media = selected_media
         return self.selected_media
 
-    async def process_selected_media(self) -> None:
+    async def process_selected_media(self) -> set[str] | None:
+        """回傳處理完成的 ID 被取消時回傳 None"""
         assert self.selected_media is not None
+        completed: set[str] = set()
         processed_media: SelectedMediaDict = MediaJsonProcessor.process_selection(self.selected_media)
         dispatch: list[tuple[str, str]] = [
             ("vods", "VOD"),
@@ -306,8 +314,12 @@ class Handle_Choice:
                 continue
             queue = MediaQueue()
             queue.enqueue_batch(processed_media[key], media_type)
-            await MediaProcessor(
+            processor: MediaProcessor = MediaProcessor(
                 {key: self.selected_media[key]},
                 self.community_id,
                 self.community_name,
-            ).process_media_queue(queue)
\ No newline at end of file
+            )
+            if not await processor.process_media_queue(queue):
+                return None
+            completed |= processor.completed
+        return completed
\ No newline at end of file
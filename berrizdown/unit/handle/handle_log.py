@@ -11,9 +11,8 @@ from logging.handlers import TimedRotatingFileHandler
 from pathlib import Path
 from typing import Any
 
-import yaml
-
 from berrizdown.static.color import Color
+from berrizdown.static.config_file import read_config
 try:
     from berrizdown.static.route import Route
 except FileNotFoundError as e:
@@ -25,8 +24,7 @@ YAML_PATH: Path = Route().YAML_path
 
 
 try:
-    with open(YAML_PATH, encoding="utf-8") as f:
-        CFG: dict[str, Any] = yaml.safe_load(f)
+    CFG: dict[str, Any] = read_config(YAML_PATH)
 except FileNotFoundError:
     # 若檔案遺失，回落到最小設定
     CFG = {
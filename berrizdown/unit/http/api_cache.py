@@ -0,0 +1,179 @@
+import asyncio
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any
+
+import orjson
+from multidict import CIMultiDictProxy
+
+from berrizdown.lib.path import Path
+from berrizdown.static.parameter import paramstore
+from berrizdown.static.route import Route
+from berrizdown.unit.handle.handle_log import setup_logging
+
+logger = setup_logging("api_cache", "aluminum")
+
+
+# (URL 路徑, 快取秒數) TTL 為 0 時每次都帶 ETag / Last-Modified 向伺服器確認
+TTL_RULES: tuple[tuple[re.Pattern[str], int], ...] = (
+    (re.compile(r"/service/v1/community/keys$"), 86400),
+    (re.compile(r"/service/v1/community/id/[^/]+$"), 86400),
+    (re.compile(r"/service/v1/community/info/\d+/menus$"), 21600),
+    (re.compile(r"/service/v1/community/\d+/artists$"), 21600),
+    (re.compile(r"/service/v1/home$"), 3600),
+    (re.compile(r"/service/v1/medias/[^/]+/public_context$"), 600),
+    (re.compile(r"/service/v1/community/\d+/boards/[^/]+/feed$"), 0),
+)
+
+
+@dataclass
+class CacheEntry:
+    body: Any
+    etag: str | None
+    last_modified: str | None
+    expires_at: float
+
+    @property
+    def fresh(self) -> bool:
+        return self.expires_at > time.time()
+
+    def validators(self) -> dict[str, str]:
+        headers: dict[str, str] = {}
+        if self.etag:
+            headers["if-none-match"] = self.etag
+        if self.last_modified:
+            headers["if-modified-since"] = self.last_modified
+        return headers
+
+
+class ApiCache:
+    """API 回應的磁碟快取 只保存 TTL_RULES 內的 GET 端點"""
+
+    MAX_AGE: int = 7 * 86400
+
+    def __init__(self, path: Path) -> None:
+        self.path: Path = path
+        self.lock: threading.Lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._disabled: bool = False
+
+    @staticmethod
+    def ttl_for(method: str, url: str) -> int | None:
+        """不在快取範圍內回傳 None"""
+        if method.lower() != "get" or paramstore.get("no_api_cache") is True:
+            return None
+        path: str = url.split("?", 1)[0]
+        for pattern, ttl in TTL_RULES:
+            if pattern.search(path):
+                return ttl
+        return None
+
+    @staticmethod
+    def account(cookies: dict[str, str] | None) -> str:
+        """以 bz_r 的雜湊區分帳號 切換帳號或重新登入後不會讀到前一個 cookie 的回應 未帶 cookie 時為空字串"""
+        token: str | None = (cookies or {}).get("bz_r")
+        return hashlib.sha256(token.encode()).hexdigest() if token else ""
+
+    @staticmethod
+    def key(method: str, url: str, params: dict[str, Any] | None, account: str) -> str:
+        raw: bytes = orjson.dumps(
+            [method.lower(), url, sorted((str(k), str(v)) for k, v in (params or {}).items()), account]
+        )
+        return hashlib.sha256(raw).hexdigest()
+
+    def _connect(self) -> sqlite3.Connection | None:
+        if self._conn is None and not self._disabled:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                conn = sqlite3.connect(self.path, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS api_cache (
+                        key TEXT PRIMARY KEY,
+                        url TEXT NOT NULL,
+                        body BLOB NOT NULL,
+                        etag TEXT,
+                        last_modified TEXT,
+                        stored_at REAL NOT NULL,
+                        expires_at REAL NOT NULL
+                    )
+                    """
+                )
+                conn.execute("DELETE FROM api_cache WHERE stored_at < ?", (time.time() - self.MAX_AGE,))
+                conn.commit()
+                self._conn = conn
+            except sqlite3.Error as e:
+                logger.warning(f"API cache disabled, cannot open {self.path}: {e}")
+                self._disabled = True
+        return self._conn
+
+    def _get(self, key: str) -> CacheEntry | None:
+        with self.lock:
+            conn = self._connect()
+            if conn is None:
+                return None
+            try:
+                row = conn.execute(
+                    "SELECT body, etag, last_modified, expires_at FROM api_cache WHERE key = ?", (key,)
+                ).fetchone()
+            except sqlite3.Error as e:
+                logger.warning(f"API cache read failed: {e}")
+                return None
+        if row is None:
+            return None
+        try:
+            return CacheEntry(orjson.loads(row[0]), row[1], row[2], row[3])
+        except orjson.JSONDecodeError:
+            return None
+
+    def _put(self, key: str, url: str, body: bytes, etag: str | None, last_modified: str | None, ttl: int) -> None:
+        now: float = time.time()
+        with self.lock:
+            conn = self._connect()
+            if conn is None:
+                return
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO api_cache (key, url, body, etag, last_modified, stored_at, expires_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, url, body, etag, last_modified, now, now + ttl),
+                )
+                conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"API cache write failed: {e}")
+
+    def _touch(self, key: str, ttl: int) -> None:
+        now: float = time.time()
+        with self.lock:
+            conn = self._connect()
+            if conn is None:
+                return
+            try:
+                conn.execute("UPDATE api_cache SET stored_at = ?, expires_at = ? WHERE key = ?", (now, now + ttl, key))
+                conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"API cache write failed: {e}")
+
+    async def get(self, key: str) -> CacheEntry | None:
+        return await asyncio.to_thread(self._get, key)
+
+    async def store(self, key: str, url: str, ttl: int, headers: CIMultiDictProxy[str], body: Any) -> None:
+        """只保存成功的 JSON 回應 沒有 TTL 也沒有驗證標頭的回應存了也用不到"""
+        if not isinstance(body, dict) or body.get("code") != "0000":
+            return
+        etag: str | None = headers.get("ETag")
+        last_modified: str | None = headers.get("Last-Modified")
+        if ttl <= 0 and not etag and not last_modified:
+            return
+        await asyncio.to_thread(self._put, key, url, orjson.dumps(body), etag, last_modified, ttl)
+
+    async def touch(self, key: str, ttl: int) -> None:
+        """304 Not Modified 時延長既有內容的有效期"""
+        await asyncio.to_thread(self._touch, key, ttl)
+
+
+api_cache: ApiCache = ApiCache(Route().api_cache_db)
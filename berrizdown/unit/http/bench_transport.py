@@ -0,0 +1,143 @@
+"""HTTP/1.1 (aiohttp) 與 HTTP/2 (httpx) 分段下載的本機比較
+
+python -m berrizdown.unit.http.bench_transport [--requests 400] [--size-kb 512] [--concurrency 64] [--per-host 32] [--delay-ms 20]
+
+兩種協定各自啟動本機伺服器 回應前等待 delay 模擬 CDN 延遲 回報耗時 吞吐量與使用的 TCP 連線數
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+
+import aiohttp
+import h2.config
+import h2.connection
+import h2.events
+import httpx
+from aiohttp import web
+
+from berrizdown.unit.http.http2 import Http2Session
+
+
+class _H2Server(asyncio.Protocol):
+    """最小的 h2c (prior knowledge) 伺服器 每個請求都回傳同一段 body"""
+
+    connections: int = 0
+
+    def __init__(self, body: bytes, delay: float) -> None:
+        self.body: bytes = body
+        self.delay: float = delay
+        self.conn = h2.connection.H2Connection(config=h2.config.H2Configuration(client_side=False))
+        self.pending: dict[int, memoryview] = {}
+
+    def connection_made(self, transport: asyncio.Transport) -> None:
+        _H2Server.connections += 1
+        self.transport = transport
+        self.conn.initiate_connection()
+        self.transport.write(self.conn.data_to_send())
+
+    def data_received(self, data: bytes) -> None:
+        for event in self.conn.receive_data(data):
+            if isinstance(event, h2.events.RequestReceived):
+                asyncio.get_running_loop().call_later(self.delay, self._respond, event.stream_id)
+            elif isinstance(event, h2.events.WindowUpdated):
+                self._flush()
+            elif isinstance(event, h2.events.StreamReset):
+                self.pending.pop(event.stream_id, None)
+        self.transport.write(self.conn.data_to_send())
+
+    def _respond(self, stream_id: int) -> None:
+        if self.transport.is_closing():
+            return
+        self.conn.send_headers(
+            stream_id,
+            [(":status", "200"), ("content-length", str(len(self.body))), ("content-type", "application/octet-stream")],
+        )
+        self.pending[stream_id] = memoryview(self.body)
+        self._flush()
+
+    def _flush(self) -> None:
+        for stream_id, data in list(self.pending.items()):
+            while data:
+                window: int = min(self.conn.local_flow_control_window(stream_id), self.conn.max_outbound_frame_size)
+                if window <= 0:
+                    break
+                chunk, data = data[:window], data[window:]
+                self.conn.send_data(stream_id, chunk.tobytes(), end_stream=not data)
+            if data:
+                self.pending[stream_id] = data
+            else:
+                del self.pending[stream_id]
+        self.transport.write(self.conn.data_to_send())
+
+
+async def _start_h1(body: bytes, delay: float) -> tuple[web.AppRunner, set[int]]:
+    peers: set[int] = set()
+
+    async def handler(request: web.Request) -> web.Response:
+        peers.add(id(request.transport))
+        await asyncio.sleep(delay)
+        return web.Response(body=body, content_type="application/octet-stream")
+
+    app = web.Application()
+    app.router.add_get("/{index}", handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    return runner, peers
+
+
+async def _fetch_all(session: aiohttp.ClientSession | Http2Session, base: str, count: int, concurrency: int) -> int:
+    semaphore: asyncio.Semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(index: int) -> int:
+        async with semaphore:
+            async with session.get(f"{base}/{index}") as response:
+                size: int = 0
+                async for chunk in response.content.iter_chunked(32 * 1024):
+                    size += len(chunk)
+                return size
+
+    return sum(await asyncio.gather(*(one(i) for i in range(count))))
+
+
+def _report(name: str, started: float, total: int, connections: int) -> None:
+    elapsed: float = time.perf_counter() - started
+    print(f"{name:<9} {elapsed:7.2f}s  {total / elapsed / 1024 / 1024:8.1f} MB/s  {connections:3d} connections")
+
+
+async def main(args: argparse.Namespace) -> None:
+    body: bytes = b"\0" * (args.size_kb * 1024)
+    delay: float = args.delay_ms / 1000
+    # handle_log 會把 httpx 每個請求都記為 INFO
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    runner, peers = await _start_h1(body, delay)
+    port: int = runner.addresses[0][1]
+    connector = aiohttp.TCPConnector(limit=args.concurrency, limit_per_host=args.per_host)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        started: float = time.perf_counter()
+        total: int = await _fetch_all(session, f"http://127.0.0.1:{port}", args.requests, args.concurrency)
+        _report("HTTP/1.1", started, total, len(peers))
+    await runner.cleanup()
+
+    loop = asyncio.get_running_loop()
+    server = await loop.create_server(lambda: _H2Server(body, delay), "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    session = Http2Session(httpx.AsyncClient(http1=False, http2=True, timeout=60))
+    started = time.perf_counter()
+    total = await _fetch_all(session, f"http://127.0.0.1:{port}", args.requests, args.concurrency)
+    _report("HTTP/2", started, total, _H2Server.connections)
+    await session.close()
+    server.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--size-kb", type=int, default=512)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--per-host", type=int, default=32, help="HTTP/1.1 connection cap (VideoDownload.connector_limit_per_host)")
+    parser.add_argument("--delay-ms", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
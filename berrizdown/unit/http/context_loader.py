@@ -0,0 +1,99 @@
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+from functools import cached_property
+from typing import Any
+
+from berrizdown.lib.load_yaml_config import CFG
+from berrizdown.unit.http.request_berriz_api import Playback_info, Public_context
+
+PLAYBACK = "playback"
+LIVE_PLAYBACK = "live_playback"
+PUBLIC = "public"
+
+
+class ContextLoader:
+    """playback / public context 的共用載入器
+
+    同一個 media id 同時只送出一個請求 所有請求共用同一個並行上限
+    成功的回應依 media id 快取 TTL 秒
+    """
+
+    TTL: float = 300.0
+    MAX_ENTRIES: int = 4096
+
+    def __init__(self, limit: int) -> None:
+        self.semaphore: asyncio.Semaphore = asyncio.Semaphore(max(1, limit))
+        self._cache: dict[tuple[str, str], tuple[float, list[dict[str, Any]]]] = {}
+        self._inflight: dict[tuple[str, str], asyncio.Task] = {}
+
+    @cached_property
+    def Playback_info(self) -> Playback_info:
+        return Playback_info()
+
+    @cached_property
+    def Public_context(self) -> Public_context:
+        return Public_context()
+
+    def _fetcher(self, kind: str) -> Callable[[str, bool], Awaitable[list[dict[str, Any]]]]:
+        match kind:
+            case "playback":
+                return self.Playback_info.get_playback_context
+            case "live_playback":
+                return self.Playback_info.get_live_playback_info
+            case "public":
+                return self.Public_context.get_public_context
+            case _:
+                raise ValueError(f"Unknown context kind: {kind}")
+
+    def _cached(self, key: tuple[str, str]) -> list[dict[str, Any]] | None:
+        hit = self._cache.get(key)
+        if hit is None:
+            return None
+        expires, data = hit
+        if expires < time.monotonic():
+            del self._cache[key]
+            return None
+        return data
+
+    def _store(self, key: tuple[str, str], data: list[dict[str, Any]]) -> None:
+        if len(self._cache) >= self.MAX_ENTRIES:
+            now: float = time.monotonic()
+            self._cache = {k: v for k, v in self._cache.items() if v[0] >= now}
+        self._cache[key] = (time.monotonic() + self.TTL, data)
+
+    async def get(self, kind: str, media_id: str, use_proxy: bool) -> list[dict[str, Any]]:
+        """回傳單一 media id 的 context 格式與 API client 相同 (單一元素的 list)"""
+        key: tuple[str, str] = (kind, media_id)
+        if (data := self._cached(key)) is not None:
+            return data
+        task: asyncio.Task | None = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch(key, use_proxy), name=f"context-{kind}-{media_id}")
+            self._inflight[key] = task
+        # 其中一個呼叫端被取消時 不可連帶取消其他人等待中的請求
+        return await asyncio.shield(task)
+
+    async def _fetch(self, key: tuple[str, str], use_proxy: bool) -> list[dict[str, Any]]:
+        kind, media_id = key
+        try:
+            async with self.semaphore:
+                data = await self._fetcher(kind)(media_id, use_proxy)
+            # 失敗的請求回傳空值 只快取真正的回應
+            if data:
+                self._store(key, data)
+            return data or []
+        finally:
+            self._inflight.pop(key, None)
+
+    async def playback(self, media_id: str, use_proxy: bool) -> list[dict[str, Any]]:
+        return await self.get(PLAYBACK, media_id, use_proxy)
+
+    async def live_playback(self, media_id: str, use_proxy: bool) -> list[dict[str, Any]]:
+        return await self.get(LIVE_PLAYBACK, media_id, use_proxy)
+
+    async def public(self, media_id: str, use_proxy: bool) -> list[dict[str, Any]]:
+        return await self.get(PUBLIC, media_id, use_proxy)
+
+
+context_loader: ContextLoader = ContextLoader(CFG["BerrizAPIClient"]["connector_limit_per_host"])
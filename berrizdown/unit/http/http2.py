@@ -0,0 +1,163 @@
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from http.cookies import SimpleCookie
+from typing import Any
+
+import aiohttp
+import httpx
+import orjson
+from multidict import CIMultiDict, CIMultiDictProxy
+from yarl import URL
+
+
+class Http2Content:
+    """對應 aiohttp response.content 只提供 iter_chunked"""
+
+    def __init__(self, response: httpx.Response) -> None:
+        self._response: httpx.Response = response
+
+    async def iter_chunked(self, n: int) -> AsyncIterator[bytes]:
+        try:
+            async for chunk in self._response.aiter_bytes(n):
+                yield chunk
+        except httpx.TimeoutException as e:
+            raise TimeoutError(str(e)) from e
+        except httpx.TransportError as e:
+            raise aiohttp.ClientPayloadError(str(e)) from e
+
+
+class Http2Response:
+    """把 httpx.Response 包成呼叫端使用到的 aiohttp.ClientResponse 介面"""
+
+    def __init__(self, response: httpx.Response) -> None:
+        self._response: httpx.Response = response
+        self.status: int = response.status_code
+        self.reason: str = response.reason_phrase
+        self.headers: CIMultiDictProxy[str] = CIMultiDictProxy(CIMultiDict(response.headers.multi_items()))
+        self.real_url: URL = URL(str(response.url))
+        self.url: URL = self.real_url
+        self.history: tuple = ()
+        self.version: str = response.http_version
+        self.content: Http2Content = Http2Content(response)
+
+    @property
+    def content_length(self) -> int | None:
+        value: str | None = self.headers.get("content-length")
+        return int(value) if value and value.isdigit() else None
+
+    @property
+    def cookies(self) -> SimpleCookie:
+        cookies: SimpleCookie = SimpleCookie()
+        for value in self.headers.getall("set-cookie", ()):
+            cookies.load(value)
+        return cookies
+
+    @property
+    def request_info(self) -> aiohttp.RequestInfo:
+        request: httpx.Request = self._response.request
+        return aiohttp.RequestInfo(
+            self.real_url,
+            request.method,
+            CIMultiDictProxy(CIMultiDict(request.headers.multi_items())),
+            self.real_url,
+        )
+
+    async def read(self) -> bytes:
+        try:
+            return await self._response.aread()
+        except httpx.TimeoutException as e:
+            raise TimeoutError(str(e)) from e
+        except httpx.TransportError as e:
+            raise aiohttp.ClientPayloadError(str(e)) from e
+
+    async def text(self, encoding: str | None = None) -> str:
+        body: bytes = await self.read()
+        return body.decode(encoding or self._response.encoding or "utf-8")
+
+    async def json(self, content_type: str | None = "application/json", **_: Any) -> Any:
+        body: bytes = await self.read()
+        if content_type and "json" not in self.headers.get("content-type", "").lower():
+            raise aiohttp.ContentTypeError(
+                self.request_info,
+                self.history,
+                status=self.status,
+                message=f"Attempt to decode JSON with unexpected mimetype: {self.headers.get('content-type', '')}",
+                headers=self.headers,
+            )
+        return orjson.loads(body) if body.strip() else None
+
+    def raise_for_status(self) -> None:
+        if self.status >= 400:
+            raise aiohttp.ClientResponseError(
+                self.request_info, self.history, status=self.status, message=self.reason, headers=self.headers
+            )
+
+
+class Http2Session:
+    """以 httpx HTTP/2 連線實作 transport 用到的 aiohttp.ClientSession 子集
+
+    同一 host 的大量請求在少數連線上多工 錯誤轉為對應的 aiohttp 例外 讓既有的重試流程不用修改
+    proxy 請求不走這裡 由 transport 改用 aiohttp session
+    """
+
+    def __init__(self, client: httpx.AsyncClient) -> None:
+        self._client: httpx.AsyncClient = client
+
+    @property
+    def closed(self) -> bool:
+        return self._client.is_closed
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+    @asynccontextmanager
+    async def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        params: dict[str, Any] | None = None,
+        headers: dict[str, str] | None = None,
+        cookies: dict[str, str] | None = None,
+        json: Any = None,
+        data: Any = None,
+        timeout: aiohttp.ClientTimeout | None = None,
+        stream: bool = False,
+        **_: Any,
+    ) -> AsyncIterator[Http2Response]:
+        """stream 為 False 時先讀完整個 body 離開 context 後仍可讀取 (response_object 用法)"""
+        request_headers: dict[str, str] = dict(headers or {})
+        if cookies:
+            request_headers["cookie"] = "; ".join(f"{k}={v}" for k, v in cookies.items())
+        extra: dict[str, Any] = {}
+        if timeout is not None and timeout.total is not None:
+            extra["timeout"] = timeout.total
+        request: httpx.Request = self._client.build_request(
+            method.upper(),
+            url,
+            params=params,
+            headers=request_headers,
+            json=json,
+            content=data if isinstance(data, (bytes, str)) else None,
+            data=data if isinstance(data, dict) else None,
+            **extra,
+        )
+        try:
+            response: httpx.Response = await self._client.send(request, stream=True)
+        except httpx.TimeoutException as e:
+            raise TimeoutError(str(e)) from e
+        except httpx.TransportError as e:
+            raise aiohttp.ClientOSError(str(e)) from e
+        try:
+            wrapped: Http2Response = Http2Response(response)
+            if not stream:
+                await wrapped.read()
+            yield wrapped
+        finally:
+            await response.aclose()
+
+    def get(self, url: str, **kwargs: Any):
+        return self.request("GET", url, stream=True, **kwargs)
+
+    def post(self, url: str, **kwargs: Any):
+        return self.request("POST", url, **kwargs)
@@ -7,7 +7,7 @@ from httpx import Response
 from pydantic import BaseModel
 
 from berrizdown.static.color import Color
-from berrizdown.unit.__init__ import USERAGENT
+from berrizdown.unit.__init__ import get_useragent
 from berrizdown.unit.handle.handle_log import setup_logging
 
 logger = setup_logging("httpx_login_unban", "magenta")
@@ -27,12 +27,14 @@ class Request:
         "pacode": "fanplatf::app:android:phone",
     }
 
-    headers: dict[str, str] = {
-        "user-agent": f"{USERAGENT}",
-        "accept": "application/json",
-        "accept-encoding": "gzip, deflate, br, zstd",
-        "referer": "https://berriz.in/",
-    }
+    @staticmethod
+    def headers() -> dict[str, str]:
+        return {
+            "user-agent": get_useragent(),
+            "accept": "application/json",
+            "accept-encoding": "gzip, deflate, br, zstd",
+            "referer": "https://berriz.in/",
+        }
 
     def __init__(self):
         self.retry_http_status: set[int] = frozenset({400, 401, 403, 500, 502, 503, 504})
@@ -68,7 +70,7 @@ class Request:
                 response: httpx.Response = await session.post(
                     url,
                     cookies=Request.cookies,
-                    headers=Request.headers,
+                    headers=Request.headers(),
                     json=validated_data,
                 )
                 if response.status_code in self.retry_http_status:
@@ -100,7 +102,7 @@ class Request:
                     url,
                     params=p,
                     cookies=Request.cookies,
-                    headers=Request.headers,
+                    headers=Request.headers(),
                 )
                 if response.status_code in self.retry_http_status:
                     logger.info(f"Retryable server error: {response.text}")
@@ -138,7 +140,7 @@ class Request:
                 response: httpx.Response = await session.put(
                     url,
                     cookies=Request.cookies,
-                    headers=Request.headers,
+                    headers=Request.headers(),
                     json=validated_data,
                 )
                 if response.status_code in self.retry_http_status:
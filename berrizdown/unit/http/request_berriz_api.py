@@ -1,11 +1,8 @@
 import asyncio
-import json
 import logging
 import random
 import re
 import sys
-import ssl
-import time
 import uuid
 from functools import lru_cache, cached_property
 from itertools import repeat
@@ -14,21 +11,20 @@ from typing import Any
 import aiohttp
 from pydantic import BaseModel, Field, ValidationError
 
-from berrizdown.cookies.cookies import Refresh_JWT
-from berrizdown.lib.base64 import base64
-from berrizdown.lib.load_yaml_config import CFG
-from berrizdown.lib.lock_cookie import Lock_Cookie, cookie_session
+from berrizdown.cookies.token_manager import token_manager
+from berrizdown.lib.lock_cookie import Lock_Cookie
 from berrizdown.lib.Proxy import Proxy
+from berrizdown.lib.settings import get_settings
 from berrizdown.static.api_error_handle import api_error_handle
 from berrizdown.static.color import Color
 from berrizdown.static.parameter import paramstore
-from berrizdown.unit.__init__ import USERAGENT
+from berrizdown.unit.__init__ import get_useragent
 from berrizdown.unit.handle.handle_log import setup_logging
+from berrizdown.unit.http.api_cache import CacheEntry, api_cache
+from berrizdown.unit.http.transport import API, transport
 
 logger = setup_logging("request_berriz_api", "aluminum")
 
-_session: aiohttp.ClientSession | None = None
-
 
 class CreateCommunityModel(BaseModel):
     """Pydantic model for create_community payload"""
@@ -104,63 +100,24 @@ async def handle_response(obj):
 
 class BerrizAPIClient:
     show_proxy_log: bool = True
-    base_sleep: float = CFG["BerrizAPIClient"]["base_sleep"]
-    max_sleep: float = CFG["BerrizAPIClient"]["max_sleep"]
-    max_retries: int = CFG["BerrizAPIClient"]["max_retries"]
+    base_sleep: float = get_settings().api.base_sleep
+    max_sleep: float = get_settings().api.max_sleep
+    max_retries: int = get_settings().api.max_retries
     retry_http_status: frozenset[int] = frozenset({400, 401, 403, 502, 503, 504})
     _re_request_cookie: bool = True
 
-    def __init__(self) -> None:
-        self.headers: dict[str, str] = self._build_headers()
-        self._ssl_context: ssl.SSLContext | None = None
-
-    def _create_optimized_ssl_context(self) -> ssl.SSLContext:
-        ctx = ssl.create_default_context(purpose=ssl.Purpose.SERVER_AUTH)
-        ctx.set_ciphers("ECDHE+AESGCM")
-        ctx.options |= ssl.OP_NO_COMPRESSION
-        ctx.options |= ssl.OP_NO_TLSv1 | ssl.OP_NO_TLSv1_1
-        ctx.load_default_certs()
-        ctx.session_stats()
-        return ctx
+    @cached_property
+    def headers(self) -> dict[str, str]:
+        """首次送出請求時才組 headers 避免 import 時就產生 user-agent"""
+        return self._build_headers()
 
     def get_session(self) -> aiohttp.ClientSession:
-        global _session
-        if _session is None:
-            ssl_ctx = self._create_optimized_ssl_context()
-            connector = aiohttp.TCPConnector(
-                ssl=ssl_ctx,
-                limit=CFG["BerrizAPIClient"]["connector_limit"],
-                limit_per_host=CFG["BerrizAPIClient"]["connector_limit_per_host"],
-                keepalive_timeout=CFG["BerrizAPIClient"]["keepalive_timeout"],
-                enable_cleanup_closed=CFG["BerrizAPIClient"]["enable_cleanup_closed"],
-                force_close=CFG["BerrizAPIClient"]["force_close"],
-                use_dns_cache=CFG["BerrizAPIClient"]["use_dns_cache"],
-                ttl_dns_cache=CFG["BerrizAPIClient"]["ttl_dns_cache"],
-                resolver=aiohttp.AsyncResolver(),
-            )
-
-            timeout = aiohttp.ClientTimeout(
-                total=CFG["BerrizAPIClient"]["timeouttotal"],
-                connect=CFG["BerrizAPIClient"]["timeeoutconnect"],
-                sock_connect=CFG["BerrizAPIClient"]["timeoutsock_connect"],
-                sock_read=CFG["BerrizAPIClient"]["timeeoutsock_read"],
-            )
-
-            _session = aiohttp.ClientSession(
-                connector=connector,
-                timeout=timeout,
-                trust_env=True,
-            )
-
-            logger.info(f"{Color.fg('sage')}[Generate new session] {Color.fg('fog')}Timeout: {_session.timeout}-Each connect: {connector.limit_per_host} MAX connect: {connector.limit}{Color.reset()}")
-        return _session
+        return transport.session(API)
 
     async def close_session(self):
-        global _session
-        if _session is not None:
-            await _session.close()
-            await asyncio.sleep(0.350)
-            _session = None
+        """程式結束前關閉所有共用連線"""
+        await transport.close()
+        await asyncio.sleep(0.350)
 
     @lru_cache(maxsize=1)
     def _build_headers(self) -> dict[str, str]:
@@ -170,7 +127,7 @@ class BerrizAPIClient:
             "origin": "https://berriz.in",
             "accept": "application/json",
             "pragma": "no-cache",
-            "user-agent": f"{USERAGENT}",
+            "user-agent": get_useragent(),
         }
 
     async def ensure_cookie(self) -> dict[str, str]:
@@ -181,24 +138,13 @@ class BerrizAPIClient:
         raise RuntimeError("Fail to get cookie")
 
     def is_jwt_expiring_soon(self, gwt: str | None) -> bool:
-        if gwt is None:
-            return False
-        if gwt == {}:
-            return False
-        try:
-            if len(gwt) == 0:
-                return False
-            p = gwt.split(".")[1]
-            p += "=" * (-len(p) % 4)
-            return int(json.loads(base64.urlsafe_b64decode(p))["exp"]) - time.time() < 150
-        except Exception as e:
-            logger.error(f"{e}")
-            return False
-
-    async def cookie(self, re_request_cookie: bool = False) -> dict[str, str] | None:
+        return token_manager.expiring_soon(gwt)
+
+    async def cookie(self, re_request_cookie: bool = False, stale: str | None = None) -> dict[str, str] | None:
+        """re_request_cookie 時 refresh bz_a 同時間的多個請求共用同一次 refresh"""
         if paramstore.get("no_cookie") is not True:
             if re_request_cookie is True:
-                bz_a: str | None = await Refresh_JWT().refresh_token()
+                bz_a: str | None = await token_manager.refresh(stale)
                 if bz_a is not None:
                     cookie: dict[str, str] = await self.ensure_cookie()
                     cookie["bz_a"] = bz_a
@@ -209,12 +155,13 @@ class BerrizAPIClient:
                     await self.close_session()
                     sys.exit(0)
 
-            if cookie_session in (None, {}):
+            session: dict[str, str] = await Lock_Cookie.session()
+            if session in (None, {}):
                 BerrizAPIClient._re_request_cookie: bool = False
                 cookie: dict[str, str] = await self.ensure_cookie()
                 return cookie
             else:
-                return cookie_session
+                return session
         elif paramstore.get("no_cookie") is True:
             return {}
 
@@ -242,9 +189,22 @@ class BerrizAPIClient:
     ) -> list[dict[str, Any]] | str | bytes | dict[str, Any] | aiohttp.ClientResponse | None:
         max_retries: int = self.max_retries
         attempt: int = 0
+
+        cache_ttl: int | None = None if response_object else api_cache.ttl_for(method, url)
+        cache_entry: CacheEntry | None = None
+        if cache_ttl is not None:
+            account: str = api_cache.account(await self.cookie()) if usecookie and paramstore.get("no_cookie") is not True else ""
+            cache_key: str = api_cache.key(method, url, params, account)
+            cache_entry = await api_cache.get(cache_key)
+            if cache_entry is not None and cache_entry.fresh:
+                return cache_entry.body
+            if cache_entry is not None:
+                # 過期內容改用條件式請求 伺服器回 304 時沿用快取
+                headers = {**(headers or self.headers), **cache_entry.validators()}
+
         while attempt < max_retries:
-            session: aiohttp.ClientSession = self.get_session()
             cookies, proxy = await self._prepare_session(use_proxy, usecookie)
+            session = transport.session_for(API, url, proxy)
             if not cookies and usecookie and paramstore.get("no_cookie") != True:
                 raise RuntimeError("Cookie is empty! cancel request")
 
@@ -261,9 +221,13 @@ class BerrizAPIClient:
                 ) as response:
                     await self._log_response(response, method, url, params)
 
+                    if response.status == 304 and cache_entry is not None:
+                        await api_cache.touch(cache_key, cache_ttl)
+                        return cache_entry.body
+
                     if response.status in self.retry_http_status:
                         message: str = await response.text()
-                        await self._handle_retry_errors(response, message)
+                        await self._handle_retry_errors(response, message, cookies.get("bz_a"))
 
                     if response.status == 403 and ("policy/webview-host/allows" in url or "service/v1/my/geo-location" in url):
                         """most like proxy got CloudFront block"""
@@ -273,7 +237,10 @@ class BerrizAPIClient:
                     if response_object:
                         return response
 
-                    return await self._process_response_content(response)
+                    content = await self._process_response_content(response)
+                    if cache_ttl is not None:
+                        await api_cache.store(cache_key, url, cache_ttl, response.headers, content)
+                    return content
 
             except aiohttp.ClientResponseError as e:
                 result = await self._handle_client_error(e, url)
@@ -285,7 +252,7 @@ class BerrizAPIClient:
                 await self._handle_connection_error(e, attempt, max_retries)
                 attempt += 1
             except asyncio.CancelledError:
-                await self.close_session()
+                await transport.close(API)
 
         logger.error(f"Retry exceeded for {url}")
         return None
@@ -293,9 +260,9 @@ class BerrizAPIClient:
     async def _prepare_session(self, use_proxy: bool, usecookie: bool) -> tuple[dict[str, str], str | None]:
         ck: dict[str, str] | None = await self.cookie()
 
-        if self.is_jwt_expiring_soon(ck.get("bz_a") if ck else None):
-            await self.cookie(True)
-            ck: dict[str, str] | None = await self.cookie()
+        bz_a: str | None = ck.get("bz_a") if ck else None
+        if self.is_jwt_expiring_soon(bz_a):
+            ck = await self.cookie(True, stale=bz_a)
         # TODO: current only http/https and no VPN support.
         proxy: str | None = await self._get_random_proxy()
         proxy = proxy if use_proxy else None
@@ -304,12 +271,12 @@ class BerrizAPIClient:
         return cookies, proxy
 
     async def _log_response(self, response: aiohttp.ClientResponse, method: str, url: str, params: dict) -> None:
-        if CFG["BerrizAPIClient"]["show_log"] is True:
+        if get_settings().api.show_log:
             logger.info(f"{Color.fg('gray')}{response.status} {method.upper()} {response.real_url}{Color.reset()}")
         logger.debug(response.request_info)
         logger.debug(f"Cookies: {response.cookies}")
 
-    async def _handle_retry_errors(self, response: aiohttp.ClientResponse, message: str) -> None:
+    async def _handle_retry_errors(self, response: aiohttp.ClientResponse, message: str, bz_a: str | None = None) -> None:
         if any(code in message for code in ("FS_ER5030", "FS_AU1023")):
             # return the JSON error
             return await response.json()
@@ -323,8 +290,8 @@ class BerrizAPIClient:
         )
 
         if any(t in message for t in error):
-            # force refresh cookie
-            await self.cookie(True)
+            # force refresh cookie 其他請求已換過 token 時沿用新的
+            await self.cookie(True, stale=bz_a)
 
         raise aiohttp.ClientResponseError(
             request_info=response.request_info,
@@ -433,7 +400,7 @@ class Live(BerrizAPIClient):
 
         params: dict[str, str] = {"": ""}
         headers: dict[str, str] = {
-            "user-Agent": f"{USERAGENT}",
+            "user-Agent": get_useragent(),
             "accept": "application/x-mpegURL, application/vnd.apple.mpegurl, application/json, text/plain",
             "referer": "Berriz/20250704.1139 CFNetwork/1498.700.2 Darwin/23.6.0",
         }
@@ -449,7 +416,7 @@ class Live(BerrizAPIClient):
         usecookie = False
         params = {}
         headers = {
-            "user-agent": f"{USERAGENT}",
+            "user-agent": get_useragent(),
             "accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
             "connection": "close",
             "pragma": "no-cache",
@@ -534,7 +501,7 @@ class Notify(BerrizAPIClient):
 
         url: str = "https://svc-api.berriz.in/service/v1/notifications"
         headers: dict[str, str] = {
-            "user-Agent": f"{USERAGENT}",
+            "user-Agent": get_useragent(),
             "accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
             "alt-Used": "svc-api.berriz.in",
         }
@@ -577,7 +544,7 @@ class My(BerrizAPIClient):
     async def fetch_me(self, use_proxy: bool) -> dict[str, Any] | None:
         url: str = "https://account.berriz.in/auth/v1/accounts"
         headers: dict[str, str] = {
-            "User-Agent": f"{USERAGENT}",
+            "User-Agent": get_useragent(),
             "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
             "Alt-Used": "account.berriz.in",
         }
@@ -594,7 +561,7 @@ class My(BerrizAPIClient):
     async def get_me_info(self, use_proxy: bool) -> dict[str, Any] | None:
         url: str = "https://account.berriz.in/member/v1/members/me"
         headers: dict[str, str] = {
-            "user-Agent": f"{USERAGENT}",
+            "user-Agent": get_useragent(),
             "accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
             "alt-Used": "account.berriz.in",
         }
@@ -776,7 +743,7 @@ class Password_Change(BerrizAPIClient):
                 return None
 
             headers: dict[str, str] = {
-                "user-agent": f"{USERAGENT}",
+                "user-agent": get_useragent(),
                 "accept": "application/json",
                 "referer": "https://berriz.in/",
                 "content-Type": "application/json",
@@ -804,16 +771,16 @@ class Password_Change(BerrizAPIClient):
 
 class Arits(BerrizAPIClient):
     def __init__(self) -> None:
-        self.headers: dict[str, str] = self.header()
         self.params: dict[str, str] = {"languageCode": "en"}
         
     @cached_property
     def community_id_checker(self) -> "Community_id_checker":
         return Community_id_checker
 
-    def header(self) -> dict[str, str]:
+    @cached_property
+    def headers(self) -> dict[str, str]:
         return {
-            "user-agent": f"{USERAGENT}",
+            "user-agent": get_useragent(),
             "accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
             "alt-Used": "svc-api.berriz.in",
             "accept-encoding": "gzip, deflate",
@@ -0,0 +1,260 @@
+import asyncio
+import socket
+import ssl
+import time
+from fnmatch import fnmatch
+from urllib.parse import urlsplit
+
+import aiohttp
+import httpx
+from aiohttp.abc import AbstractResolver, ResolveResult
+
+from berrizdown.lib.settings import get_settings
+from berrizdown.static.color import Color
+from berrizdown.unit.__init__ import get_useragent
+from berrizdown.unit.handle.handle_log import setup_logging
+from berrizdown.unit.http.http2 import Http2Session
+
+logger = setup_logging("transport", "aluminum")
+
+
+# 依用途分組的連線池
+API = "api"
+MEDIA = "media"
+DRM = "drm"
+MISC = "misc"
+
+# 可在設定中指定 HTTP/2 hosts 的連線池 (BerrizAPIClient / VideoDownload 區段)
+HTTP2_KINDS: frozenset[str] = frozenset({API, MEDIA})
+
+
+class CachingResolver(AbstractResolver):
+    """所有連線池共用的 DNS 快取 同一個 host 在 TTL 內只查詢一次 同時查詢時共用同一個請求"""
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl: float = ttl
+        self._resolver: AbstractResolver = aiohttp.AsyncResolver()
+        self._cache: dict[tuple[str, int, int], tuple[float, list[ResolveResult]]] = {}
+        self._inflight: dict[tuple[str, int, int], asyncio.Future] = {}
+
+    async def resolve(self, host: str, port: int = 0, family: socket.AddressFamily = socket.AF_INET) -> list[ResolveResult]:
+        key: tuple[str, int, int] = (host, port, int(family))
+        hit = self._cache.get(key)
+        if hit is not None and hit[0] > time.monotonic():
+            return hit[1]
+        future: asyncio.Future | None = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._resolver.resolve(host, port, family))
+            self._inflight[key] = future
+            future.add_done_callback(lambda f: self._store(key, f))
+        return await asyncio.shield(future)
+
+    def _store(self, key: tuple[str, int, int], future: asyncio.Future) -> None:
+        self._inflight.pop(key, None)
+        if not future.cancelled() and future.exception() is None:
+            self._cache[key] = (time.monotonic() + self.ttl, future.result())
+
+    async def close(self) -> None:
+        await self._resolver.close()
+
+
+class Transport:
+    """API 分段 圖片 DRM license 等所有 aiohttp 請求共用的連線層
+
+    - 每種用途一個長駐 keep-alive 連線池 不再每次請求或每個下載器各開一個 session
+    - 共用 DNS 快取與 SSLContext (憑證只載入一次)
+    - session 綁定 event loop 換 loop 時重新建立
+    - 設定 http2_hosts 的 host 改走 httpx HTTP/2 多工連線
+    """
+
+    def __init__(self) -> None:
+        self._sessions: dict[str, aiohttp.ClientSession | Http2Session] = {}
+        self._resolver: CachingResolver | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._ssl_contexts: dict[str, ssl.SSLContext] = {}
+
+    def _bind(self) -> None:
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._sessions = {}
+            self._resolver = None
+
+    @property
+    def resolver(self) -> CachingResolver:
+        self._bind()
+        if self._resolver is None:
+            self._resolver = CachingResolver(get_settings().api.ttl_dns_cache or 10)
+        return self._resolver
+
+    @staticmethod
+    def _new_ssl_context(kind: str) -> ssl.SSLContext:
+        ctx = ssl.create_default_context(purpose=ssl.Purpose.SERVER_AUTH)
+        if kind == API:
+            ctx.set_ciphers("ECDHE+AESGCM")
+            ctx.options |= ssl.OP_NO_COMPRESSION
+            ctx.options |= ssl.OP_NO_TLSv1 | ssl.OP_NO_TLSv1_1
+        return ctx
+
+    def ssl_context(self, kind: str) -> ssl.SSLContext:
+        """aiohttp 連線池共用的 SSLContext 只會協商 HTTP/1.1"""
+        if kind not in self._ssl_contexts:
+            self._ssl_contexts[kind] = self._new_ssl_context(kind)
+        return self._ssl_contexts[kind]
+
+    def session(self, kind: str) -> aiohttp.ClientSession:
+        """取得指定用途的共用 session 不存在或已關閉時建立"""
+        self._bind()
+        session: aiohttp.ClientSession | None = self._sessions.get(kind)
+        if session is None or session.closed:
+            session = self._create(kind)
+            self._sessions[kind] = session
+        return session
+
+    @staticmethod
+    def uses_http2(kind: str, url: str) -> bool:
+        if kind not in HTTP2_KINDS:
+            return False
+        settings = get_settings()
+        patterns: tuple[str, ...] = settings.video.http2_hosts if kind == MEDIA else settings.api.http2_hosts
+        if not patterns:
+            return False
+        host: str = (urlsplit(url).hostname or "").lower()
+        return any(fnmatch(host, pattern.lower()) for pattern in patterns)
+
+    def session_for(self, kind: str, url: str, proxy: str | None = None) -> aiohttp.ClientSession | Http2Session:
+        """依 host 選擇 HTTP/1.1 (aiohttp) 或 HTTP/2 (httpx) 連線池 使用 proxy 時一律走 aiohttp"""
+        if proxy or not self.uses_http2(kind, url):
+            return self.session(kind)
+        self._bind()
+        name: str = f"{kind}:h2"
+        session = self._sessions.get(name)
+        if session is None or session.closed:
+            session = self._create_http2(kind)
+            self._sessions[name] = session
+        return session
+
+    def _create_http2(self, kind: str) -> Http2Session:
+        settings = get_settings()
+        if kind == MEDIA:
+            video = settings.video
+            timeout = httpx.Timeout(video.timeout_total, connect=video.timeout_connect, read=video.timeout_sock_read)
+            keepalive: float = video.connector_keepalive_timeout
+            limit: int = video.connector_limit
+            headers: dict[str, str] = {"user-agent": get_useragent(), "accept": "*/*", "accept-encoding": "gzip, deflate"}
+        else:
+            api = settings.api
+            timeout = httpx.Timeout(api.timeouttotal, connect=api.timeeoutconnect, read=api.timeeoutsock_read)
+            keepalive = api.keepalive_timeout
+            limit = api.connector_limit
+            headers = {}
+        client = httpx.AsyncClient(
+            http2=True,
+            # httpcore 會在 context 上設定 ALPN h2 不能與 aiohttp 共用 否則 aiohttp 連線也會提供 h2
+            verify=self._new_ssl_context(kind),
+            timeout=timeout,
+            headers=headers,
+            limits=httpx.Limits(max_connections=limit, keepalive_expiry=keepalive),
+            trust_env=False,
+        )
+        logger.debug(f"{Color.fg('sage')}[Generate new HTTP/2 session] {Color.fg('fog')}{kind}{Color.reset()}")
+        return Http2Session(client)
+
+    def _create(self, kind: str) -> aiohttp.ClientSession:
+        match kind:
+            case "api":
+                return self._create_api()
+            case "media":
+                return self._create_media()
+            case "drm" | "misc":
+                api = get_settings().api
+                connector = aiohttp.TCPConnector(
+                    ssl=self.ssl_context(kind),
+                    limit=api.connector_limit,
+                    limit_per_host=api.connector_limit_per_host,
+                    keepalive_timeout=api.keepalive_timeout,
+                    resolver=self.resolver,
+                )
+                return aiohttp.ClientSession(
+                    connector=connector,
+                    timeout=aiohttp.ClientTimeout(total=13.0 if kind == DRM else 30.0),
+                    trust_env=True,
+                )
+            case _:
+                raise ValueError(f"Unknown transport kind: {kind}")
+
+    def _create_api(self) -> aiohttp.ClientSession:
+        api = get_settings().api
+        connector = aiohttp.TCPConnector(
+            ssl=self.ssl_context(API),
+            limit=api.connector_limit,
+            limit_per_host=api.connector_limit_per_host,
+            keepalive_timeout=api.keepalive_timeout,
+            enable_cleanup_closed=api.enable_cleanup_closed,
+            force_close=api.force_close,
+            use_dns_cache=api.use_dns_cache,
+            ttl_dns_cache=api.ttl_dns_cache,
+            resolver=self.resolver,
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=api.timeouttotal,
+            connect=api.timeeoutconnect,
+            sock_connect=api.timeoutsock_connect,
+            sock_read=api.timeeoutsock_read,
+        )
+        session = aiohttp.ClientSession(connector=connector, timeout=timeout, trust_env=True)
+        logger.info(f"{Color.fg('sage')}[Generate new session] {Color.fg('fog')}Timeout: {session.timeout}-Each connect: {connector.limit_per_host} MAX connect: {connector.limit}{Color.reset()}")
+        return session
+
+    def _create_media(self) -> aiohttp.ClientSession:
+        video = get_settings().video
+        connector = aiohttp.TCPConnector(
+            ssl=self.ssl_context(MEDIA),
+            limit=video.connector_limit,
+            limit_per_host=video.connector_limit_per_host,
+            ttl_dns_cache=video.connector_ttl_dns_cache,
+            use_dns_cache=video.connector_use_dns_cache,
+            keepalive_timeout=video.connector_keepalive_timeout,
+            enable_cleanup_closed=video.connector_enable_cleanup_closed,
+            force_close=False,
+            family=socket.AF_INET,
+            resolver=self.resolver,
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=video.timeout_total,
+            connect=video.timeout_connect,
+            sock_read=video.timeout_sock_read,
+            sock_connect=video.timeout_sock_connect,
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=timeout,
+            headers={
+                "user-agent": get_useragent(),
+                "accept": "*/*",
+                "accept-encoding": "gzip, deflate, br",
+                "connection": "keep-alive",
+            },
+            cookie_jar=aiohttp.DummyCookieJar(),
+            auto_decompress=True,
+            read_bufsize=256 * 1024,
+        )
+
+    async def close(self, kind: str | None = None) -> None:
+        """關閉指定用途的 session 不指定時全部關閉 (程式結束前)"""
+        if self._loop is not asyncio.get_running_loop():
+            self._sessions = {}
+            self._resolver = None
+            return
+        kinds: list[str] = list(self._sessions) if kind is None else [kind]
+        for name in kinds:
+            for key in (name, f"{name}:h2"):
+                session = self._sessions.pop(key, None)
+                if session is not None and not session.closed:
+                    await session.close()
+        if not self._sessions and self._resolver is not None:
+            await self._resolver.close()
+            self._resolver = None
+
+
+transport: Transport = Transport()
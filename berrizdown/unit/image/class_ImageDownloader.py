@@ -1,82 +1,106 @@
 import asyncio
+import os
 import random
-import shutil
-from io import BytesIO
-from typing import Any
+import uuid
+
+import aiofiles
+import aiohttp
 
 from berrizdown.lib.__init__ import printer_video_folder_path_info, resolve_conflict_path, use_proxy
 from berrizdown.lib.path import Path
+from berrizdown.lib.settings import get_settings
 from berrizdown.static.color import Color
-from berrizdown.unit.__init__ import USERAGENT, FilenameSanitizer
+from berrizdown.unit.__init__ import FilenameSanitizer, get_useragent
 from berrizdown.unit.handle.handle_log import setup_logging
 from berrizdown.unit.http.request_berriz_api import GetRequest
+from berrizdown.unit.http.transport import API, transport
 
 logger = setup_logging("class_ImageDownloader", "sienna")
 semaphore: asyncio.Semaphore = asyncio.Semaphore(7)
+# 決定最終檔名到改名完成之間不可被其他下載插入 否則同名圖片會互相覆蓋
+_rename_lock: asyncio.Lock = asyncio.Lock()
 
 
 class ImageDownloader:
-    """Handles downloading images from URLs using aiohttp and shutil for async-safe file I/O."""
+    """Streams images to disk chunk by chunk: body -> temp file -> atomic rename, never holding a whole image in memory."""
+
+    CHUNK_SIZE: int = 256 * 1024
 
     def __init__(self) -> None:
         self.getrequest: GetRequest = GetRequest()
         self.header: dict[str, str] = {
-            "user-agent": USERAGENT,
+            "user-agent": get_useragent(),
             "accept-encoding": "identity",
             "accept": "image/avif,image/webp,image/png,image/jpeg,image/gif,image/svg+xml,*/*",
         }
-        self._file_write_max_retries = 3
 
-    async def _write_to_file(self, response: bytes, target_file_path: str | Path) -> None:
-        """Write raw bytes to file using shutil.copyfileobj wrapped in asyncio.to_thread."""
+    async def download_to_file(self, url: str, target_file_path: str | Path) -> Path | None:
+        """Download url into target_file_path, retrying with backoff. Returns the final path or None on failure."""
         file_path: Path = Path(target_file_path).parent / FilenameSanitizer.sanitize_filename(Path(target_file_path).name)
-        resolvepath = await resolve_conflict_path(file_path)
+        tmp_path: Path = file_path.with_name(f".{file_path.name}.{uuid.uuid4().hex[:8]}.part")
+        api = get_settings().api
 
-        for attempt in range(1, self._file_write_max_retries + 1):
-            try:
-                async with semaphore:
-                    await asyncio.to_thread(self._write_bytes_with_shutil, response, resolvepath)
+        async with semaphore:
+            for attempt in range(api.max_retries):
+                try:
+                    await self._stream(url, tmp_path)
+                    resolvepath: Path = await self._commit(tmp_path, file_path)
                     printer_video_folder_path_info(
                         resolvepath,
                         resolvepath.name,
                         f"{Color.fg('sunrise')}Image {Color.reset()}",
                     )
-                    return
+                    return resolvepath
+
+                except asyncio.CancelledError:
+                    self._discard(tmp_path)
+                    raise
+
+                except (TimeoutError, aiohttp.ClientError, OSError) as e:
+                    self._discard(tmp_path)
+                    if isinstance(e, aiohttp.ClientResponseError) and e.status < 500 and e.status != 429:
+                        logger.error(f"Failed to download image: {url} - {e.status} {e.message}")
+                        return None
+                    if attempt + 1 >= api.max_retries:
+                        logger.error(f"Image download failed after {api.max_retries} attempts: {url} - {e}")
+                        return None
+                    sleep: float = min(api.max_sleep, api.base_sleep * (2**attempt)) * (0.5 + random.random())
+                    logger.warning(f"[Image Attempt {attempt + 1}/{api.max_retries}] {type(e).__name__}: {url} - {e}, retrying in {sleep:.2f}s")
+                    await asyncio.sleep(sleep)
+        return None
 
-            except OSError as e:
-                if attempt == self._file_write_max_retries:
-                    logger.error(f"File write failed after {self._file_write_max_retries} attempts: {resolvepath} - {e}")
-                    if resolvepath.exists():
-                        try:
-                            resolvepath.unlink()
-                            logger.info(f"Cleaned up failed file: {resolvepath}")
-                        except Exception as cleanup_err:
-                            logger.warning(f"Failed to clean up file {resolvepath}: {cleanup_err}")
-                backoff = (2 ** (attempt - 1)) * 0.5
-                jitter = random.uniform(0, 0.1 * backoff)
-                wait_time = backoff + jitter
-                logger.warning(f"[File Write Attempt {attempt}/{self._file_write_max_retries}] Failed: {resolvepath} - {e}, retrying in {wait_time:.2f}s")
-                await asyncio.sleep(wait_time)
-            except asyncio.CancelledError:
-                if resolvepath.exists():
-                    try:
-                        resolvepath.unlink()
-                        logger.info(f"Removed partial file: {resolvepath}")
-                    except Exception as cleanup_err:
-                        logger.warning(f"Failed to clean up file {resolvepath}: {cleanup_err}")
-                raise
+    async def _stream(self, url: str, tmp_path: Path) -> None:
+        """單次 GET 將 body 逐塊寫入暫存檔 長度不符時視為中斷"""
+        proxy: str | None = await self.getrequest._get_random_proxy() if use_proxy else None
+        session = transport.session_for(API, url, proxy)
+        async with session.get(url, headers=self.header, proxy=proxy) as response:
+            if response.status != 200:
+                raise aiohttp.ClientResponseError(
+                    response.request_info,
+                    response.history,
+                    status=response.status,
+                    message=response.reason or "",
+                    headers=response.headers,
+                )
+            expected: int | None = response.content_length
+            written: int = 0
+            async with aiofiles.open(tmp_path, "wb") as fh:
+                async for chunk in response.content.iter_chunked(self.CHUNK_SIZE):
+                    await fh.write(chunk)
+                    written += len(chunk)
+            if expected is not None and written != expected:
+                raise aiohttp.ClientPayloadError(f"Incomplete image {url}: {written}/{expected} bytes")
 
-    def _write_bytes_with_shutil(self, data: bytes, path: Path) -> None:
-        """Use shutil to write bytes to file with fixed buffer size."""
-        with open(path, "wb") as f:
-            shutil.copyfileobj(BytesIO(data), f, length=4 * 1024 * 1024)
+    async def _commit(self, tmp_path: Path, file_path: Path) -> Path:
+        """下載完成才取得最終檔名並改名 中斷時目的地不會留下半個檔案"""
+        async with _rename_lock:
+            resolvepath: Path = await resolve_conflict_path(file_path)
+            os.replace(tmp_path, resolvepath)
+        return resolvepath
 
-    async def download_image(self, url: str) -> bytes | None:
-        """Download image and return raw bytes. Caller handles saving."""
-        params = {}
-        usecookie = False
-        bytes_data: Any = await self.getrequest._send_request("get", url, params, self.header, use_proxy, usecookie, response_object=False)
-        if not isinstance(bytes_data, bytes):
-            logger.error(f"Failed to download image: {url}, got response: {bytes_data}s")
-            raise ValueError("Response is not bytes")
-        return bytes_data
+    @staticmethod
+    def _discard(tmp_path: Path) -> None:
+        try:
+            tmp_path.unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning(f"Failed to clean up file {tmp_path}: {e}")
@@ -20,7 +20,7 @@ from berrizdown.unit.__init__ import FilenameSanitizer
 from berrizdown.unit.date.date import get_formatted_publish_date
 from berrizdown.unit.foldermanger import IMGFolderManager
 from berrizdown.unit.handle.handle_log import setup_logging
-from berrizdown.unit.http.request_berriz_api import Playback_info, Public_context
+from berrizdown.unit.http.context_loader import context_loader
 from berrizdown.unit.image.cache_image_info import CachePublicINFO
 from berrizdown.unit.image.class_ImageDownloader import ImageDownloader
 from berrizdown.unit.image.parse_playback_contexts import IMG_PlaybackContext
@@ -38,20 +38,6 @@ class IMGmediaDownloader:
     def __init__(self, community_id: int, communityname: str) -> None:
         self.input_community_id: int = community_id
         self.input_communityname: str = communityname
-        self._playback_info = None
-        self._public_context = None
-
-    @cached_property
-    def Playback_info(self) -> Playback_info:
-        if self._playback_info is None:
-            self._playback_info = Playback_info()
-        return self._playback_info
-
-    @cached_property
-    def Public_context(self) -> Public_context:
-        if self._public_context is None:
-            self._public_context = Public_context()
-        return self._public_context
 
     async def process_single_media(self, public_ctx: IMG_PublicContext, playback_ctx: IMG_PlaybackContext) -> list[Path] | None:
         async with IMGmediaDownloader.semaphore:
@@ -78,8 +64,8 @@ class IMGmediaDownloader:
 
     async def get_content(self, media_id: str) -> tuple[IMG_PublicContext, IMG_PlaybackContext]:
         pub, play = await asyncio.gather(
-            self.Public_context.get_public_context(media_id, use_proxy),
-            self.Playback_info.get_playback_context(media_id, use_proxy),
+            context_loader.public(media_id, use_proxy),
+            context_loader.playback(media_id, use_proxy),
             return_exceptions=True,
         )
         if isinstance(pub, BaseException) or isinstance(play, BaseException):
@@ -90,11 +76,20 @@ class IMGmediaDownloader:
         public_ctx, playback_ctx = await self.get_content(media_id)
         return await self.process_single_media(public_ctx, playback_ctx)
 
-    async def run_image_dl(self, media_ids: list[str]) -> None:
+    async def run_image_dl(self, media_ids: list[str]) -> list[str]:
+        """回傳所有圖片都已寫入的 media id"""
         if paramstore.get("nodl") is True:
             logger.info(f"{Color.fg('light_gray')}Skip downloading{Color.reset()} {Color.fg('light_gray')}IMAGE")
+        media_ids = list(dict.fromkeys(media_ids))
         download_tasks = [asyncio.create_task(self.fetch_and_process(mid), name=mid) for mid in media_ids]
-        await asyncio.gather(*download_tasks)
+        results = await asyncio.gather(*download_tasks, return_exceptions=True)
+        saved: list[str] = []
+        for media_id, result in zip(media_ids, results):
+            if isinstance(result, BaseException):
+                logger.error(f"Image {media_id} failed: {result}")
+            elif result is not None:
+                saved.append(media_id)
+        return saved
 
 
 class ImageUrlParser:
@@ -131,16 +126,10 @@ class ImageUrlParser:
     def printer_image_info(self) -> None:
         logger.info(f"{Color.fg('magenta')}{self.CachePublicINFO.title} {Color.fg('cyan')}{self.community_name} {Color.fg('gray')}{self.CachePublicINFO.media_id}{Color.reset()}")
 
-    async def image_task(
-        self, folder_path: Path | None, image_meta: dict
-    ) -> tuple[
-        list[Task[None]],
-        list[tuple[Path, bytes]],
-    ]:
+    async def image_task(self, folder_path: Path | None, image_meta: dict) -> list[Path]:
         """
-        回傳 (write_tasks, success_pairs)
-        - write_tasks: list of asyncio.Task that write bytes to disk (each returns None)
-        - success_pairs: list of (Path, bytes) 已成功下載的資料
+        每張圖片串流寫入暫存檔 完成即改名 不等待其他圖片 也不在記憶體保留整個檔案
+        回傳成功寫入的檔案路徑
         """
         if folder_path is None:
             raise ValueError("folder_path is None")
@@ -149,13 +138,13 @@ class ImageUrlParser:
 
         semaphore = asyncio.Semaphore(2)
 
-        async def limited_download(url: str | None, path: Path) -> tuple[Path, bytes | None]:
+        async def limited_download(url: str | None, path: Path) -> Path | None:
             if not url:
-                return path, None
+                return None
             async with semaphore:
                 return await self._download(url, path)
 
-        download_tasks: list[asyncio.Task[tuple[Path, bytes | None]]] = []
+        download_tasks: list[asyncio.Task[Path | None]] = []
         for image in self.IMG_PlaybackContext.images:
             url: str | None = image.get("imageUrl")
             image_name: str = self.image_name(url, image_meta)
@@ -163,35 +152,31 @@ class ImageUrlParser:
             task = asyncio.create_task(limited_download(url, image_file_path))
             download_tasks.append(task)
 
-        success_pairs: list[tuple[Path, bytes]] = []
-        errors: list[BaseException] = []
+        saved: list[Path] = []
         for done_future in asyncio.as_completed(download_tasks):
             try:
-                path, content = await done_future
-                if content is not None:
-                    success_pairs.append((path, content))
+                path: Path | None = await done_future
+                if path is not None:
+                    saved.append(path)
             except Exception as exc:
-                errors.append(exc)
                 logger.exception("image download failed", exc_info=exc)
-
-        write_tasks: list[asyncio.Task[None]] = [asyncio.create_task(self.ImageDownloader._write_to_file(resp, path)) for path, resp in success_pairs]
-        return write_tasks, success_pairs
+        return saved
 
     async def json_task(self, json_path: Path) -> list[asyncio.Task[None]]:
         json_task = [asyncio.create_task(save_json_data(json_path, self.custom_community_name, self.community_name)._write_file(json_path, self.IMG_Publicinfo.to_json()))]
         return json_task
 
     async def parse_and_download(self, folder_path: Path | None, jsonfile_path: Path, image_meta: dict) -> list[Path] | None:
+        """回傳寫入的圖片 沒有下載或有圖片失敗時回傳 None"""
         if paramstore.get("nodl") is True:
             self.printer_image_info()
             return None
 
-        success_pairs: list[tuple[Path, bytes]] = []
-        write_tasks: list[Task[None]] = []
+        image_task: Task[list[Path]] | None = None
         json_task: list[Task[t.Any]] = []
 
         if paramstore.get("noimages") is not True and paramstore.get("nodl") is not True:
-            write_tasks, success_pairs = await self.image_task(folder_path, image_meta)
+            image_task = asyncio.create_task(self.image_task(folder_path, image_meta))
 
         if paramstore.get("nojson") is not True and paramstore.get("nodl") is not True:
             json_path: Path = await resolve_conflict_path(jsonfile_path)
@@ -203,19 +188,20 @@ class ImageUrlParser:
             )
             json_task = await self.json_task(json_path)
 
-        all_tasks = write_tasks + json_task
-        if all_tasks:
-            await asyncio.gather(*all_tasks)
-        return [p for p, _ in success_pairs]
+        if json_task:
+            await asyncio.gather(*json_task)
+        if image_task is None:
+            return []
+        saved: list[Path] = await image_task
+        expected: int = sum(1 for image in self.IMG_PlaybackContext.images if image.get("imageUrl"))
+        if len(saved) < expected:
+            logger.warning(f"{self.CachePublicINFO.media_id} saved {len(saved)}/{expected} images")
+            return None
+        return saved
 
-    async def _download(
-        self,
-        url: str,
-        file_path: Path,
-    ) -> tuple[Path, bytes | None]:
-        """下載回傳(path, response)不寫檔"""
-        response = await self.ImageDownloader.download_image(url)
-        return file_path, response
+    async def _download(self, url: str, file_path: Path) -> Path | None:
+        """串流下載至 file_path 回傳實際寫入的路徑"""
+        return await self.ImageDownloader.download_to_file(url, file_path)
 
     def image_name(self, image_url: str | None, image_meta: dict):
         if image_url is None:
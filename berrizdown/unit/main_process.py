@@ -1,18 +1,17 @@
 import asyncio
-import os
-import sys
 from collections.abc import Awaitable, Callable
 from dataclasses import dataclass, field
 from functools import lru_cache
 from typing import Any
 
-import aiofiles
-import yaml
-
-from berrizdown.lib.lock_cookie import cookie_session
+from berrizdown.lib.download.scheduler import download_scheduler
+from berrizdown.lib.load_yaml_config import ensure_tools
+from berrizdown.lib.lock_cookie import Lock_Cookie
 from berrizdown.lib.media_queue import MediaQueue
 from berrizdown.lib.path import Path
-from berrizdown.lock.donwnload_lock import UUIDSetStore
+from berrizdown.lib.processbar.processbar import MultiTrackProgressManager
+from berrizdown.lib.settings import get_settings
+from berrizdown.lock.donwnload_lock import UUIDSetStore, uuid_store
 from berrizdown.static.color import Color
 from berrizdown.static.parameter import paramstore
 from berrizdown.static.route import Route
@@ -32,29 +31,13 @@ class DuplicateConfig:
     @classmethod
     @lru_cache(maxsize=1)
     def load(cls, path: str) -> tuple[bool, bool, bool, bool, bool]:
-        return asyncio.run(cls._read_config(path))
+        return cls._read_config(path)
 
     @staticmethod
-    async def _read_config(path: str) -> tuple[bool, bool, bool, bool, bool]:
-        if not os.path.exists(path):
-            logger.error(f"Config not found: {path}")
-            sys.exit(1)
-
-        async with aiofiles.open(path, encoding="utf-8") as f:
-            raw = await f.read()
-
-        try:
-            cfg = yaml.safe_load(raw)
-            overrides = cfg["duplicate"]["overrides"]
-            image_dup = bool(overrides.get("image", False))
-            video_dup = bool(overrides.get("video", False))
-            post_dup = bool(overrides.get("post", False))
-            notice_dup = bool(overrides.get("notice", False))
-            cmt_dup = bool(overrides.get("cmt", False))
-            return image_dup, video_dup, post_dup, notice_dup, cmt_dup
-        except (KeyError, yaml.YAMLError) as e:
-            logger.error(f"Error parsing {path}: {e}")
-            sys.exit(1)
+    def _read_config(path: str) -> tuple[bool, bool, bool, bool, bool]:
+        """直接讀取已載入並驗證過的設定 不再重新解析 YAML"""
+        dup = get_settings().duplicate
+        return dup.image, dup.video, dup.post, dup.notice, dup.cmt
 
     @classmethod
     def get_image_dup(cls) -> bool:
@@ -89,6 +72,9 @@ logger.info(f"Loaded duplicates → {Color.fg('coral')}image: {image_dup}, video
 
 type ProcessorFunc = Callable[[list[Any]], Awaitable[None]]
 
+# 本次執行已排入過的 VOD/LIVE 失敗後不會在同一次執行中再被 unfinished 重試
+_attempted: set[str] = set()
+
 
 @dataclass
 class MediaProcessor:
@@ -98,7 +84,9 @@ class MediaProcessor:
     community_id: int
     community_name: str
 
-    store: UUIDSetStore = field(default_factory=UUIDSetStore)
+    store: UUIDSetStore = field(default_factory=lambda: uuid_store)
+    # 確認寫入檔案 (或已下載過而略過) 的 ID 供 --sync 推進紀錄
+    completed: set[str] = field(init=False, default_factory=set)
     _img_downloader: IMGmediaDownloader = field(init=False)
     _media_processors: dict[str, ProcessorFunc] = field(init=False)
 
@@ -114,6 +102,7 @@ class MediaProcessor:
         }
 
     async def cookie_check(self, media_ids: list[str] | list[tuple[str, str]]) -> bool:
+        cookie_session: dict[str, str] = await Lock_Cookie.session()
         if cookie_session == {} and paramstore.get("no_cookie") is True:
             logger.warning(
                 f"{Color.fg('light_gray')}Cookies is required to download "
@@ -135,9 +124,15 @@ class MediaProcessor:
             f"{Color.fg('spring_green')}{len(media_ids)}{Color.reset()}"
         )
 
-    def add_to_duplicate(self, ids: list[Any]) -> None:
+    def add_to_duplicate(self, ids: list[Any], media_type: str) -> None:
         for media_id in ids:
-            self.store.add(str(media_id))
+            self.store.mark_done(str(media_id), media_type, self.community_id)
+
+    def _record_saved(self, saved: list[Any], media_type: str, dup: bool) -> None:
+        """只有 runner 回報已寫入檔案的 ID 才算完成 失敗的下次仍會下載"""
+        self.completed.update(map(str, saved))
+        if dup is False:
+            self.add_to_duplicate(saved, media_type)
 
     def check_duplicate(self, media_type: str) -> bool:
         """Return True if duplicate-check is active for this media_type."""
@@ -156,61 +151,92 @@ class MediaProcessor:
         match paramstore.get("key"):
             case True:
                 self.print_process_items(media_idntype, media_idntype[0][1])
-                tasks = [
-                    asyncio.create_task(
-                        BerrizProcessor(
+                # key 模式只打 API 同時處理的數量不超過 API 單一 host 連線上限
+                semaphore: asyncio.Semaphore = asyncio.Semaphore(get_settings().api.connector_limit_per_host)
+
+                async def _run(media_id: str, media_type: str) -> None:
+                    async with semaphore:
+                        await BerrizProcessor(
                             media_id, media_type, self.selected_media, self.community_name
                         ).run()
-                    )
+
+                tasks = [
+                    asyncio.create_task(_run(media_id, media_type))
                     for media_id, media_type in media_idntype
                 ]
                 await asyncio.gather(*tasks)
             case None:
                 self.print_process_items(media_idntype, "Media")
-                media_id_list: list[str] = []
-                for media_id, media_type in media_idntype:
-                    media_id_list.append(media_id)
-                    if await self._check_download_pkl(media_id) and video_dup is False:
-                        await self._handle_choice(media_id)
-                        continue
-                    if await self.cookie_check(media_idntype):
-                        await BerrizProcessor(
-                            media_id, media_type, self.selected_media, self.community_name
-                        ).run()
-                if video_dup is False:
-                    self.add_to_duplicate(media_id_list)
+                if not await self.cookie_check(media_idntype):
+                    return
+                # 第一次下載影片時才檢查 mux 解密工具 圖片 貼文等流程不需要
+                await asyncio.to_thread(ensure_tools)
+                # 多部影片同時處理 API session 與分段下載排程器為全域共用 名額由 scheduler 分配
+                workers: int = paramstore.get("parallel_titles") or 1
+                semaphore: asyncio.Semaphore = asyncio.Semaphore(workers)
+
+                async def _run_title(media_id: str, media_type: str) -> None:
+                    async with semaphore:
+                        if await self._check_download_pkl(media_id) and video_dup is False:
+                            await self._handle_choice(media_id)
+                        else:
+                            # 完成紀錄由下載流程在混流與重新命名成功後寫入 沒有完成的留在 started 供重試
+                            self.store.mark_started(str(media_id), media_type, self.community_id)
+                            await BerrizProcessor(
+                                media_id, media_type, self.selected_media, self.community_name
+                            ).run()
+                        # run() 失敗時也只會回傳 None 以混流後寫入的完成紀錄為準
+                        if self.store.exists(str(media_id)):
+                            self.completed.add(str(media_id))
+
+                title_tasks: list[asyncio.Task] = [
+                    asyncio.create_task(_run_title(media_id, media_type))
+                    for media_id, media_type in media_idntype
+                ]
+                try:
+                    await asyncio.gather(*title_tasks)
+                except BaseException:
+                    # 與逐部處理時相同 任一部失敗就停止其餘影片
+                    for task in title_tasks:
+                        task.cancel()
+                    raise
 
     async def _process_photo_items(self, media_ids: list[str]) -> None:
         self.print_process_items(media_ids, "Photo")
-        await self._img_downloader.run_image_dl(media_ids)
-        if image_dup is False:
-            self.add_to_duplicate(media_ids)
+        saved: list[Any] = await self._img_downloader.run_image_dl(media_ids)
+        self._record_saved(saved, "PHOTO", image_dup)
 
     async def _process_post_items(self, post_ids: list[str]) -> None:
         self.print_process_items(post_ids, "Post")
-        await Run_Post_dl(self.selected_media["post"], self.community_name).run_post_dl()
-        if post_dup is False:
-            self.add_to_duplicate(post_ids)
+        saved: list[Any] = await Run_Post_dl(self.selected_media["post"], self.community_name).run_post_dl()
+        self._record_saved(saved, "POST", post_dup)
 
     async def _process_notice_items(self, notice_ids: list[str]) -> None:
         self.print_process_items(notice_ids, "Notice")
-        await RunNotice(self.selected_media["notice"], self.community_name).run_notice_dl()
-        if notice_dup is False:
-            self.add_to_duplicate(notice_ids)
+        saved: list[Any] = await RunNotice(self.selected_media["notice"], self.community_name).run_notice_dl()
+        self._record_saved(saved, "NOTICE", notice_dup)
 
     async def _process_cmt_items(self, cmt_ids: list[str]) -> None:
         self.print_process_items(cmt_ids, "CMT")
-        await RUN_CMT(self.selected_media["cmt"], self.community_name).run_cmt_dl()
-        if cmt_dup is False:
-            self.add_to_duplicate(cmt_ids)
+        saved: list[Any] = await RUN_CMT(self.selected_media["cmt"], self.community_name).run_cmt_dl()
+        self._record_saved(saved, "CMT", cmt_dup)
+
+    @staticmethod
+    def _dup_active() -> bool:
+        return any(dup is False for dup in (image_dup, video_dup, post_dup, notice_dup, cmt_dup))
 
     async def _check_download_pkl(self, media_id: str | int) -> str | None:
         """Return media_id string if it already exists in the store, else None."""
         media_id_str = str(media_id)
-        active: bool = any(
-            dup is False for dup in (image_dup, video_dup, post_dup, notice_dup, cmt_dup)
+        return media_id_str if self._dup_active() and self.store.exists(media_id_str) else None
+
+    def _existing_ids(self, items: list[tuple[Any, str]]) -> set[str]:
+        """Return the ids of queued items that are duplicate-checked and already in the store."""
+        if not self._dup_active():
+            return set()
+        return self.store.exists_many(
+            str(media_id) for media_id, media_type in items if self.check_duplicate(media_type)
         )
-        return media_id_str if active and self.store.exists(media_id_str) else None
 
     async def _handle_choice(self, skip_media_id: str) -> None:
         """Log and notify that a duplicate item is being skipped."""
@@ -234,31 +260,62 @@ class MediaProcessor:
                 media_type_label: str = (
                     item.get("mediaType") or item.get("contentType") or "Unknown Type"
                 )
-                logger.info(
-                    f"{Color.bg('crimson')}Already exists{Color.reset()}"
-                    f"{Color.fg('light_gray')}, skip download {Color.reset()}"
-                    f"{Color.fg('tomato')}{media_type_label} - "
-                    f"{Color.fg('amber')}{title}{Color.reset()}"
-                )
-                print(
-                    f"{Color.bg('spring_aqua')}Disable this function by changing setting ⤵"
-                    f"{Color.reset()}\n"
-                    f"{Color.fg('yellow_ochre')}{Route().YAML_path} "
-                    f"in {Color.fg('forest_green')}[duplicate:overrides]{Color.reset()}"
-                )
+                # 其他影片的選單開啟中時 等選單結束再輸出 避免蓋掉畫面
+                async with MultiTrackProgressManager().prompt():
+                    logger.info(
+                        f"{Color.bg('crimson')}Already exists{Color.reset()}"
+                        f"{Color.fg('light_gray')}, skip download {Color.reset()}"
+                        f"{Color.fg('tomato')}{media_type_label} - "
+                        f"{Color.fg('amber')}{title}{Color.reset()}"
+                    )
+                    print(
+                        f"{Color.bg('spring_aqua')}Disable this function by changing setting ⤵"
+                        f"{Color.reset()}\n"
+                        f"{Color.fg('yellow_ochre')}{Route().YAML_path} "
+                        f"in {Color.fg('forest_green')}[duplicate:overrides]{Color.reset()}"
+                    )
+
+    async def _unfinished_items(self, items: list[tuple[Any, str]]) -> list[tuple[str, str]]:
+        """處理影片時 一併重試同社群上次開始但沒有完成的 VOD/LIVE"""
+        videos: set[str] = {str(media_id) for media_id, media_type in items if media_type in ("VOD", "LIVE")}
+        if not videos or paramstore.get("key") is not None:
+            return []
+        _attempted.update(videos)
+        entries = await asyncio.to_thread(self.store.unfinished, self.community_id)
+        retry: list[tuple[str, str]] = [
+            (entry.media_id, entry.media_type)
+            for entry in entries
+            if entry.media_type in ("VOD", "LIVE") and entry.media_id not in _attempted
+        ]
+        if retry:
+            _attempted.update(media_id for media_id, _ in retry)
+            logger.info(
+                f"{Color.fg('light_gray')}Retry unfinished downloads:{Color.reset()} "
+                f"{Color.fg('periwinkle')}{[media_id for media_id, _ in retry]}{Color.reset()}"
+            )
+        return retry
 
-    async def process_media_queue(self, media_queue: MediaQueue) -> None:
-        """Drain the queue, bucket items by type, then dispatch all concurrently."""
+    async def process_media_queue(self, media_queue: MediaQueue) -> bool:
+        """Drain the queue, bucket items by type, then dispatch all concurrently.
+
+        Returns False when processing was cancelled; finished ids are collected in ``completed``.
+        """
         live_ids: list[tuple[str, str]] = []
         photo_ids: list[str] = []
         post_ids: list[str] = []
         notice_ids: list[str] = []
         cmt_ids: list[str] = []
 
+        items: list[tuple[Any, str]] = []
         while not media_queue.is_empty():
-            media_id, media_type = media_queue.dequeue()
-            if self.check_duplicate(media_type) and await self._check_download_pkl(media_id):
+            items.append(media_queue.dequeue())
+        items.extend(await self._unfinished_items(items))
+        existing: set[str] = self._existing_ids(items)
+
+        for media_id, media_type in items:
+            if str(media_id) in existing:
                 await self._handle_choice(str(media_id))
+                self.completed.add(str(media_id))
                 continue
             match media_type:
                 case "PHOTO":
@@ -290,6 +347,10 @@ class MediaProcessor:
                 await asyncio.gather(*tasks)
             except asyncio.CancelledError:
                 logger.warning(f"{Color.fg('yellow')}Media processing cancelled{Color.reset()}")
+                return False
+            finally:
+                await download_scheduler.close()
+        return True
 
     def check_duplicate(self, media_type: str) -> bool:
         if image_dup is False and media_type == "PHOTO":
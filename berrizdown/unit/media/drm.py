@@ -3,17 +3,20 @@ from functools import cached_property
 from typing import Any
 
 from aiohttp import ClientResponse
+from lxml import etree
 
 from berrizdown.lib.__init__ import use_proxy
 from berrizdown.lib.download.download import Start_Download_Queue
 from berrizdown.lib.mux.parse_m3u8 import rebuild_master_playlist
+from berrizdown.lib.mux.parse_mpd import MPDContent, MPDParser
 from berrizdown.static.api_error_handle import api_error_handle
 from berrizdown.static.color import Color
 from berrizdown.static.parameter import paramstore
 from berrizdown.static.PlaybackInfo import LivePlaybackInfo, PlaybackInfo
 from berrizdown.static.PublicInfo import PublicInfo
 from berrizdown.unit.handle.handle_log import setup_logging
-from berrizdown.unit.http.request_berriz_api import Live, Playback_info, Public_context
+from berrizdown.unit.http.context_loader import context_loader
+from berrizdown.unit.http.request_berriz_api import Live
 from berrizdown.unit.media.console_print import print_title
 from berrizdown.unit.media.drm_typing_dict import LivePlaybackResponse, PlaybackResponse, PublicResponse, SelectedMedia
 from berrizdown.unit.media.keyhandle import Key_handle
@@ -28,6 +31,7 @@ async def start_download(
     raw_mpd: Any,
     raw_hls: str,
     input_community_name: str,
+    mpd_content: MPDContent | None = None,
 ) -> None:
     if playback_info.code != "0000":
         logger.info("Skip download video")
@@ -42,6 +46,7 @@ async def start_download(
                 raw_mpd,
                 raw_hls,
                 input_community_name,
+                mpd_content,
             ).run_dl()
 
 
@@ -62,21 +67,13 @@ class BerrizProcessor:
     def Live(self) -> Live:
         return Live()
 
-    @cached_property
-    def Playback_info(self) -> Playback_info:
-        return Playback_info()
-
-    @cached_property
-    def Public_context(self) -> Public_context:
-        return Public_context()
-
     async def _fetch_vod_contexts(
         self,
     ) -> tuple[list[PlaybackResponse] | None, list[PublicResponse] | None]:
         """Fetch playback and public contexts for VOD media."""
         playback, public = await asyncio.gather(
-            self.Playback_info.get_playback_context(self.media_id, use_proxy),
-            self.Public_context.get_public_context(self.media_id, use_proxy),
+            context_loader.playback(self.media_id, use_proxy),
+            context_loader.public(self.media_id, use_proxy),
         )
         if playback and playback[0].get("code") == "0000":
             return playback, public
@@ -86,8 +83,10 @@ class BerrizProcessor:
         self,
     ) -> tuple[list[LivePlaybackResponse] | None, list[PublicResponse] | None]:
         """Fetch playback and public contexts for LIVE media."""
-        playback = await self.Playback_info.get_live_playback_info(self.media_id, use_proxy)
-        public = await self.Public_context.get_public_context(self.media_id, use_proxy)
+        playback, public = await asyncio.gather(
+            context_loader.live_playback(self.media_id, use_proxy),
+            context_loader.public(self.media_id, use_proxy),
+        )
 
         if playback and playback[0].get("code") == "0000":
             return playback, public
@@ -151,7 +150,7 @@ class BerrizProcessor:
         logger.debug(playback_info.to_dict())
         logger.debug(public_info.to_dict())
 
-        key, raw_hls, raw_mpd = await self.drm_handle(playback_info, public_info)
+        key, raw_hls, raw_mpd, mpd_content = await self.drm_handle(playback_info, public_info)
 
         if not any(not v for v in (raw_hls, raw_mpd)):
             await start_download(
@@ -161,6 +160,7 @@ class BerrizProcessor:
                 raw_mpd,
                 raw_hls,
                 self.input_community_name,
+                mpd_content,
             )
         else:
             missing = {
@@ -171,10 +171,12 @@ class BerrizProcessor:
                 if not value:
                     logger.warning(f"Missing or invalid: {name} = {repr(value)}")
 
-    async def drm_handle(self, playback_info: PlaybackInfo | LivePlaybackInfo, public_info: PublicInfo) -> tuple[list[str] | None, str | None, ClientResponse | None]:
+    async def drm_handle(
+        self, playback_info: PlaybackInfo | LivePlaybackInfo, public_info: PublicInfo
+    ) -> tuple[list[str] | None, str | None, ClientResponse | None, MPDContent | None]:
         if playback_info.code != "0000":
             logger.warning(f"{Color.bg('maroon')}{api_error_handle(playback_info.code)}{Color.reset()}")
-            return None, None, None
+            return None, None, None, None
 
         raw_mpd: ClientResponse | None = None
         raw_hls: str | None = None
@@ -186,10 +188,12 @@ class BerrizProcessor:
             response_hls: ClientResponse = await self.Live.fetch_mpd(playback_info.hls_playback_url, use_proxy)
             raw_hls: str = await rebuild_master_playlist(response_hls, playback_info.hls_playback_url)
 
+        # MPD 只解析一次 DRM 與下載共用同一份結果
+        mpd_content: MPDContent | None = await self.parse_mpd(raw_mpd, playback_info.dash_playback_url)
         key: list[str] | None = None
 
         if getattr(playback_info, "is_drm", None) is True:
-            key_handler: Key_handle = Key_handle(playback_info, self.media_id, raw_mpd)
+            key_handler: Key_handle = Key_handle(playback_info, self.media_id, mpd_content)
             pk: tuple[list[str] | None, str] = await key_handler.send_drm()
             if pk:
                 key, media_id_from_drm = pk
@@ -200,7 +204,16 @@ class BerrizProcessor:
             logger.error(f"Invalid DRM status for media ID: {self.media_id}")
             raise Exception(f"Check {getattr(playback_info, 'dash_playback_url', None)} PSSH or DRM info!")
 
-        return key, raw_hls, raw_mpd
+        return key, raw_hls, raw_mpd, mpd_content
+
+    async def parse_mpd(self, raw_mpd: str | None, dash_playback_url: str | None) -> MPDContent | None:
+        if not raw_mpd or not dash_playback_url:
+            return None
+        try:
+            return await MPDParser(raw_mpd, dash_playback_url).parse_all_tracks()
+        except (etree.XMLSyntaxError, ValueError, TypeError) as e:
+            logger.error(f"Failed to parse MPD {dash_playback_url}: {e}")
+            return None
 
     async def run(self) -> None:
         """Main entry point to run the processor"""
@@ -7,6 +7,7 @@ from berrizdown.key.local_vault import SQLiteKeyVault
 from berrizdown.key.msprpro import GetMPD_prd
 from berrizdown.key.pssh import GetMPD_wv
 from berrizdown.lib.load_yaml_config import CFG, ConfigLoader
+from berrizdown.lib.mux.parse_mpd import MPDContent
 from berrizdown.static.color import Color
 from berrizdown.static.parameter import paramstore
 from berrizdown.static.PlaybackInfo import PlaybackInfo
@@ -16,14 +17,14 @@ logger = setup_logging("keyhandle", "amber")
 
 
 class Key_handle:
-    def __init__(self, playback_info: PlaybackInfo, media_id: str, raw_mpd: Any):
+    def __init__(self, playback_info: PlaybackInfo, media_id: str, mpd_content: MPDContent | None):
         self._mspr_pro: list[str] | None = None
         self._wv_pssh: list[str] | None = None
         self.playback_info: PlaybackInfo = playback_info
         self.assertion: str | None = playback_info.assertion
         self.dash_playback_url: str | None = playback_info.dash_playback_url
         self.media_id: str = media_id
-        self.raw_mpd: Any = raw_mpd
+        self.mpd_content: MPDContent | None = mpd_content
 
     @cached_property
     def drm_type(self) -> str:
@@ -35,16 +36,16 @@ class Key_handle:
 
     @property
     def mspr_pro(self) -> list[str] | None:
-        if self._mspr_pro is None and self.raw_mpd:
-            parsed = GetMPD_prd.parse_pssh(self.raw_mpd)
-            self._mspr_pro = list(set(parsed))
+        if self._mspr_pro is None and self.mpd_content:
+            parsed = GetMPD_prd.filter_pssh(self.mpd_content.mspr_pro)
+            self._mspr_pro = list(dict.fromkeys(parsed or []))
         return self._mspr_pro
 
     @property
     def wv_pssh(self) -> list[str] | None:
-        if self._wv_pssh is None and self.raw_mpd:
-            parsed = GetMPD_wv.parse_pssh(self.raw_mpd)
-            self._wv_pssh = list(set(parsed))
+        if self._wv_pssh is None and self.mpd_content:
+            parsed = GetMPD_wv.filter_pssh(self.mpd_content.cenc_pssh)
+            self._wv_pssh = list(dict.fromkeys(parsed or []))
         return self._wv_pssh
 
     async def send_drm(self) -> tuple[list[str], str] | None:
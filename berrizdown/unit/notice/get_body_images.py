@@ -127,29 +127,20 @@ class DownloadImage(Get_image_from_body):
         return get_formatted_publish_date(self.reservedAt, fmt_files)
 
     async def start_download_images(self) -> list[Path]:
-        """Download all images concurrently, write to disk, and return list of file paths."""
+        """Download all images concurrently, streaming each one to disk as it arrives, and return list of file paths."""
         if not self.all_image_urls:
             return []
-        # Download all images concurrently get bytes
-        download_tasks: list[asyncio.Task] = [asyncio.create_task(self.ImageDownloader.download_image(url=url)) for url in self.all_image_urls]
-        download_results = await asyncio.gather(*download_tasks, return_exceptions=True)
-        # Write downloaded bytes to files concurrently
-        write_tasks: list[asyncio.Task] = []
-        file_paths: list[Path] = []
-
-        for idx, result in enumerate(download_results):
-            if isinstance(result, bytes):
-                file_path = self._generate_filepath(self.all_image_urls[idx])
-                file_paths.append(file_path)
-                write_tasks.append(asyncio.create_task(self.ImageDownloader._write_to_file(result, file_path)))
-            elif isinstance(result, Exception):
-                logger.error(f"Failed to download {self.all_image_urls[idx]}: {result}")
-
-        # Wait for all write operations to complete
-        write_results = await asyncio.gather(*write_tasks, return_exceptions=True)
-
-        # Filter successful writes
-        successful_paths: list[Path] = [file_paths[idx] for idx, result in enumerate(write_results) if not isinstance(result, Exception)]
+        download_tasks: list[asyncio.Task] = [
+            asyncio.create_task(self.ImageDownloader.download_to_file(url, self._generate_filepath(url))) for url in self.all_image_urls
+        ]
+        results = await asyncio.gather(*download_tasks, return_exceptions=True)
+
+        successful_paths: list[Path] = []
+        for url, result in zip(self.all_image_urls, results):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to download {url}: {result}")
+            elif result is not None:
+                successful_paths.append(result)
         return successful_paths
 
     def _generate_filepath(self, url: str) -> Path:
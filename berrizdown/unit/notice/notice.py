@@ -95,14 +95,15 @@ class MainProcessor:
     def save_json_data(self):
         return save_json_data(self.folder_path, self.custom_community_name, self.community_name)
 
-    async def parse_and_download(self) -> None:
-        """Parse data image URLs and download them with concurrency control."""
+    async def parse_and_download(self) -> bool:
+        """Parse data image URLs and download them with concurrency control. Returns True when every image was saved."""
         tasks = (
             asyncio.create_task(self.process_html()),
             asyncio.create_task(self.process_image()),
             asyncio.create_task(self.save_notice_json()),
         )
-        await asyncio.gather(*tasks)
+        _, images_saved, _ = await asyncio.gather(*tasks)
+        return images_saved
 
     async def process_html(self) -> None:
         MainProcessor.completed += 1
@@ -139,11 +140,12 @@ class MainProcessor:
                 )
                 await self.save_json_data._write_file(json_file_path, json_data)
 
-    async def process_image(self) -> None:
+    async def process_image(self) -> bool:
         if paramstore.get("nodl") is True:
             logger.info(f"{Color.fg('light_gray')}Skip downloading{Color.reset()} {Color.fg('light_gray')}NOTICE IMAGE")
-        else:
-            await self.DownloadImage.start_download_images()
+            return False
+        saved: list[Path] = await self.DownloadImage.start_download_images()
+        return len(saved) == len(self.DownloadImage.all_image_urls)
 
 
 class RunNotice:
@@ -156,8 +158,8 @@ class RunNotice:
     def folder_manager(self) -> NOTICEFolderManager:
         return NOTICEFolderManager(self.input_community_name)
 
-    async def run_notice_dl(self) -> None:
-        """Top Async ENTER"""
+    async def run_notice_dl(self) -> list[Any]:
+        """Top Async ENTER, returns the ids of notices saved completely"""
         semaphore = asyncio.Semaphore(7)
         all_folders: list[Path] = []
         if paramstore.get("nodl") is True:
@@ -177,7 +179,7 @@ class RunNotice:
                                 return "NODL"
                             self.folder_name.add(notice_media["safe_title"])
                             all_folders.append(folder)
-                            await MainProcessor(
+                            saved: bool = await MainProcessor(
                                 notice_media,
                                 folder,
                                 len(self.selected_media),
@@ -185,13 +187,20 @@ class RunNotice:
                                 community_name,
                                 self.input_community_name,
                             ).parse_and_download()
-                            return "OK"
+                            return "OK" if saved else "PARTIAL"
                 except asyncio.CancelledError:
                     await self.handle_cancel()
                     raise asyncio.CancelledError
 
         tasks = [asyncio.create_task(process(index)) for index in self.selected_media]
-        await asyncio.gather(*tasks)
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        saved: list[Any] = []
+        for index, result in zip(self.selected_media, results):
+            if isinstance(result, BaseException):
+                logger.error(f"Notice {index.get('mediaId')} failed: {result}")
+            elif result == "OK":
+                saved.append(index["mediaId"])
+        return saved
 
     async def notice_media(self, index: dict[str, Any]) -> dict[str, Any]:
         data = await self.get_notice_info(index, index["mediaId"], index["communityId"])
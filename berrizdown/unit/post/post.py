@@ -102,12 +102,8 @@ class MainProcessor:
             List_images.append(img_url)
         return List_images
 
-    async def request_image(self, image_url: str) -> bytes | None:
-        response = await self.imagedownloader.download_image(image_url)
-        return response
-
-    async def write_image_to_file(self, response: bytes, img_file_path: Path) -> None:
-        await self.imagedownloader._write_to_file(response, img_file_path)
+    async def download_image(self, image_url: str, img_file_path: Path) -> Path | None:
+        return await self.imagedownloader.download_to_file(image_url, img_file_path)
 
     async def process_image(self, list_images: list[str]) -> tuple[list[str], list[Path]]:
         return await self.get_img_url_path(list_images)
@@ -203,28 +199,14 @@ class Run_Post_dl:
             logger.exception(f"Error in img_stage1: {e}")
             return None
 
-    async def img_stage2_request(self, MP: MainProcessor, image_url: str) -> bytes | None:
+    async def img_stage2_download(self, MP: MainProcessor, image_url: str, img_file_path: Path) -> Path | None:
+        """串流下載並寫入 不在記憶體保留整張圖片"""
         try:
-            response_bytes = await MP.request_image(image_url)
-            return response_bytes
+            return await MP.download_image(image_url, img_file_path)
         except Exception as e:
             logger.exception(f"Error in stage 2: {e}")
             return None
 
-    async def img_stage3_write(
-        self,
-        MP: MainProcessor,
-        response_bytes: bytes,
-        img_file_path: Path,
-        folder: Path,
-    ) -> Path | str:
-        try:
-            await MP.write_image_to_file(response_bytes, img_file_path)
-            return folder
-        except Exception as e:
-            logger.exception(f"Error in stage 3: {e}")
-            return "Failed"
-
     async def handle_cancel(self, folder: Path | None) -> None:
         try:
             if folder and Path.exists(folder):
@@ -244,22 +226,26 @@ class Run_Post_dl:
                 none_image_data.append(item)
         return image_data, none_image_data
 
-    async def process_item(self, item: dict[str, Any], has_images: bool) -> None:
+    async def process_item(self, item: dict[str, Any], has_images: bool) -> bool:
+        """JSON 與所有圖片都寫入才回傳 True"""
         # Stage 0 Initialize processor and folder
         stage0_result = await self._stage0_init(item)
         if not stage0_result:
-            return
+            return False
         MP, folder = stage0_result
-        await self._save_json(MP, folder)
+        json_path: Path | None = await self._save_json(MP, folder)
         await self._process_html(MP, folder)
+        saved: bool = json_path is not None or paramstore.get("nojson") is True
         # If image processing is required and noimages/nodl is not set proceed with image flow
         if has_images and not paramstore.get("noimages") and not paramstore.get("nodl"):
-            await self._process_images(item, MP, folder)
+            saved = await self._process_images(item, MP, folder) and saved
+        return saved
 
-    async def run_post_dl(self) -> None:
+    async def run_post_dl(self) -> list[str]:
+        """回傳完整寫入的 postId"""
         if paramstore.get("nodl") is True:
             logger.info(f"{Color.fg('light_gray')}Skip downloading{Color.reset()} {Color.fg('light_gray')}POST")
-            return
+            return []
 
         # Separate data into two categories with images and without images
         image_data, none_image_data = self.filter_post_data()
@@ -271,27 +257,34 @@ class Run_Post_dl:
         # Items without images
         for item in none_image_data:
             tasks.append(self.process_item(item, has_images=False))
-        await asyncio.gather(*tasks, return_exceptions=True)
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        saved: list[str] = []
+        for item, result in zip(image_data + none_image_data, results):
+            if isinstance(result, BaseException):
+                logger.error(f"Post {item.get('postId')} failed: {result}")
+            elif result is True:
+                saved.append(item["postId"])
+        return saved
 
     async def _stage0_init(self, item: dict[str, Any]) -> tuple[Any, Path] | None:
         # Stage 0 Create folder and initialize MainProcessor
         return await self.img_stage0_process(item)
 
-    async def _process_images(self, item: dict[str, Any], MP: Any, folder: Path) -> None:
+    async def _process_images(self, item: dict[str, Any], MP: Any, folder: Path) -> bool:
         stage1_result = await self.img_stage1_process(item, MP, folder, self.handle_cancel)
         if not stage1_result:
-            return
+            return False
         MP, image_url_list, img_file_path_list, folder = stage1_result
         """image_url_list [[mediaid], [image_url], [1920,1080]]"""
+        saved: bool = True
         for url, img_path in zip(image_url_list[1], img_file_path_list):
-            # Stage 2 Send request to get image bytes
-            response_bytes = await self.img_stage2_request(MP, url)
-            if response_bytes:
-                # Stage 3 Write image file immediately
-                await self.img_stage3_write(MP, response_bytes, img_path, folder)
+            # Stage 2 Stream image body straight to file
+            if await self.img_stage2_download(MP, url, img_path) is None:
+                saved = False
+        return saved
 
     async def _process_html(self, MP: Any, folder: Path) -> None:
         await MP.process_html(folder)
 
-    async def _save_json(self, MP: Any, folder: Path) -> None:
-        await MP.save_json_file(folder)
+    async def _save_json(self, MP: Any, folder: Path) -> Path | None:
+        return await MP.save_json_file(folder)
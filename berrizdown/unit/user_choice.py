@@ -172,6 +172,10 @@ class InquirerPySelector:
             logger.info("No items found")
             return None
 
+        if paramstore.get("sync") is True:
+            # 同步模式只會列出上次之後的新內容 全部下載不詢問
+            return await self._collect(set(display_map), display_map)
+
         # Create quick command choices (only range option now)
         quick_commands: list[Choice] = [
             Choice("range", name="[Custom — manual select]"),
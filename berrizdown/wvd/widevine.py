@@ -1,10 +1,10 @@
-import aiohttp
 from functools import cached_property, lru_cache
 
 from berrizdown.wvd.pywidevine.cdm import Cdm
 from berrizdown.wvd.pywidevine.device import Device
 from berrizdown.wvd.pywidevine.pssh import PSSH
 from berrizdown.unit.handle.handle_log import setup_logging
+from berrizdown.unit.http.transport import DRM, transport
 
 logger = setup_logging("widevine", "navy")
 
@@ -45,21 +45,17 @@ class WidevineDRM:
             challenge: bytes = self.cdm.get_license_challenge(self.session_id, req_pssh)
             headers: dict[str, str] = self.build_wv_headers(acquirelicenseassertion)
 
-            async with aiohttp.ClientSession(
-                timeout=aiohttp.ClientTimeout(total=13.0),
-                connector=aiohttp.TCPConnector(ssl=True)
-                ) as client:
-                async with client.post(
-                    url="https://berriz.drmkeyserver.com/widevine_license",
-                    headers=headers,
-                    data=challenge,
-                ) as response:
-                    if response.status not in range(200, 299):
-                            logger.error(f"Invalid response status code: {response.status} {await response.read()}")
-                    else:
-                        license_content: bytes = await response.read()
-                        self.cdm.parse_license(self.session_id, license_content)
-                        return self.parse_response_key()
+            async with transport.session(DRM).post(
+                url="https://berriz.drmkeyserver.com/widevine_license",
+                headers=headers,
+                data=challenge,
+            ) as response:
+                if response.status not in range(200, 299):
+                        logger.error(f"Invalid response status code: {response.status} {await response.read()}")
+                else:
+                    license_content: bytes = await response.read()
+                    self.cdm.parse_license(self.session_id, license_content)
+                    return self.parse_response_key()
         except Exception as e:
             logger.error(e)
             return None
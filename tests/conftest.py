@@ -0,0 +1,4 @@
+import sys
+
+# click_types 在 import 時解析 sys.argv 不能讓它讀到 pytest 的參數
+sys.argv = [sys.argv[0]]
@@ -0,0 +1,20 @@
+from berrizdown.unit.http.api_cache import ApiCache
+
+URL = "https://svc-api.berriz.in/service/v1/home"
+
+
+def test_key_depends_on_account():
+    alice = ApiCache.account({"bz_a": "a1", "bz_r": "refresh-alice"})
+    bob = ApiCache.account({"bz_a": "a1", "bz_r": "refresh-bob"})
+    assert alice != bob
+    assert ApiCache.key("get", URL, {}, alice) != ApiCache.key("get", URL, {}, bob)
+
+
+def test_key_ignores_access_token_rotation():
+    before = ApiCache.account({"bz_a": "old", "bz_r": "refresh"})
+    after = ApiCache.account({"bz_a": "new", "bz_r": "refresh"})
+    assert ApiCache.key("GET", URL, {"a": 1}, before) == ApiCache.key("get", URL, {"a": "1"}, after)
+
+
+def test_anonymous_account():
+    assert ApiCache.account(None) == ApiCache.account({}) == ""
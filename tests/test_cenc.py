@@ -0,0 +1,135 @@
+import os
+import struct
+
+import pytest
+from Crypto.Cipher import AES
+
+from berrizdown.lib.mux.cenc import CencDecryptor, CencError, iter_boxes
+from berrizdown.lib.path import Path
+
+KID = bytes(range(16))
+KEY = bytes(range(16, 32))
+CONSTANT_IV = bytes(range(32, 48))
+CLEAR = 7
+
+
+def box(box_type: bytes, payload: bytes) -> bytes:
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+
+def full(box_type: bytes, version: int, flags: int, payload: bytes) -> bytes:
+    return box(box_type, struct.pack(">I", (version << 24) | flags) + payload)
+
+
+def make_init(scheme: bytes, trex_size: int | None = None) -> bytes:
+    tkhd = full(b"tkhd", 0, 7, struct.pack(">IIII", 0, 0, 1, 0) + b"\0" * 64)
+    if scheme == b"cbcs":
+        # version 1 crypt:skip = 1:9 固定 IV
+        tenc = full(b"tenc", 1, 0, bytes([0, 0x19, 1, 0]) + KID + bytes([16]) + CONSTANT_IV)
+    else:
+        tenc = full(b"tenc", 0, 0, bytes([0, 0, 1, 8]) + KID)
+    sinf = box(b"sinf", box(b"frma", b"avc1") + full(b"schm", 0, 0, scheme + struct.pack(">I", 0x10000)) + box(b"schi", tenc))
+    encv = box(b"encv", b"\0" * 78 + box(b"avcC", b"\x01abc") + sinf)
+    stbl = box(b"stbl", full(b"stsd", 0, 0, struct.pack(">I", 1) + encv))
+    trak = box(b"trak", tkhd + box(b"mdia", box(b"minf", stbl)))
+    mvex = b""
+    if trex_size is not None:
+        mvex = box(b"mvex", full(b"trex", 0, 0, struct.pack(">IIIII", 1, 1, 0, trex_size, 0)))
+    moov = box(b"moov", full(b"mvhd", 0, 0, b"\0" * 96) + trak + mvex + full(b"pssh", 0, 0, b"x" * 20))
+    return box(b"ftyp", b"isom\0\0\0\0") + moov
+
+
+def encrypt_cbcs(data: bytes) -> bytes:
+    """1:9 pattern CBC 鏈跨越略過的區塊"""
+    starts = list(range(0, len(data) - 15, 160))
+    plain = b"".join(data[i : i + 16] for i in starts)
+    encrypted = AES.new(KEY, AES.MODE_CBC, iv=CONSTANT_IV).encrypt(plain) if plain else b""
+    out = bytearray(data)
+    for n, i in enumerate(starts):
+        out[i : i + 16] = encrypted[n * 16 : n * 16 + 16]
+    return bytes(out)
+
+
+def make_fragment(scheme: bytes, samples: list[bytes], sizes_in_trun: bool = True, aux: str = "senc") -> bytes:
+    """第一個 CLEAR bytes 為明文 其餘加密 aux 為 senc 或 saio (輔助資訊放在 moof 結尾)"""
+    encrypted: list[bytes] = []
+    records: list[bytes] = []
+    for sample in samples:
+        iv = b"" if scheme == b"cbcs" else os.urandom(8)
+        if scheme == b"cbcs":
+            body = encrypt_cbcs(sample[CLEAR:])
+        else:
+            body = AES.new(KEY, AES.MODE_CTR, nonce=b"", initial_value=iv + b"\0" * 8).encrypt(sample[CLEAR:])
+        encrypted.append(sample[:CLEAR] + body)
+        records.append(iv + struct.pack(">HHI", 1, CLEAR, len(sample) - CLEAR))
+
+    tfhd = full(b"tfhd", 0, 0x020000, struct.pack(">I", 1))
+
+    def build(data_offset: int, aux_offset: int) -> bytes:
+        flags = 0x001 | (0x200 if sizes_in_trun else 0)
+        entries = b"".join(struct.pack(">I", len(s)) for s in samples) if sizes_in_trun else b""
+        trun = full(b"trun", 0, flags, struct.pack(">Ii", len(samples), data_offset) + entries)
+        if aux == "saio":
+            extra = (
+                full(b"saiz", 0, 0, bytes([len(records[0])]) + struct.pack(">I", len(samples)))
+                + full(b"saio", 0, 0, struct.pack(">II", 1, aux_offset))
+                + box(b"abcd", b"".join(records))
+            )
+        else:
+            extra = full(b"senc", 0, 2, struct.pack(">I", len(samples)) + b"".join(records))
+        return box(b"moof", full(b"mfhd", 0, 0, struct.pack(">I", 1)) + box(b"traf", tfhd + trun + extra))
+
+    moof = build(0, 0)
+    moof = build(len(moof) + 8, len(moof) - sum(map(len, records)))
+    return box(b"styp", b"msdh\0\0\0\0") + moof + box(b"mdat", b"".join(encrypted))
+
+
+def mdat_payload(data: bytes) -> bytes:
+    _, pos, header, size = next(b for b in iter_boxes(data) if b[0] == b"mdat")
+    return data[pos + header : pos + size]
+
+
+def decryptor(init: bytes) -> tuple[CencDecryptor, bytes]:
+    d = CencDecryptor({KID: KEY})
+    return d, d.decrypt_init(init)
+
+
+@pytest.mark.parametrize("scheme", [b"cenc", b"cbcs"])
+@pytest.mark.parametrize("aux", ["senc", "saio"])
+def test_fragment_round_trip(scheme, aux):
+    d, clean_init = decryptor(make_init(scheme))
+    assert b"encv" not in clean_init and b"sinf" not in clean_init and b"pssh" not in clean_init
+    assert b"avc1" in clean_init
+
+    samples = [os.urandom(500 + i * 137) for i in range(8)]
+    out = d.decrypt_fragment(make_fragment(scheme, samples, aux=aux))
+    assert mdat_payload(out) == b"".join(samples)
+    assert b"senc" not in out and b"saiz" not in out
+
+
+@pytest.mark.parametrize("scheme", [b"cenc", b"cbcs"])
+def test_sample_size_from_trex(scheme):
+    samples = [os.urandom(640) for _ in range(5)]
+    d, _ = decryptor(make_init(scheme, trex_size=640))
+    out = d.decrypt_fragment(make_fragment(scheme, samples, sizes_in_trun=False))
+    assert mdat_payload(out) == b"".join(samples)
+
+
+def test_unknown_sample_size_raises():
+    d, _ = decryptor(make_init(b"cenc"))
+    with pytest.raises(CencError):
+        d.decrypt_fragment(make_fragment(b"cenc", [os.urandom(640)], sizes_in_trun=False))
+
+
+def test_decrypt_file(tmp_path):
+    init = make_init(b"cenc", trex_size=0)
+    fragments = [[os.urandom(900) for _ in range(3)] for _ in range(4)]
+    src: Path = Path(tmp_path) / "enc.mp4"
+    dst: Path = Path(tmp_path) / "dec.mp4"
+    src.write_bytes(init + b"".join(make_fragment(b"cenc", f) for f in fragments))
+
+    CencDecryptor({KID: KEY}).decrypt_file(src, dst)
+    data = dst.read_bytes()
+    payloads = [data[p + h : p + s] for t, p, h, s in iter_boxes(data) if t == b"mdat"]
+    assert payloads == [b"".join(f) for f in fragments]
+    assert b"encv" not in data and b"senc" not in data
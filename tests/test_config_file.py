@@ -0,0 +1,33 @@
+import orjson
+import pytest
+
+from berrizdown.static import config_file
+
+
+@pytest.fixture
+def yaml_path(tmp_path, monkeypatch):
+    path = tmp_path / "berrizconfig.yaml"
+    monkeypatch.setattr(config_file, "YAML_PATH", path)
+    monkeypatch.setattr(config_file, "CACHE_PATH", tmp_path / "config_cache.json")
+    monkeypatch.setattr(config_file, "LEGACY_CACHE_PATH", tmp_path / "config_cache.pickle")
+    monkeypatch.setattr(config_file, "_loaded", {})
+    return path
+
+
+def test_cache_is_json_and_skips_yaml_parse(yaml_path, monkeypatch):
+    yaml_path.write_text("VideoDownload:\n  semaphore: 7\n  http2_hosts: []\n", encoding="utf-8")
+    (yaml_path.parent / "config_cache.pickle").write_bytes(b"old")
+    config = config_file.read_config(yaml_path)
+    assert config == {"VideoDownload": {"semaphore": 7, "http2_hosts": []}}
+    assert orjson.loads(config_file.CACHE_PATH.read_bytes())["config"] == config
+    assert not config_file.LEGACY_CACHE_PATH.exists()
+
+    monkeypatch.setattr(config_file, "_loaded", {})
+    monkeypatch.setattr(config_file, "YAML", None)
+    assert config_file.read_config(yaml_path) == config
+
+
+def test_config_that_does_not_round_trip_is_not_cached(yaml_path):
+    yaml_path.write_text("codes:\n  1: a\n", encoding="utf-8")
+    assert config_file.read_config(yaml_path) == {"codes": {1: "a"}}
+    assert not config_file.CACHE_PATH.exists()
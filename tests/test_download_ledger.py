@@ -0,0 +1,117 @@
+import asyncio
+import hashlib
+import sqlite3
+
+import pytest
+
+from berrizdown.lib.path import Path
+from berrizdown.lock.donwnload_lock import UUIDSetStore
+
+
+@pytest.mark.parametrize("checksum", [False, True])
+def test_mark_file_done_checksum_is_optional(tmp_path, checksum):
+    video: Path = Path(tmp_path) / "video.mp4"
+    video.write_bytes(b"x" * 4096)
+    store = UUIDSetStore()
+    store.filename = str(Path(tmp_path) / "ledger.db")
+
+    asyncio.run(store.mark_file_done("m1", "VOD", 1, video, checksum=checksum))
+    store.stop()
+
+    row = sqlite3.connect(store.filename).execute("SELECT status, bytes, checksum FROM downloads").fetchone()
+    expected = hashlib.sha256(b"x" * 4096).hexdigest() if checksum else None
+    assert row == ("done", 4096, expected)
+    assert store.exists("m1")
+
+
+def test_unfinished_videos_are_requeued_once(tmp_path):
+    from berrizdown.unit.main_process import MediaProcessor
+
+    store = UUIDSetStore()
+    store.filename = str(Path(tmp_path) / "ledger.db")
+    store.mark_started("stuck", "VOD", 1)
+    store.mark_started("other-community", "VOD", 2)
+    store.mark_started("finished", "LIVE", 1)
+    store.mark_done("finished", "LIVE", 1)
+    store.stop()
+
+    assert [entry.media_id for entry in store.unfinished(1)] == ["stuck"]
+    assert store.entry("finished").status == "done"
+    assert [entry.media_id for entry in store.completed(1)] == ["finished"]
+
+    processor = MediaProcessor({}, 1, "community", store=store)
+
+    async def run() -> tuple[list, list, list]:
+        return (
+            await processor._unfinished_items([("photo", "PHOTO")]),
+            await processor._unfinished_items([("new", "VOD")]),
+            await processor._unfinished_items([("new2", "VOD")]),
+        )
+
+    photo_only, first, second = asyncio.run(run())
+    assert photo_only == []
+    assert first == [("stuck", "VOD")]
+    assert second == []
+
+
+def test_only_saved_photos_are_marked_done(monkeypatch):
+    from berrizdown.unit import main_process
+    from berrizdown.unit.image.image import IMGmediaDownloader
+
+    class Store:
+        def __init__(self) -> None:
+            self.done: list[str] = []
+
+        def mark_done(self, media_id: str, media_type: str, community_id: int) -> None:
+            self.done.append(media_id)
+
+    async def fetch_and_process(self, media_id: str):
+        if media_id == "broken":
+            raise RuntimeError("fetch failed")
+        # None: 有圖片沒有寫入
+        return None if media_id == "partial" else [Path(f"{media_id}.jpg")]
+
+    monkeypatch.setattr(IMGmediaDownloader, "fetch_and_process", fetch_and_process)
+    monkeypatch.setattr(main_process, "image_dup", False)
+    store = Store()
+    processor = main_process.MediaProcessor({}, 1, "community", store=store)
+
+    asyncio.run(processor._process_photo_items(["ok", "partial", "broken"]))
+    assert store.done == ["ok"]
+    assert processor.completed == {"ok"}
+
+
+def test_only_muxed_videos_count_as_completed(monkeypatch):
+    from berrizdown.unit import main_process
+
+    class Store:
+        def __init__(self) -> None:
+            self.known: set[str] = set()
+
+        def exists(self, media_id: str) -> bool:
+            return media_id in self.known
+
+        def mark_started(self, *_) -> None:
+            pass
+
+    store = Store()
+
+    class FakeProcessor:
+        def __init__(self, media_id: str, *_) -> None:
+            self.media_id = media_id
+
+        async def run(self) -> None:
+            # 只有成功混流的影片會寫入完成紀錄 其他失敗路徑同樣回傳 None
+            if self.media_id == "ok":
+                store.known.add("ok")
+
+    async def cookie_check(self, _) -> bool:
+        return True
+
+    monkeypatch.setattr(main_process, "BerrizProcessor", FakeProcessor)
+    monkeypatch.setattr(main_process, "ensure_tools", lambda: None)
+    monkeypatch.setattr(main_process.MediaProcessor, "cookie_check", cookie_check)
+    processor = main_process.MediaProcessor({}, 1, "community", store=store)
+
+    asyncio.run(processor._process_vod_items([("ok", "VOD"), ("null-playback", "VOD")]))
+    assert processor.completed == {"ok"}
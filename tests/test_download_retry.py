@@ -0,0 +1,75 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+from aiohttp import web
+
+from berrizdown.lib.download.download import MediaDownloader
+from berrizdown.unit.http.transport import transport
+
+
+class FakeScheduler:
+    def __init__(self):
+        self.held = 0
+        self.backoffs = []
+        self.congestions = 0
+
+    async def session(self):
+        return object()
+
+    @asynccontextmanager
+    async def slot(self, owner, url):
+        self.held += 1
+        try:
+            yield
+        finally:
+            self.held -= 1
+
+    def backoff(self, attempt, retry_after=None):
+        # 退避期間不得佔用名額
+        self.backoffs.append(self.held)
+        return 0.01
+
+    def congestion(self):
+        self.congestions += 1
+
+
+def fetch(tmp_path, statuses):
+    async def handler(request):
+        status = statuses.pop(0)
+        return web.Response(status=status, body=b"segment" if status == 200 else b"")
+
+    async def run():
+        app = web.Application()
+        app.router.add_get("/{name}", handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        url = f"http://127.0.0.1:{runner.addresses[0][1]}/seg.m4s"
+
+        downloader = MediaDownloader("media", str(tmp_path), 60.0, None)
+        scheduler = FakeScheduler()
+        downloader.scheduler = scheduler
+        try:
+            data = await downloader.download_bytes(url)
+        finally:
+            await transport.close()
+            await runner.cleanup()
+        return data, scheduler
+
+    return asyncio.run(run())
+
+
+def test_backoff_happens_outside_the_slot(tmp_path):
+    data, scheduler = fetch(tmp_path, [503, 408, 200])
+    assert data == b"segment"
+    assert scheduler.backoffs == [0, 0]
+    assert scheduler.congestions == 1
+
+
+def test_client_error_is_not_retried(tmp_path):
+    statuses = [404, 200]
+    data, scheduler = fetch(tmp_path, statuses)
+    assert data is None
+    assert statuses == [200]
+    assert scheduler.backoffs == []
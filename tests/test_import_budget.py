@@ -0,0 +1,18 @@
+import subprocess
+import sys
+
+# 全新的直譯器才能確認 import 時沒有觸發任何延遲初始化
+SCRIPT = """
+import berrizdown.core
+from berrizdown.lib.load_yaml_config import ensure_tools
+from berrizdown.lib.lock_cookie import Lock_Cookie
+from berrizdown.unit.__init__ import get_useragent
+
+print(ensure_tools.cache_info().currsize, get_useragent.cache_info().currsize, Lock_Cookie._session is None)
+"""
+
+
+def test_importing_core_defers_tools_useragent_and_cookie():
+    result = subprocess.run([sys.executable, "-c", SCRIPT], capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().splitlines()[-1] == "0 0 True"
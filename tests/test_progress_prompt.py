@@ -0,0 +1,52 @@
+import asyncio
+
+from berrizdown.lib.processbar.processbar import MultiTrackProgressManager
+
+
+class FakeLive:
+    def __init__(self):
+        self.running = True
+
+    def start(self):
+        self.running = True
+
+    def stop(self):
+        self.running = False
+
+    def update(self, *_):
+        pass
+
+
+def test_prompts_do_not_overlap_and_pause_live(monkeypatch):
+    manager = MultiTrackProgressManager()
+    live = FakeLive()
+    monkeypatch.setattr(manager, "live", live)
+    active = []
+    overlaps = []
+
+    async def ask(name):
+        async with manager.prompt():
+            overlaps.append(len(active))
+            assert live.running is False
+            active.append(name)
+            await asyncio.sleep(0.01)
+            active.remove(name)
+
+    async def run():
+        await asyncio.gather(*(ask(i) for i in range(5)))
+
+    asyncio.run(run())
+    assert overlaps == [0] * 5
+    assert live.running is True
+
+
+def test_cancel_removes_only_own_progress_bars(monkeypatch):
+    manager = MultiTrackProgressManager()
+    monkeypatch.setattr(manager, "live", None)
+    monkeypatch.setattr(manager, "progress_bars", {})
+    for owner in ("media-a", "media-b"):
+        for track in ("video", "audio"):
+            manager.create_progress_bar(track, 10, "1 min", owner=owner)
+
+    manager.remove_progress_bars("media-a")
+    assert sorted(manager.progress_bars) == ["media-b:audio", "media-b:video"]
@@ -0,0 +1,22 @@
+import asyncio
+import hashlib
+
+from berrizdown.lib.download.segment_manifest import DONE, PENDING, SegmentManifest
+from berrizdown.lib.path import Path
+
+
+def test_done_segment_with_wrong_content_is_downloaded_again(tmp_path):
+    manifest = SegmentManifest.load(Path(tmp_path) / "track.manifest.json", "video", "1", None, ["/a.m4s", "/b.m4s"])
+    good, bad = Path(tmp_path) / "a.m4s", Path(tmp_path) / "b.m4s"
+    for index, path in enumerate((good, bad)):
+        path.write_bytes(b"segment")
+        manifest.mark_done(index, 7, hashlib.sha256(b"segment").hexdigest())
+    # 大小相同但內容損毀 只比對大小無法發現
+    bad.write_bytes(b"\x00" * 7)
+
+    async def run() -> tuple[bool, bool]:
+        return await manifest.verify(0, good), await manifest.verify(1, bad)
+
+    assert asyncio.run(run()) == (True, False)
+    assert manifest.entry(0).status == DONE
+    assert manifest.entry(1).status == PENDING
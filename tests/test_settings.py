@@ -0,0 +1,29 @@
+import copy
+
+import pytest
+
+from berrizdown.lib import settings
+from berrizdown.lib.load_yaml_config import CFG, YAML_PATH
+
+
+@pytest.fixture
+def restore_settings():
+    config, current = copy.deepcopy(CFG), settings.get_settings()
+    yield
+    CFG.clear()
+    CFG.update(config)
+    settings._current = current
+
+
+def test_reload_picks_up_changed_yaml(tmp_path, restore_settings):
+    path = tmp_path / "berrizconfig.yaml"
+    text = YAML_PATH.read_text(encoding="utf-8")
+    assert "  semaphore: 7\n" in text
+    path.write_text(text, encoding="utf-8")
+    assert settings.reload_settings(path).video.semaphore == 7
+
+    path.write_text(text.replace("  semaphore: 7\n", "  semaphore: 3\n"), encoding="utf-8")
+    reloaded = settings.reload_settings(path)
+    assert reloaded.video.semaphore == 3
+    assert settings.get_settings() is reloaded
+    assert CFG["VideoDownload"]["semaphore"] == 3
@@ -0,0 +1,76 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from berrizdown.lib.download.download import MediaDownloader
+from berrizdown.lib.mux.merge import MergeAborted, StreamMerger
+
+SEGMENT = b"x" * 16
+
+
+class _Bar:
+    def update(self, **_):
+        pass
+
+
+class _Progress:
+    def create_progress_bar(self, *_, **__):
+        return _Bar()
+
+    def remove_all_progress_bars(self):
+        pass
+
+
+def test_reserve_raises_after_fail(tmp_path):
+    async def run():
+        merger = StreamMerger(tmp_path / "video.mp4", "video", 6, memory_limit=2 * len(SEGMENT))
+        await merger.start(None)
+        await merger.reserve(1)
+        await merger.add(1, SEGMENT)
+        await merger.reserve(2)
+        await merger.add(2, SEGMENT)
+        # 緩衝區已滿 segment 3 必須等待 next_index 前進
+        waiter = asyncio.create_task(merger.reserve(3))
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+
+        await merger.fail(0)
+        with pytest.raises(MergeAborted):
+            await asyncio.wait_for(waiter, 1)
+        assert merger.buffered_bytes == 0
+        with pytest.raises(MergeAborted):
+            await merger.reserve(4)
+        await merger.close()
+        assert not merger.complete
+
+    asyncio.run(run())
+
+
+def test_batch_download_fails_when_middle_segment_is_lost(tmp_path):
+    async def run():
+        downloader = MediaDownloader("media", str(tmp_path), 60.0, None)
+        downloader.scheduler = SimpleNamespace(record=lambda n: None, limit=1)
+        failed = 3
+
+        async def download_bytes(url, owner=None):
+            index = int(url.rsplit("/", 1)[1].split(".")[0])
+            await asyncio.sleep(0.001 * index)
+            return None if index == failed else SEGMENT
+
+        downloader.download_bytes = download_bytes
+        merger = StreamMerger(tmp_path / "video.mp4", "video", 12, memory_limit=2 * len(SEGMENT))
+        await merger.start(None)
+        track = SimpleNamespace(id="v", segment_urls=[f"https://cdn.example/{i}.m4s" for i in range(12)])
+
+        ok = await asyncio.wait_for(
+            downloader.batch_download_segments(track, tmp_path, "video", _Progress(), None, merger), 5
+        )
+        assert ok is False
+        assert merger.failed
+        # 失敗時仍在緩衝區的前段會被丟棄 只確認沒有越過失敗的分段 且已寫入的內容連續
+        assert merger.next_index <= failed
+        assert (tmp_path / "video.mp4").read_bytes() == SEGMENT * merger.next_index
+        await merger.close()
+
+    asyncio.run(run())
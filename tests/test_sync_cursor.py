@@ -0,0 +1,64 @@
+import orjson
+import pytest
+
+from berrizdown.lib.path import Path
+from berrizdown.unit.getall.sync_cursor import SyncCursor
+
+
+def media(media_id: str, seq: int) -> dict:
+    return {"media": {"mediaId": media_id, "mediaSeq": seq, "publishedAt": f"2026-01-{seq:02d}T00:00:00Z"}}
+
+
+PAGE = [media("e", 5), media("d", 4), media("c", 3), media("b", 2), media("a", 1)]
+
+
+@pytest.fixture
+def cursor(tmp_path, monkeypatch):
+    monkeypatch.setattr(SyncCursor, "enabled", property(lambda self: True))
+    return SyncCursor(Path(tmp_path) / "sync.json")
+
+
+def fetch(cursor: SyncCursor, items: list[dict]) -> list[dict]:
+    fresh, _ = cursor.filter(
+        1,
+        "media",
+        items,
+        lambda item: item["media"]["publishedAt"],
+        lambda item: item["media"]["mediaSeq"],
+    )
+    return fresh
+
+
+def saved(cursor: SyncCursor) -> dict | None:
+    if not cursor.path.exists():
+        return None
+    return orjson.loads(cursor.path.read_bytes())["1"]["media"]
+
+
+def test_all_processed_advances(cursor):
+    fetch(cursor, PAGE)
+    cursor.confirm(["a", "b", "c", "d", "e"])
+    cursor.commit()
+    assert saved(cursor)["seq"] == 5
+
+
+def test_unprocessed_item_blocks_newer(cursor):
+    fetch(cursor, PAGE)
+    # c 被篩選掉或失敗 d e 即使完成也不能推進 否則下次會略過 c
+    cursor.confirm(["a", "b", "d", "e"])
+    cursor.commit()
+    assert saved(cursor)["seq"] == 2
+    assert [item["media"]["mediaId"] for item in fetch(SyncCursor(cursor.path), PAGE)] == ["e", "d", "c"]
+
+
+def test_nothing_confirmed_keeps_state(cursor):
+    fetch(cursor, PAGE)
+    cursor.confirm([])
+    cursor.commit()
+    assert saved(cursor) is None
+
+
+def test_commit_without_confirm_writes_nothing(cursor):
+    fetch(cursor, PAGE)
+    cursor.commit()
+    assert saved(cursor) is None
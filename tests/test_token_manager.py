@@ -0,0 +1,34 @@
+import asyncio
+
+from berrizdown.cookies import token_manager as module
+from berrizdown.cookies.token_manager import TokenManager
+
+
+def test_refresh_reads_current_bz_r(monkeypatch):
+    cookie_file: dict[str, str] = {"bz_r": "old"}
+    sent: list[str] = []
+
+    class FakeRefresher:
+        def __init__(self) -> None:
+            self.cookie_bz_r = cookie_file["bz_r"]
+
+        async def refresh_token(self) -> str:
+            sent.append(self.cookie_bz_r)
+            return "not-a-jwt"
+
+    class FakeCookie:
+        async def get_cookies(self) -> dict[str, str]:
+            return {}
+
+    monkeypatch.setattr(module, "Refresh_JWT", FakeRefresher)
+    monkeypatch.setattr(module, "Berriz_cookie", FakeCookie)
+
+    async def run() -> None:
+        manager = TokenManager()
+        await manager.refresh()
+        # 重新登入後 default.txt 換成新的 bz_r
+        cookie_file["bz_r"] = "new"
+        await manager.refresh()
+
+    asyncio.run(run())
+    assert sent == ["old", "new"]
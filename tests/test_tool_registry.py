@@ -0,0 +1,37 @@
+import asyncio
+import time
+
+from berrizdown.lib.mux.tool_registry import ToolInfo, ToolRegistry
+
+
+def test_async_lookup_does_not_block_the_loop(tmp_path, monkeypatch):
+    registry = ToolRegistry(tmp_path / "tool_registry.json")
+    calls: list[str] = []
+
+    def slow_resolve(name: str) -> ToolInfo:
+        calls.append(name)
+        # 模擬 subprocess.run(["ffmpeg", "-version"])
+        time.sleep(0.3)
+        return ToolInfo(name, f"/usr/bin/{name}", "ffmpeg version 7")
+
+    monkeypatch.setattr(registry, "_resolve", slow_resolve)
+
+    async def run() -> tuple[str | None, int]:
+        ticks = 0
+
+        async def ticker() -> None:
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        path = await registry.path_of_async("ffmpeg")
+        task.cancel()
+        return path, ticks
+
+    path, ticks = asyncio.run(run())
+    assert path == "/usr/bin/ffmpeg"
+    assert ticks >= 10
+    assert registry.path_of("ffmpeg") == "/usr/bin/ffmpeg"
+    assert calls == ["ffmpeg"]
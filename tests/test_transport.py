@@ -0,0 +1,27 @@
+import asyncio
+
+from berrizdown.unit.http import transport as transport_module
+from berrizdown.unit.http.transport import API, MEDIA, Transport
+
+
+def test_http2_client_does_not_share_aiohttp_ssl_context(monkeypatch):
+    captured = {}
+
+    class FakeClient:
+        def __init__(self, **kwargs):
+            captured.update(kwargs)
+
+    monkeypatch.setattr(transport_module.httpx, "AsyncClient", FakeClient)
+
+    async def run():
+        transport = Transport()
+        for kind in (API, MEDIA):
+            transport._create_http2(kind)
+            verify = captured["verify"]
+            assert verify is not transport.ssl_context(kind)
+            # 模擬 httpcore 設定 ALPN aiohttp 的 context 不受影響
+            verify.set_alpn_protocols(["http/1.1", "h2"])
+            transport._create_http2(kind)
+            assert captured["verify"] is not verify
+
+    asyncio.run(run())